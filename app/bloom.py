@@ -0,0 +1,182 @@
+"""
+Filtro de Bloom, no Redis, dos external_ids já gravados de cada plataforma.
+
+A etapa de escrita (upsert_trends) consulta o filtro antes de procurar as
+tendências existentes do lote: itens que o filtro diz nunca terem sido vistos
+são certamente novos e ficam de fora da consulta ao banco; só os "talvez
+vistos" (existentes ou falsos positivos) são procurados.
+
+O filtro é um bitmap comum do Redis (SETBIT/GETBIT em pipeline, sem depender
+do módulo RedisBloom), dimensionado por SEEN_FILTER_CAPACITY e pela taxa de
+falsos positivos alvo SEEN_FILTER_FP_RATE. Ele é reconstruído a partir do
+banco por rebuild_seen_filter (após clean_old_trends, ou quando não existe);
+um bit apagado por falta de reconstrução ou perda do Redis só faz uma
+tendência existente parecer nova, e o INSERT ... ON CONFLICT DO NOTHING da
+ingestão cobre esse caso.
+
+Sem Redis, ou sem o filtro construído, a ingestão consulta o banco para
+todos os itens, como antes.
+"""
+import os
+import math
+import time
+import hashlib
+import logging
+
+import redis
+
+from app.cache import get_redis_client
+from app.models import Trend
+
+logger = logging.getLogger(__name__)
+
+SEEN_FILTER_PREFIX = "trendpulse:seen"
+
+# Quantidade de external_ids por plataforma e taxa de falsos positivos alvo
+SEEN_FILTER_CAPACITY = int(os.getenv("SEEN_FILTER_CAPACITY", 100000))
+SEEN_FILTER_FP_RATE = float(os.getenv("SEEN_FILTER_FP_RATE", 0.01))
+
+# Após uma falha, o Redis não é consultado novamente durante este intervalo (segundos)
+REDIS_RETRY_INTERVAL = 30
+
+_disabled_until = 0.0
+
+
+def bloom_parameters(capacity=None, fp_rate=None):
+    """
+    Retorna (bits, funções de hash) do filtro para a capacidade e a taxa de
+    falsos positivos desejadas: m = -n·ln(p)/ln(2)², k = m/n·ln(2).
+    """
+    capacity = max(1, capacity or SEEN_FILTER_CAPACITY)
+    fp_rate = fp_rate or SEEN_FILTER_FP_RATE
+    bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+def bloom_positions(external_id, bits, hashes):
+    """
+    Posições dos bits de um external_id (hash duplo sobre um blake2b de 128 bits).
+    """
+    digest = hashlib.blake2b(str(external_id).encode("utf-8"), digest_size=16).digest()
+    first = int.from_bytes(digest[:8], "big")
+    second = int.from_bytes(digest[8:], "big") | 1
+    return [(first + i * second) % bits for i in range(hashes)]
+
+
+def seen_filter_key(platform):
+    return f"{SEEN_FILTER_PREFIX}:{platform}"
+
+
+def _run(operation, default=None):
+    """
+    Executa `operation(client)` e retorna `default` se o Redis falhar.
+    """
+    global _disabled_until
+    if time.time() < _disabled_until:
+        return default
+
+    try:
+        return operation(get_redis_client())
+    except (redis.RedisError, OSError, ValueError) as e:
+        _disabled_until = time.time() + REDIS_RETRY_INTERVAL
+        logger.warning(f"Filtro de itens vistos indisponível (Redis): {str(e)}")
+        return default
+
+
+def maybe_seen(platform, external_ids):
+    """
+    Consulta o filtro da plataforma com um único pipeline.
+
+    Returns:
+        list: Para cada external_id, False se certamente nunca foi gravado e
+        True se talvez tenha sido; None se o filtro não estiver disponível.
+    """
+    if not external_ids:
+        return []
+    bits, hashes = bloom_parameters()
+    key = seen_filter_key(platform)
+
+    def operation(client):
+        pipeline = client.pipeline(transaction=False)
+        pipeline.exists(key)
+        for external_id in external_ids:
+            for position in bloom_positions(external_id, bits, hashes):
+                pipeline.getbit(key, position)
+        results = pipeline.execute()
+        if not results[0]:
+            return None
+        flags = results[1:]
+        return [all(flags[i * hashes:(i + 1) * hashes]) for i in range(len(external_ids))]
+
+    return _run(operation)
+
+
+def add_seen(platform, external_ids):
+    """
+    Marca external_ids recém-gravados no filtro da plataforma, se ele existir.
+    """
+    if not external_ids:
+        return
+    bits, hashes = bloom_parameters()
+    key = seen_filter_key(platform)
+
+    def operation(client):
+        # Um filtro parcial seria confiado como completo: só atualiza o que já foi construído
+        if not client.exists(key):
+            return
+        pipeline = client.pipeline(transaction=False)
+        for external_id in external_ids:
+            for position in bloom_positions(external_id, bits, hashes):
+                pipeline.setbit(key, position, 1)
+        pipeline.execute()
+
+    _run(operation)
+
+
+def rebuild_seen_filter(db, platform, batch_size=10000):
+    """
+    Reconstrói o filtro da plataforma a partir dos external_ids do banco.
+
+    O bitmap é montado em memória e publicado de uma vez (SET em uma chave
+    temporária e RENAME), para que a ingestão nunca veja um filtro pela metade.
+
+    Returns:
+        int: Quantidade de external_ids no filtro, ou None se o Redis estiver indisponível.
+    """
+    bits, hashes = bloom_parameters()
+    bitmap = bytearray((bits + 7) // 8)
+    count = 0
+    query = (db.query(Trend.external_id)
+             .filter(Trend.platform == platform, Trend.external_id.isnot(None))
+             .yield_per(batch_size))
+    for (external_id,) in query:
+        for position in bloom_positions(external_id, bits, hashes):
+            # Mesma ordem de bits do SETBIT: o bit 0 é o mais significativo do primeiro byte
+            bitmap[position >> 3] |= 0x80 >> (position & 7)
+        count += 1
+
+    if count > SEEN_FILTER_CAPACITY:
+        logger.warning(f"Filtro de {platform} com {count} itens acima da capacidade ({SEEN_FILTER_CAPACITY}); "
+                       f"a taxa de falsos positivos fica acima de {SEEN_FILTER_FP_RATE}")
+
+    key = seen_filter_key(platform)
+
+    def operation(client):
+        client.set(f"{key}:rebuild", bytes(bitmap))
+        client.rename(f"{key}:rebuild", key)
+        return count
+
+    result = _run(operation)
+    if result is not None:
+        logger.info(f"Filtro de itens vistos de {platform} reconstruído com {count} itens")
+    return result
+
+
+def ensure_seen_filter(db, platform):
+    """
+    Constrói o filtro da plataforma se ele ainda não existir no Redis.
+    """
+    exists = _run(lambda client: client.exists(seen_filter_key(platform)))
+    if exists == 0:
+        rebuild_seen_filter(db, platform)
@@ -0,0 +1,181 @@
+"""
+Cache de respostas da API no Redis.
+
+As chaves são compostas pelo caminho, pelos parâmetros da consulta e por um
+contador de "geração" dos dados. As tarefas de ingestão e limpeza incrementam
+a geração após o commit, o que invalida de uma só vez todas as respostas
+anteriores sem precisar apagar chaves.
+
+Se o Redis estiver indisponível, todas as funções degradam para "sem cache"
+e a API continua respondendo a partir do banco.
+"""
+import os
+import json
+import time
+import logging
+from urllib.parse import urlencode
+
+import redis
+
+# Configuração de logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "trendpulse:cache"
+GENERATION_KEY = f"{CACHE_PREFIX}:generation"
+
+# Tempo de vida das respostas; limita também a defasagem do campo timeAgo
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+
+# Após uma falha, o Redis não é consultado novamente durante este intervalo (segundos)
+REDIS_RETRY_INTERVAL = 30
+
+_client = None
+_disabled_until = 0.0
+
+
+def get_redis_client():
+    """
+    Retorna o cliente Redis compartilhado, usando a mesma URL do broker do Celery.
+
+    A URL é a resolvida na importação de app.celery_app, e não a de
+    celery.conf: ler a configuração finalizaria o app Celery no processo web
+    e dispararia setup_initial_tasks (que pode enfileirar uma coleta).
+    """
+    global _client
+    if _client is None:
+        from app.celery_app import broker_url
+        _client = redis.from_url(
+            broker_url,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5,
+        )
+    return _client
+
+
+def _run(operation, default=None):
+    """
+    Executa `operation(client)` e retorna `default` se o Redis falhar.
+    Falhas desabilitam o cache por REDIS_RETRY_INTERVAL segundos para não
+    penalizar cada requisição com um timeout de conexão.
+    """
+    global _disabled_until
+    if not RESPONSE_CACHE_ENABLED or time.time() < _disabled_until:
+        return default
+
+    try:
+        return operation(get_redis_client())
+    except (redis.RedisError, OSError, ValueError) as e:
+        _disabled_until = time.time() + REDIS_RETRY_INTERVAL
+        logger.warning(f"Cache Redis indisponível: {str(e)}")
+        return default
+
+
+def get_data_generation():
+    """
+    Retorna a geração atual dos dados, ou None se o Redis estiver indisponível.
+    """
+    def operation(client):
+        value = client.get(GENERATION_KEY)
+        return int(value) if value is not None else 0
+    return _run(operation)
+
+
+def bump_data_generation():
+    """
+    Incrementa a geração dos dados, invalidando todas as respostas em cache.
+    Deve ser chamada pelas tarefas após o commit das alterações.
+    """
+    generation = _run(lambda client: client.incr(GENERATION_KEY))
+    if generation is not None:
+        logger.info(f"Geração dos dados incrementada para {generation}")
+    return generation
+
+
+def build_cache_key(generation, path, query_params):
+    """
+    Monta a chave de cache para um caminho e seus parâmetros.
+    Os parâmetros são ordenados para que a ordem na URL não gere chaves diferentes.
+    """
+    query = urlencode(sorted(query_params))
+    return f"{CACHE_PREFIX}:{generation}:{path}?{query}"
+
+
+def get_cached_response(generation, path, query_params):
+    """
+    Busca a resposta em cache calculada na geração informada.
+
+    Returns:
+        dict: Entrada com "body" e "headers", ou None em caso de miss.
+    """
+    raw = _run(lambda client: client.get(build_cache_key(generation, path, query_params)))
+    if raw is None:
+        return None
+
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def set_cached_response(generation, path, query_params, body, headers=None):
+    """
+    Grava a resposta em cache associada à geração em que foi calculada.
+    """
+    entry = json.dumps({
+        "body": body.decode("utf-8") if isinstance(body, bytes) else body,
+        "headers": headers or {},
+    })
+    key = build_cache_key(generation, path, query_params)
+    _run(lambda client: client.set(key, entry, ex=RESPONSE_CACHE_TTL))
+
+
+def get_cached_responses(generation, requests):
+    """
+    Busca várias respostas em cache com um único MGET.
+
+    Args:
+        requests: Lista de (caminho, parâmetros da consulta).
+
+    Returns:
+        list: Entradas na mesma ordem, com None para os misses.
+    """
+    keys = [build_cache_key(generation, path, query_params) for path, query_params in requests]
+    raw_entries = _run(lambda client: client.mget(keys)) if keys else None
+    if raw_entries is None:
+        return [None] * len(keys)
+
+    entries = []
+    for raw in raw_entries:
+        try:
+            entries.append(json.loads(raw) if raw is not None else None)
+        except ValueError:
+            entries.append(None)
+    return entries
+
+
+def set_cached_responses(generation, responses):
+    """
+    Grava várias respostas em cache com um único pipeline.
+
+    Args:
+        responses: Lista de (caminho, parâmetros da consulta, corpo, cabeçalhos).
+    """
+    if not responses:
+        return
+
+    def operation(client):
+        pipeline = client.pipeline(transaction=False)
+        for path, query_params, body, headers in responses:
+            entry = json.dumps({
+                "body": body.decode("utf-8") if isinstance(body, bytes) else body,
+                "headers": headers or {},
+            })
+            pipeline.set(build_cache_key(generation, path, query_params), entry, ex=RESPONSE_CACHE_TTL)
+        return pipeline.execute()
+
+    _run(operation)
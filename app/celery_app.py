@@ -93,6 +93,12 @@ celery.conf.update(
     broker_connection_max_retries=10,
     broker_connection_timeout=30,
     worker_concurrency=2,             # Reduz a concorrência para economizar recursos
+    # Filas dedicadas das coletas por plataforma, disparadas em paralelo por
+    # fetch_all_trends; os workers precisam consumi-las (-Q celery,youtube,reddit)
+    task_routes={
+        'app.tasks.fetch_youtube_trends': {'queue': 'youtube'},
+        'app.tasks.fetch_reddit_trends': {'queue': 'reddit'},
+    },
 )
 
 # Configuração para o Flower
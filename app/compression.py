@@ -0,0 +1,170 @@
+"""
+Compressão das respostas HTTP (gzip e, se o pacote `brotli` estiver instalado, br).
+
+O middleware é ASGI puro e deve ser o mais externo da pilha: comprime o corpo
+depois que o CORS, o cache de respostas e os middlewares de log já atuaram, de
+modo que o cache guarda sempre o corpo original e os cabeçalhos CORS são
+preservados. Respostas em streaming (como a exportação NDJSON) são comprimidas
+pedaço a pedaço, com flush a cada pedaço para não atrasar o envio.
+"""
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Respostas menores que isso (em bytes) são enviadas sem compressão
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+# Qualidade moderada: níveis altos do brotli são lentos demais para respostas dinâmicas
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def supported_encodings():
+    """
+    Retorna as codificações suportadas, em ordem de preferência.
+    """
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Escolhe a codificação a partir do cabeçalho Accept-Encoding, respeitando os
+    pesos (q) informados pelo cliente.
+
+    Returns:
+        str: "br", "gzip" ou None para enviar sem compressão.
+    """
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        parts = [part.strip() for part in item.split(";")]
+        name = parts[0].lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    weight = float(param[2:])
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in supported_encodings():
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class _Compressor:
+    """
+    Compressor incremental com a mesma interface para gzip e brotli.
+    """
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31: formato gzip (cabeçalho e trailer) em vez de zlib
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data, final):
+        if self.encoding == "br":
+            chunk = self._compressor.process(data)
+            return chunk + (self._compressor.finish() if final else self._compressor.flush())
+        chunk = self._compressor.compress(data)
+        return chunk + self._compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Comprime respostas compressíveis a partir de `minimum_size` bytes,
+    negociando a codificação pelo Accept-Encoding.
+    """
+
+    def __init__(self, app, minimum_size=COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        # Pedaços iniciais retidos até saber se o corpo atinge o tamanho mínimo
+        # (middlewares baseados em BaseHTTPMiddleware repassam o corpo em vários pedaços)
+        pending = []
+        pending_size = 0
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, pending_size
+
+            if message["type"] == "http.response.start":
+                # Os cabeçalhos só são enviados quando o corpo decide se a
+                # resposta será comprimida
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+
+                pending.append(body)
+                pending_size += len(body)
+                if pending_size < self.minimum_size:
+                    if more_body:
+                        return
+                    await send(start_message)
+                    start_message = None
+                    await send({"type": "http.response.body", "body": b"".join(pending), "more_body": False})
+                    return
+
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                # A representação comprimida não é idêntica byte a byte: o ETag passa a ser fraco
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                await send(start_message)
+                body = b"".join(pending)
+                pending.clear()
+
+            await send({
+                "type": "http.response.body",
+                "body": compressor.compress(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_compressed)
+
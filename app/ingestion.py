@@ -0,0 +1,254 @@
+"""
+Etapa de escrita das tarefas de coleta: grava em lote as tendências de uma plataforma.
+
+Para cada lote há uma única consulta pelas tendências já existentes
+(platform, external_id), limitada aos itens que o filtro de Bloom da
+plataforma (app.bloom) diz talvez já terem sido vistos; as novas são inseridas com um único INSERT (ON CONFLICT
+DO NOTHING em uix_platform_external_id onde o dialeto suporta), com os ids
+obtidos por RETURNING, e as existentes têm as estatísticas atualizadas com um
+único UPDATE em lote. Tendências cuja impressão digital (content_hash) não
+mudou desde a última gravação não são reescritas. Tags, cards, contadores, índice de busca e histórico são
+gravados também em lote, na mesma transação. O commit fica com a chamada, uma
+vez por lote.
+
+Como os INSERTs e UPDATEs são feitos pelo Core, os eventos de flush da sessão
+(contadores, índice de busca, dicionário de tags) não são disparados; esta
+etapa faz o mesmo trabalho explicitamente.
+"""
+import os
+import hashlib
+import datetime
+import logging
+
+from sqlalchemy import and_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.sql import bindparam
+
+from app.models import (
+    Trend, TrendTag, COUNTER_DIMENSIONS, SNAPSHOT_FIELDS, apply_counter_deltas,
+    record_trend_snapshots, snapshot_delta, format_views, resolve_tag_ids, normalize_tag_name, to_epoch,
+)
+from app.search import index_documents, trend_document
+from app.bloom import maybe_seen, add_seen
+
+logger = logging.getLogger(__name__)
+
+# Quantidade de tendências gravadas por lote (um commit por lote)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 200))
+
+# Colunas de Trend aceitas nos itens coletados
+TREND_COLUMNS = (
+    "title", "description", "platform", "external_id", "category", "author",
+    "url", "thumbnail", "views", "likes", "comments", "published_at",
+)
+
+
+def batches(items, size=INGEST_BATCH_SIZE):
+    """
+    Divide os itens coletados em lotes de `size`.
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def content_fingerprint(values):
+    """
+    Impressão digital (inteiro de 64 bits com sinal) dos campos mutáveis de
+    um item, comparada com Trend.content_hash para detectar se mudaram.
+    """
+    digest = hashlib.blake2b(repr(sorted(values.items())).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _insert_new_trends(connection, rows):
+    """
+    Insere as tendências novas com um único INSERT e retorna {external_id: id}
+    das linhas efetivamente inseridas por esta chamada.
+    """
+    table = Trend.__table__
+    dialect = connection.dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        # Outro worker pode ter inserido a mesma tendência depois da consulta do lote
+        stmt = insert(table).values(rows).on_conflict_do_nothing(index_elements=["platform", "external_id"])
+    elif dialect == "mysql":
+        stmt = mysql.insert(table).values(rows).prefix_with("IGNORE")
+    else:
+        stmt = table.insert().values(rows)
+
+    if connection.dialect.full_returning:
+        result = connection.execute(stmt.returning(table.c.id, table.c.external_id))
+        return {external_id: trend_id for trend_id, external_id in result}
+
+    connection.execute(stmt)
+    # Sem RETURNING: as linhas deste lote são identificadas pelo created_at
+    # gravado (em segundos inteiros), que as distingue das inseridas por outro worker
+    result = connection.execute(
+        table.select()
+        .with_only_columns([table.c.id, table.c.external_id])
+        .where(and_(
+            table.c.platform == rows[0]["platform"],
+            table.c.external_id.in_([row["external_id"] for row in rows]),
+            table.c.created_at == rows[0]["created_at"],
+        ))
+    )
+    return {external_id: trend_id for trend_id, external_id in result}
+
+
+def upsert_trends(db, platform, items, update_fields=SNAPSHOT_FIELDS, now=None, insert_new=True):
+    """
+    Grava um lote de tendências coletadas de uma plataforma.
+
+    Args:
+        items: Lista de dicts com as colunas de TREND_COLUMNS (sem `platform`)
+            e `tags` (lista de nomes). Itens repetidos valem pela última ocorrência.
+        update_fields: Estatísticas atualizadas nas tendências já existentes.
+        now: Momento da coleta (UTC).
+        insert_new: Se falso, itens ainda não gravados são ignorados e só as
+            tendências existentes são atualizadas.
+
+    Returns:
+        dict: {"inserted": n, "updated": n, "skipped": n}, onde `skipped` são
+        as tendências existentes sem mudança nas estatísticas (não reescritas).
+    """
+    now = now or datetime.datetime.utcnow()
+    items = list({item["external_id"]: item for item in items}.values())
+    if not items:
+        return {"inserted": 0, "updated": 0, "skipped": 0}
+
+    connection = db.connection()
+    table = Trend.__table__
+    ts = to_epoch(now)
+
+    # Itens que o filtro diz nunca terem sido gravados não precisam ser procurados
+    external_ids = [item["external_id"] for item in items]
+    seen = maybe_seen(platform, external_ids)
+    if seen is not None:
+        external_ids = [external_id for external_id, maybe in zip(external_ids, seen) if maybe]
+
+    # Uma única consulta pelas tendências já existentes do lote
+    existing = {}
+    if external_ids:
+        existing = {
+            row.external_id: row
+            for row in db.query(Trend.id, Trend.external_id, Trend.card, Trend.content_hash, *[getattr(Trend, field) for field in update_fields])
+            .filter(Trend.platform == platform, Trend.external_id.in_(external_ids))
+        }
+
+    new_items = [item for item in items if item["external_id"] not in existing] if insert_new else []
+    inserted = {}
+    if new_items:
+        # Sem frações de segundo: o DATETIME do MySQL as descartaria, e é pelo
+        # created_at que _insert_new_trends encontra as linhas sem RETURNING
+        created_at = now.replace(microsecond=0)
+        rows = [
+            dict({column: item.get(column) for column in TREND_COLUMNS},
+                 platform=platform, created_at=created_at, updated_at=now,
+                 content_hash=content_fingerprint({field: item.get(field) or 0 for field in update_fields}))
+            for item in new_items
+        ]
+        inserted = _insert_new_trends(connection, rows)
+        # Um rollback depois daqui só deixa falsos positivos no filtro
+        add_seen(platform, list(inserted))
+
+        # Linhas que outro worker inseriu no meio do caminho são tratadas como existentes
+        concurrent = [item["external_id"] for item in new_items if item["external_id"] not in inserted]
+        if concurrent:
+            logger.info(f"{len(concurrent)} tendências de {platform} inseridas por outro processo; atualizando")
+            for row in (db.query(Trend.id, Trend.external_id, Trend.card, Trend.content_hash, *[getattr(Trend, field) for field in update_fields])
+                        .filter(Trend.platform == platform, Trend.external_id.in_(concurrent))):
+                existing[row.external_id] = row
+
+    snapshots = []
+    if inserted:
+        _write_inserted(connection, platform, [item for item in new_items if item["external_id"] in inserted],
+                        inserted, now, snapshots)
+
+    updates = []
+    skipped = 0
+    for item in items:
+        row = existing.get(item["external_id"])
+        if row is None:
+            continue
+        values = {field: item.get(field) or 0 for field in update_fields}
+        fingerprint = content_fingerprint(values)
+        if fingerprint == row.content_hash:
+            # Nada mudou desde a última coleta: a linha não é reescrita
+            skipped += 1
+            continue
+        update = dict(values, trend_id=row.id, updated_at=now, content_hash=fingerprint)
+        if row.card is not None:
+            update["card"] = dict(row.card, **values)
+            if "views" in values:
+                update["card"]["views"] = format_views(values["views"])
+        updates.append(update)
+        delta = {field: values[field] - (getattr(row, field) or 0) for field in update_fields}
+        if any(delta.values()):
+            snapshots.append(dict(dict.fromkeys(SNAPSHOT_FIELDS, 0), **delta, trend_id=row.id, ts=ts))
+
+    # Um UPDATE em lote; só estatísticas mudam, então contadores e busca não são afetados.
+    # Linhas antigas sem card ficam com card NULL (o JSON None seria gravado como 'null'),
+    # para que refresh_trend_cards as encontre
+    for with_card in (True, False):
+        group = [update for update in updates if ("card" in update) == with_card]
+        if not group:
+            continue
+        values = {field: bindparam(field) for field in update_fields}
+        if with_card:
+            values["card"] = bindparam("card")
+        connection.execute(
+            table.update()
+            .where(table.c.id == bindparam("trend_id"))
+            .values(**values, updated_at=bindparam("updated_at"), content_hash=bindparam("content_hash")),
+            group,
+        )
+
+    record_trend_snapshots(db, snapshots)
+    return {"inserted": len(inserted), "updated": len(updates), "skipped": skipped}
+
+
+def _write_inserted(connection, platform, items, ids, now, snapshots):
+    """
+    Grava tags, cards, contadores, índice de busca e o primeiro ponto do
+    histórico das tendências recém-inseridas.
+    """
+    table = Trend.__table__
+    ts = to_epoch(now)
+
+    tag_names = {item["external_id"]: list(dict.fromkeys(item.get("tags") or [])) for item in items}
+    tag_ids = resolve_tag_ids(connection, [name for names in tag_names.values() for name in names])
+    tag_rows = [
+        {"trend_id": ids[external_id], "name": name, "tag_id": tag_ids.get(normalize_tag_name(name))}
+        for external_id, names in tag_names.items()
+        for name in names
+    ]
+    if tag_rows:
+        connection.execute(TrendTag.__table__.insert(), tag_rows)
+
+    # Objetos transitórios, fora da sessão, apenas para renderizar os cards
+    trends = [
+        Trend(id=ids[item["external_id"]], platform=platform,
+              **{column: item.get(column) for column in TREND_COLUMNS if column != "platform"})
+        for item in items
+    ]
+    cards = []
+    for trend in trends:
+        trend.card = trend.render_card(tag_names[trend.external_id])
+        cards.append({"trend_id": trend.id, "card": trend.card})
+    connection.execute(
+        # updated_at explícito: sem ele, o onupdate do modelo gravaria a hora atual
+        table.update().where(table.c.id == bindparam("trend_id")).values(card=bindparam("card"), updated_at=now),
+        cards,
+    )
+
+    deltas = {}
+    for trend in trends:
+        for dimension in COUNTER_DIMENSIONS:
+            key = (dimension, getattr(trend, dimension))
+            deltas[key] = deltas.get(key, 0) + 1
+    apply_counter_deltas(connection, deltas)
+
+    index_documents(connection, [trend_document(trend) for trend in trends])
+
+    snapshots.extend(snapshot_delta(trend, ts=ts) for trend in trends)
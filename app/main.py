@@ -1,13 +1,29 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, text, func
+from sqlalchemy import desc, text, func, or_, and_
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
+import base64
+import hashlib
+import itertools
+import json
 import logging
 import os
+import re
 import time
-from app.models import get_db, Trend, create_tables, SessionLocal
+from app import cache
+from app.compression import CompressionMiddleware
+from app.quota import quota_status
+from app.search import search_trend_ids
+from app.models import (
+    get_db, Trend, create_tables, SessionLocal, load_trend_cards, run_in_db_thread, read_trend_counters,
+    Tag, TagCount, TrendTag, TAG_WINDOWS, normalize_tag_name,
+    TREND_FIELD_COLUMNS, LIST_VIEW_FIELDS, trend_field_columns, load_trend_fields,
+    load_trend_history,
+)
 from app.tasks import fetch_all_trends, get_db_session
 from app.check_db import check_redis_connection
 from fastapi import BackgroundTasks
@@ -77,6 +93,90 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Respostas das rotas de leitura que podem ser servidas do cache Redis
+CACHEABLE_PATHS = re.compile(r"^/api/(trends|trends/\d+|trends/\d+/history|categories|platforms|search|tags|tags/[^/]+/trends)$")
+
+# Por quanto tempo o navegador pode reutilizar uma listagem antes de revalidá-la com If-None-Match
+LISTING_MAX_AGE = int(os.getenv("LISTING_MAX_AGE", 60))
+LISTING_CACHE_CONTROL = f"public, max-age={LISTING_MAX_AGE}, must-revalidate"
+
+def build_etag(*parts) -> str:
+    """
+    Gera um ETag fraco a partir das partes que identificam a versão da resposta.
+    É fraco porque o corpo pode ser comprimido ou reserializado sem mudar o conteúdo.
+    """
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Compara o cabeçalho If-None-Match com o ETag usando comparação fraca.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+def not_modified(etag: str) -> Response:
+    """
+    Resposta 304 sem corpo para um ETag que o cliente já possui.
+    """
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": LISTING_CACHE_CONTROL})
+
+def cache_validators(generation, path: str, query_params) -> Dict[str, str]:
+    """
+    Cabeçalhos de validação gravados junto com uma resposta em cache.
+    """
+    return {"ETag": build_etag(generation, path, sorted(query_params)), "Cache-Control": LISTING_CACHE_CONTROL}
+
+@app.middleware("http")
+async def response_cache(request: Request, call_next):
+    """
+    Middleware que serve as rotas de leitura a partir do cache Redis.
+    Um acerto é respondido aqui mesmo, sem resolver dependências nem abrir
+    sessão com o banco. Fica dentro do CORS para que as respostas em cache
+    também recebam os cabeçalhos de CORS.
+
+    Com o Redis disponível, o ETag é derivado da geração dos dados, e um
+    If-None-Match válido recebe 304 antes mesmo de consultar o cache.
+    """
+    path = request.url.path
+    if request.method != "GET" or not CACHEABLE_PATHS.match(path):
+        return await call_next(request)
+    
+    query_params = list(request.query_params.multi_items())
+    generation = await run_in_threadpool(cache.get_data_generation)
+    # As rotas usam a geração para decidir se precisam calcular o ETag pelo banco
+    request.state.data_generation = generation
+    if generation is None:
+        return await call_next(request)
+    
+    etag = build_etag(generation, path, sorted(query_params))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag)
+    
+    entry = await run_in_threadpool(cache.get_cached_response, generation, path, query_params)
+    if entry is not None:
+        headers = dict(entry["headers"], **{"X-Cache": "HIT"})
+        return Response(content=entry["body"], media_type="application/json", headers=headers)
+    
+    response = await call_next(request)
+    
+    # Só grava respostas bem-sucedidas que a rota não marcou como não cacheáveis
+    if response.status_code != 200 or "no-store" in response.headers.get("cache-control", ""):
+        return response
+    
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    validators = cache_validators(generation, path, query_params)
+    await run_in_threadpool(cache.set_cached_response, generation, path, query_params, body, validators)
+    
+    headers = {key: value for key, value in response.headers.items() if key.lower() != "content-length"}
+    headers.update(validators)
+    headers["X-Cache"] = "MISS"
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
 # Configuração de CORS
 app.add_middleware(
     CORSMiddleware,
@@ -84,8 +184,8 @@ app.add_middleware(
     allow_origin_regex=r"https://onezer00\.github\.io(\/.*)?",  # Permite qualquer caminho no domínio onezer00.github.io
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization", "Accept", "Origin", "X-Requested-With"],
-    expose_headers=["Content-Length", "Content-Type"],
+    allow_headers=["Content-Type", "Authorization", "Accept", "Origin", "X-Requested-With", "If-None-Match"],
+    expose_headers=["Content-Length", "Content-Type", "ETag"],
     max_age=86400,  # Cache por 24 horas
 )
 
@@ -144,6 +244,45 @@ async def log_requests(request: Request, call_next):
     
     return response
 
+def check_connections_after_sleep():
+    """
+    Verifica e reconecta ao banco de dados e ao Redis após um possível "adormecimento".
+    """
+    try:
+        # Importa as funções necessárias dentro do bloco try para evitar erros de importação
+        from app.models import create_tables
+        from app.tasks import check_redis_connection
+        
+        # Verifica conexão com o banco de dados usando uma função mais simples
+        try:
+            from app.models import check_db_connection
+            db_ok = check_db_connection()
+            if not db_ok:
+                logger.warning("Reconectando ao banco de dados após 'adormecimento'...")
+                try:
+                    create_tables()
+                    logger.info("Reconexão ao banco de dados bem-sucedida!")
+                except Exception as e:
+                    logger.error(f"Erro ao reconectar ao banco de dados: {str(e)}")
+        except ImportError:
+            # Se a função check_db_connection não existir, tenta uma abordagem alternativa
+            logger.warning("Função check_db_connection não encontrada. Usando abordagem alternativa.")
+            try:
+                create_tables()
+                logger.info("Tabelas verificadas/criadas com sucesso.")
+            except Exception as e:
+                logger.error(f"Erro ao verificar/criar tabelas: {str(e)}")
+        
+        # Verifica conexão com o Redis
+        try:
+            redis_ok = check_redis_connection(verbose=False)
+            redis_status = "connected" if redis_ok else "disconnected"
+        except Exception as e:
+            logger.error(f"Erro ao verificar status do Redis: {str(e)}")
+            redis_status = "error"
+    except Exception as e:
+        logger.error(f"Erro ao verificar conexões após 'adormecimento': {str(e)}")
+
 # Middleware para lidar com o "adormecimento" no plano Free
 @app.middleware("http")
 async def handle_free_tier_sleep(request: Request, call_next):
@@ -165,43 +304,15 @@ async def handle_free_tier_sleep(request: Request, call_next):
     if process_time > 5:
         logger.warning(f"Requisição demorada ({process_time:.2f}s). Verificando conexões após possível 'adormecimento'.")
         
-        try:
-            # Importa as funções necessárias dentro do bloco try para evitar erros de importação
-            from app.models import create_tables
-            from app.tasks import check_redis_connection
-            
-            # Verifica conexão com o banco de dados usando uma função mais simples
-            try:
-                from app.models import check_db_connection
-                db_ok = check_db_connection()
-                if not db_ok:
-                    logger.warning("Reconectando ao banco de dados após 'adormecimento'...")
-                    try:
-                        create_tables()
-                        logger.info("Reconexão ao banco de dados bem-sucedida!")
-                    except Exception as e:
-                        logger.error(f"Erro ao reconectar ao banco de dados: {str(e)}")
-            except ImportError:
-                # Se a função check_db_connection não existir, tenta uma abordagem alternativa
-                logger.warning("Função check_db_connection não encontrada. Usando abordagem alternativa.")
-                try:
-                    create_tables()
-                    logger.info("Tabelas verificadas/criadas com sucesso.")
-                except Exception as e:
-                    logger.error(f"Erro ao verificar/criar tabelas: {str(e)}")
-            
-            # Verifica conexão com o Redis
-            try:
-                redis_ok = check_redis_connection(verbose=False)
-                redis_status = "connected" if redis_ok else "disconnected"
-            except Exception as e:
-                logger.error(f"Erro ao verificar status do Redis: {str(e)}")
-                redis_status = "error"
-        except Exception as e:
-            logger.error(f"Erro ao verificar conexões após 'adormecimento': {str(e)}")
+        # As verificações fazem I/O bloqueante; rodam fora do event loop
+        await run_in_db_thread(check_connections_after_sleep)
     
     return response
 
+# Compressão das respostas; adicionada por último para ser o middleware mais
+# externo e comprimir o corpo final, já com os cabeçalhos de CORS e de cache
+app.add_middleware(CompressionMiddleware)
+
 # Rotas da API
 @app.get("/")
 def read_root():
@@ -230,79 +341,406 @@ def cors_test(request: Request):
         "timestamp": datetime.now().isoformat()
     }
 
+# Ordenações das listagens: coluna da chave (coluna, id), em ordem decrescente,
+# sempre com um índice correspondente em trends
+TREND_SORT_COLUMNS = {
+    "recent": Trend.created_at,
+    "trending": Trend.trending_score,
+}
+
+
+def encode_trends_cursor(trend, sort: str = "recent") -> str:
+    """
+    Gera o cursor opaco que aponta para a posição logo após `trend`.
+    O cursor codifica a chave de ordenação (created_at ou trending_score, id)
+    da última linha da página.
+    """
+    if sort == "trending":
+        payload = json.dumps({"score": trend.trending_score, "id": trend.id})
+    else:
+        payload = json.dumps({"created_at": trend.created_at.isoformat(), "id": trend.id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_trends_cursor(cursor: str, sort: str = "recent"):
+    """
+    Decodifica um cursor gerado por `encode_trends_cursor` com a mesma ordenação.
+
+    Returns:
+        tuple: (created_at ou trending_score, id) da última linha da página anterior.
+
+    Raises:
+        HTTPException: Se o cursor for inválido.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if sort == "trending":
+            return float(payload["score"]), int(payload["id"])
+        return datetime.fromisoformat(payload["created_at"]), int(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+# Quantidade máxima de tendências por requisição em /api/trends?ids=
+MULTI_GET_MAX_IDS = int(os.getenv("MULTI_GET_MAX_IDS", 100))
+
+def parse_trend_ids(ids: str) -> List[int]:
+    """
+    Converte o parâmetro `ids` em uma lista de IDs sem repetições, na ordem pedida.
+    """
+    try:
+        parsed = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="IDs inválidos")
+    parsed = list(dict.fromkeys(parsed))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="Informe ao menos um ID")
+    if len(parsed) > MULTI_GET_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MULTI_GET_MAX_IDS} IDs por requisição")
+    return parsed
+
+
+def get_trends_by_ids(request: Request, ids: List[int], db: Session) -> Dict[str, Any]:
+    """
+    Busca várias tendências por ID, na ordem pedida.
+
+    Cada tendência é procurada primeiro nas respostas em cache de
+    /api/trends/{id} (um único MGET); as que faltam são carregadas em uma
+    única consulta e gravadas no cache como respostas de detalhe.
+    """
+    generation = getattr(request.state, "data_generation", None)
+    detail_paths = [(f"/api/trends/{trend_id}", []) for trend_id in ids]
+
+    cards = {}
+    if generation is not None:
+        for trend_id, entry in zip(ids, cache.get_cached_responses(generation, detail_paths)):
+            if entry is not None:
+                cards[trend_id] = json.loads(entry["body"])["trend"]
+
+    missing = [trend_id for trend_id in ids if trend_id not in cards]
+    if missing:
+        rows = db.query(Trend.id, Trend.card).filter(Trend.id.in_(missing)).all()
+        loaded = {card["id"]: card for card in load_trend_cards(db, rows)}
+        cards.update(loaded)
+
+        if generation is not None and loaded:
+            cache.set_cached_responses(generation, [
+                (path, [], json.dumps({"trend": loaded[trend_id]}, ensure_ascii=False, separators=(",", ":")),
+                 cache_validators(generation, path, []))
+                for trend_id, (path, _) in zip(ids, detail_paths) if trend_id in loaded
+            ])
+
+    return {
+        "trends": [cards[trend_id] for trend_id in ids if trend_id in cards],
+        "missing": [trend_id for trend_id in ids if trend_id not in cards],
+    }
+
+
+def parse_trend_fields(fields: Optional[str], view: str):
+    """
+    Resolve a projeção pedida em `fields` (ou pela visão `list`).
+
+    Returns:
+        list: Campos a retornar, ou None para o card completo.
+    """
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        invalid = [field for field in requested if field not in TREND_FIELD_COLUMNS]
+        if invalid or not requested:
+            raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalid) or fields}")
+        return list(dict.fromkeys(requested))
+    if view == "list":
+        return LIST_VIEW_FIELDS
+    return None
+
+
 @app.get("/api/trends")
 def get_trends(
+    request: Request,
+    response: Response,
     platform: Optional[str] = Query(None, description="Filtrar por plataforma: twitter, youtube, reddit"),
     category: Optional[str] = Query(None, description="Filtrar por categoria"),
     limit: int = Query(1000, description="Número máximo de resultados", ge=1, le=1000),
     skip: int = Query(0, description="Número de resultados a pular", ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor opaco retornado em next_cursor (paginação por chave)"),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,title,views)"),
+    view: str = Query("full", regex="^(full|list)$", description="full: card completo; list: card sem a descrição"),
+    ids: Optional[str] = Query(None, description=f"IDs separados por vírgula (máx. {MULTI_GET_MAX_IDS}); retorna as tendências nessa ordem"),
+    sort: str = Query("recent", regex="^(recent|trending)$", description="recent: mais recentes; trending: maior momento (trending_score)"),
     db: Session = Depends(get_db)
 ):
     """
-    Retorna as tendências mais recentes.
+    Retorna as tendências mais recentes ou, com `sort=trending`, as de maior
+    momento (trending_score pré-calculado após cada coleta).
     Pode ser filtrado por plataforma e categoria.
+
+    A paginação pode ser feita com `skip` ou, de forma estável e com custo
+    constante por página, com o `cursor` retornado em `next_cursor`.
+
+    A resposta traz um ETag; um If-None-Match igual recebe 304 sem que
+    nenhuma tendência seja carregada ou serializada.
+
+    Com `ids`, retorna as tendências pedidas, na ordem pedida, em uma única
+    requisição (os demais parâmetros são ignorados).
+
+    Com `fields` ou `view=list`, apenas as colunas dos campos pedidos são lidas
+    do banco, em vez do card completo.
     """
+    if ids is not None:
+        return get_trends_by_ids(request, parse_trend_ids(ids), db)
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Use skip ou cursor, não ambos")
+    after = decode_trends_cursor(cursor, sort) if cursor else None
+    projection = parse_trend_fields(fields, view)
+
     try:
-        # Consulta base
-        query = db.query(Trend).order_by(desc(Trend.created_at))
-        
         # Filtros
+        filters = []
         if platform:
-            query = query.filter(Trend.platform == platform)
+            filters.append(Trend.platform == platform)
         if category:
-            query = query.filter(Trend.category == category)
+            filters.append(Trend.category == category)
+        
+        # Sem a geração dos dados no Redis, o ETag vem da contagem e da última atualização do filtro;
+        # em sort=trending, também da soma dos scores, que o recálculo muda sem tocar o updated_at
+        if getattr(request.state, "data_generation", None) is None:
+            aggregates = [func.count(Trend.id), func.max(Trend.updated_at)]
+            if sort == "trending":
+                aggregates.append(func.sum(Trend.trending_score))
+            version = db.query(*aggregates).filter(*filters).one()
+            etag = build_etag(*version, sorted(request.query_params.multi_items()))
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return not_modified(etag)
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = LISTING_CACHE_CONTROL
+        
+        # Consulta base: os cards pré-renderizados (ou só as colunas da projeção),
+        # ordenados pela chave (created_at ou trending_score, id) de um dos índices de trends
+        sort_column = TREND_SORT_COLUMNS[sort]
+        columns = [Trend.card] if projection is None else trend_field_columns(projection)
+        query = db.query(Trend.id, sort_column, *columns).filter(*filters).order_by(desc(sort_column), desc(Trend.id))
             
         # Paginação
-        trends = query.offset(skip).limit(limit).all()
+        if after:
+            after_key, after_id = after
+            query = query.filter(or_(
+                sort_column < after_key,
+                and_(sort_column == after_key, Trend.id < after_id),
+            ))
+            trends = query.limit(limit).all()
+        else:
+            trends = query.offset(skip).limit(limit).all()
+        
+        # Só há próxima página se esta veio completa
+        next_cursor = encode_trends_cursor(trends[-1], sort) if len(trends) == limit else None
         
         # Retorna os resultados
-        return {"trends": [trend.to_dict() for trend in trends]}
+        items = load_trend_cards(db, trends) if projection is None else load_trend_fields(db, trends, projection)
+        return {"trends": items, "next_cursor": next_cursor}
     except Exception as e:
         logger.error(f"Erro ao buscar tendências: {str(e)}")
+        response.headers["Cache-Control"] = "no-store"
+        if "etag" in response.headers:
+            del response.headers["ETag"]
         return {"trends": [], "error": str(e)}
 
 
+# Linhas lidas do cursor do banco por vez durante a exportação
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+@app.get("/api/trends/export")
+def export_trends(
+    platform: Optional[str] = Query(None, description="Filtrar por plataforma: twitter, youtube, reddit"),
+    category: Optional[str] = Query(None, description="Filtrar por categoria"),
+    db: Session = Depends(get_db)
+):
+    """
+    Exporta todas as tendências em NDJSON (um card JSON por linha), em ordem de id.
+
+    As linhas são lidas com um cursor no servidor (yield_per) e enviadas à
+    medida que são lidas, então a memória usada não depende do tamanho da base.
+    """
+    filters = []
+    if platform:
+        filters.append(Trend.platform == platform)
+    if category:
+        filters.append(Trend.category == category)
+
+    query = db.query(Trend.id, Trend.card).filter(*filters).order_by(Trend.id).yield_per(EXPORT_BATCH_SIZE)
+
+    def generate():
+        rows = iter(query)
+        exported = 0
+        try:
+            while True:
+                batch = list(itertools.islice(rows, EXPORT_BATCH_SIZE))
+                if not batch:
+                    break
+                lines = [json.dumps(card, ensure_ascii=False) for card in load_trend_cards(db, batch)]
+                exported += len(lines)
+                yield "\n".join(lines) + "\n"
+            logger.info(f"Exportação concluída: {exported} tendências")
+        except Exception as e:
+            # Os cabeçalhos já foram enviados; interrompe o stream para o cliente
+            # perceber que a exportação ficou incompleta
+            logger.error(f"Erro ao exportar tendências após {exported} linhas: {str(e)}")
+            raise
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
 @app.get("/api/trends/{trend_id}")
 def get_trend(trend_id: int, db: Session = Depends(get_db)):
     """
     Retorna detalhes de uma tendência específica por ID.
     """
-    trend = db.query(Trend).filter(Trend.id == trend_id).first()
-    if not trend:
+    row = db.query(Trend.id, Trend.card).filter(Trend.id == trend_id).first()
+    cards = load_trend_cards(db, [row]) if row else []
+    if not cards:
         raise HTTPException(status_code=404, detail="Tendência não encontrada")
     
-    return {"trend": trend.to_dict()}
+    return {"trend": cards[0]}
+
+
+@app.get("/api/trends/{trend_id}/history")
+def get_trend_history(trend_id: int, db: Session = Depends(get_db)):
+    """
+    Retorna o histórico de views, likes e comments de uma tendência, em ordem
+    cronológica (ts em epoch). Pontos antigos são agregados por hora e por dia.
+    """
+    points = load_trend_history(db, trend_id)
+    if not points and not db.query(Trend.id).filter(Trend.id == trend_id).first():
+        raise HTTPException(status_code=404, detail="Tendência não encontrada")
+    
+    return {"trend_id": trend_id, "points": points}
+
+
+@app.get("/api/search")
+def search_trends(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Termos da busca (título, descrição e tags)"),
+    platform: Optional[str] = Query(None, description="Filtrar por plataforma: twitter, youtube, reddit"),
+    category: Optional[str] = Query(None, description="Filtrar por categoria"),
+    limit: int = Query(20, description="Número máximo de resultados", ge=1, le=100),
+    skip: int = Query(0, description="Número de resultados a pular", ge=0),
+    db: Session = Depends(get_db)
+):
+    """
+    Busca tendências por texto, em ordem de relevância, usando o índice textual
+    (tsvector/GIN no PostgreSQL, FTS5 no SQLite).
+    """
+    try:
+        ids = search_trend_ids(db, q, platform=platform, category=category, limit=limit, skip=skip)
+        rows = db.query(Trend.id, Trend.card).filter(Trend.id.in_(ids)).all() if ids else []
+        
+        # Mantém a ordem de relevância do índice
+        position = {trend_id: index for index, trend_id in enumerate(ids)}
+        rows.sort(key=lambda row: position[row.id])
+        
+        return {"query": q, "trends": load_trend_cards(db, rows)}
+    except Exception as e:
+        logger.error(f"Erro ao buscar tendências por texto: {str(e)}")
+        response.headers["Cache-Control"] = "no-store"
+        return {"query": q, "trends": [], "error": str(e)}
+
+
+@app.get("/api/tags")
+def get_tags(
+    response: Response,
+    days: int = Query(7, description=f"Janela em dias: {', '.join(str(w) for w in TAG_WINDOWS)}"),
+    limit: int = Query(50, description="Número máximo de tags", ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna as tags mais usadas nas tendências criadas na janela informada.
+    As contagens são pré-calculadas periodicamente pela tarefa refresh_tag_counts.
+    """
+    if days not in TAG_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"Janela inválida; use uma de: {', '.join(str(w) for w in TAG_WINDOWS)}")
+
+    try:
+        rows = (db.query(Tag.name, TagCount.count, TagCount.updated_at)
+                .join(Tag, Tag.id == TagCount.tag_id)
+                .filter(TagCount.window_days == days)
+                .order_by(desc(TagCount.count), Tag.name)
+                .limit(limit)
+                .all())
+        
+        return {
+            "days": days,
+            "tags": [{"name": name, "count": count} for name, count, _ in rows],
+            "updated_at": rows[0].updated_at.isoformat() if rows else None,
+        }
+    except Exception as e:
+        logger.error(f"Erro ao buscar tags: {str(e)}")
+        response.headers["Cache-Control"] = "no-store"
+        return {"days": days, "tags": [], "error": str(e)}
+
+
+@app.get("/api/tags/{name}/trends")
+def get_tag_trends(
+    name: str,
+    limit: int = Query(50, description="Número máximo de resultados", ge=1, le=1000),
+    skip: int = Query(0, description="Número de resultados a pular", ge=0),
+    sort: str = Query("recent", regex="^(recent|trending)$", description="recent: mais recentes; trending: maior momento (trending_score)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retorna as tendências com a tag informada, das mais recentes ou, com
+    `sort=trending`, das de maior momento.
+    """
+    tag = db.query(Tag.id).filter(Tag.name == normalize_tag_name(name)).first()
+    if not tag:
+        raise HTTPException(status_code=404, detail="Tag não encontrada")
+
+    # Semi-join pelo índice (tag_id, trend_id) de trend_tags; os cards vêm pré-renderizados
+    tagged = db.query(TrendTag.trend_id).filter(TrendTag.tag_id == tag.id)
+    rows = (db.query(Trend.id, Trend.card)
+            .filter(Trend.id.in_(tagged))
+            .order_by(desc(TREND_SORT_COLUMNS[sort]), desc(Trend.id))
+            .offset(skip)
+            .limit(limit)
+            .all())
+    
+    return {"tag": normalize_tag_name(name), "trends": load_trend_cards(db, rows)}
 
 
 @app.get("/api/categories")
-def get_categories(db: Session = Depends(get_db)):
+def get_categories(response: Response, db: Session = Depends(get_db)):
     """
     Retorna as categorias disponíveis e a quantidade de tendências em cada uma.
     """
     try:
-        # Conta tendências por categoria
-        result = db.query(Trend.category, func.count(Trend.id)).group_by(Trend.category).all()
+        # Contagens mantidas incrementalmente em trend_counters
+        result = read_trend_counters(db, "category")
         
         # Formata o resultado
         return {"categories": [{"name": category, "count": count} for category, count in result]}
     except Exception as e:
         logger.error(f"Erro ao buscar categorias: {str(e)}")
+        response.headers["Cache-Control"] = "no-store"
         return {"categories": [], "error": str(e)}
 
 
 @app.get("/api/platforms")
-def get_platforms(db: Session = Depends(get_db)):
+def get_platforms(response: Response, db: Session = Depends(get_db)):
     """
     Retorna as plataformas disponíveis e a quantidade de tendências em cada uma.
     """
     try:
-        # Conta tendências por plataforma
-        result = db.query(Trend.platform, func.count(Trend.id)).group_by(Trend.platform).all()
+        # Contagens mantidas incrementalmente em trend_counters
+        result = read_trend_counters(db, "platform")
         
         # Formata o resultado
         return {"platforms": [{"name": platform, "count": count} for platform, count in result]}
     except Exception as e:
         logger.error(f"Erro ao buscar plataformas: {str(e)}")
+        response.headers["Cache-Control"] = "no-store"
         return {"platforms": [], "error": str(e)}
 
 
@@ -423,6 +861,7 @@ def get_status():
         "version": "1.0.0",
         "database": db_status,
         "redis": redis_status,
+        "quota": quota_status(),  # Orçamento restante das APIs externas
         "system_info": system_info
     }
 
@@ -448,11 +887,16 @@ async def get_database_stats(db: Session = Depends(get_db)):
     """
     Retorna estatísticas sobre o uso do banco de dados.
     Inclui tamanho total do banco, tamanho das tabelas e contagem de registros.
+
+    As consultas rodam no pool de threads do banco para não bloquear o event loop.
+    """
+    return await run_in_db_thread(collect_database_stats, db)
+
+
+def collect_database_stats(db: Session) -> Dict[str, Any]:
+    """
+    Executa as consultas de estatísticas do banco de dados (bloqueante).
     """
-    from sqlalchemy import text, func
-    from app.models import Trend
-    import os
-    
     try:
         # Detecta o tipo de banco de dados
         db_url = os.getenv("DATABASE_URL", "").lower()
@@ -492,13 +936,12 @@ async def get_database_stats(db: Session = Depends(get_db)):
         
         # Estatísticas comuns a todos os bancos
         try:
-            stats["total_trends"] = db.query(func.count(Trend.id)).scalar()
-            
-            # Contagem por plataforma
-            platform_counts = db.query(Trend.platform, func.count(Trend.id)).group_by(Trend.platform).all()
+            # Contagem por plataforma (trend_counters); o total é a soma das plataformas
+            platform_counts = read_trend_counters(db, "platform")
             stats["trends_by_platform"] = {}
             for platform, count in platform_counts:
                 stats["trends_by_platform"][platform] = count
+            stats["total_trends"] = sum(stats["trends_by_platform"].values())
                 
             # Tendência mais antiga
             oldest_trend = db.query(Trend).order_by(Trend.created_at).first()
@@ -635,9 +1078,9 @@ async def cleanup_database(
     # Verificar se o usuário tem permissão para executar esta operação
     # Em um ambiente de produção, você deve adicionar autenticação aqui
     
-    def run_cleanup():
+    async def run_cleanup():
         try:
-            result = clean_old_trends(max_days=max_days, max_records=max_records)
+            result = await run_in_db_thread(clean_old_trends, max_days=max_days, max_records=max_records)
             logger.info(f"Limpeza manual concluída: {result}")
             return result
         except Exception as e:
@@ -683,13 +1126,13 @@ def refresh_trends():
 
 
 @app.get("/api/stats", response_model=Dict[str, Any])
-async def get_stats():
+async def get_stats(db: Session = Depends(get_db)):
     """
     Alias para o endpoint /api/database/stats.
     Retorna estatísticas sobre as tendências no banco de dados.
     """
     try:
-        return await get_database_stats()
+        return await get_database_stats(db)
     except Exception as e:
         logger.error(f"Erro ao obter estatísticas do banco de dados: {str(e)}")
         # Retorna um objeto vazio estruturado quando ocorre um erro
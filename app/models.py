@@ -1,10 +1,17 @@
 import os
+import math
+import time
+import asyncio
+import functools
+import calendar
 import datetime
 import logging
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON, ForeignKey, desc, UniqueConstraint
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import create_engine, Column, Integer, BigInteger, Float, String, Text, DateTime, JSON, ForeignKey, desc, UniqueConstraint, Index, event, func, inspect
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.sql import text
+from sqlalchemy.orm import Session, sessionmaker, relationship, selectinload, column_property
+from sqlalchemy.sql import text, literal_column, bindparam
 
 # Configuração de logging
 logging.basicConfig(
@@ -85,6 +92,20 @@ except Exception as e:
 # Cria a fábrica de sessões
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Pool de threads para o acesso ao banco a partir de endpoints assíncronos.
+# Limitado para que consultas pesadas não ocupem todas as conexões do engine
+# (pool padrão de 5) nem as threads usadas pelos endpoints síncronos.
+DB_THREAD_POOL_SIZE = int(os.getenv("DB_THREAD_POOL_SIZE", 4))
+db_executor = ThreadPoolExecutor(max_workers=DB_THREAD_POOL_SIZE, thread_name_prefix="db")
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """
+    Executa uma função síncrona que acessa o banco no pool de threads do banco,
+    sem bloquear o event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(func, *args, **kwargs))
+
 # Base para os modelos declarativos
 Base = declarative_base()
 
@@ -97,13 +118,23 @@ class Trend(Base):
     # Restrição de unicidade para platform + external_id
     __table_args__ = (
         UniqueConstraint('platform', 'external_id', name='uix_platform_external_id'),
+        # Listagem filtrada ordenada por data e limite por plataforma na limpeza
+        Index('ix_trends_platform_created_at', 'platform', 'created_at'),
+        Index('ix_trends_category_created_at', 'category', 'created_at'),
+        # Chave da paginação por cursor (ORDER BY created_at DESC, id DESC) e corte por idade
+        Index('ix_trends_created_at_id', 'created_at', 'id'),
+        # Ordenação por trending_score (sort=trending), geral e filtrada
+        Index('ix_trends_trending_score_id', 'trending_score', 'id'),
+        Index('ix_trends_platform_trending_score', 'platform', 'trending_score', 'id'),
+        Index('ix_trends_category_trending_score', 'category', 'trending_score', 'id'),
     )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(Text, nullable=False)  # Usando Text para garantir suporte a títulos longos
     description = Column(Text, nullable=True)
-    platform = Column(String(50), nullable=False, index=True)  # twitter, youtube, reddit
-    category = Column(String(50), nullable=True, index=True)   # tecnologia, entretenimento, etc.
+    # active_history: o valor anterior é carregado ao alterar, para atualizar trend_counters
+    platform = column_property(Column(String(50), nullable=False, index=True), active_history=True)  # twitter, youtube, reddit
+    category = column_property(Column(String(50), nullable=True, index=True), active_history=True)   # tecnologia, entretenimento, etc.
     external_id = Column(String(255), nullable=True, index=True)  # Aumentado para 255
     author = Column(String(255), nullable=True)  # Aumentado para 255
     views = Column(Integer, default=0)
@@ -116,6 +147,9 @@ class Trend(Base):
     content = Column(JSON, nullable=True)  # Conteúdo completo em JSON
     volume = Column(Integer, default=0)  # Volume de menções, visualizações, etc.
     url = Column(Text, nullable=True)  # URL da tendência
+    card = Column(JSON, nullable=True)  # Card pré-renderizado na ingestão (ver render_card)
+    trending_score = Column(Float, nullable=False, default=0.0, server_default="0")  # Ver refresh_trending_scores
+    content_hash = Column(BigInteger, nullable=True)  # Impressão digital das estatísticas gravadas (ver content_fingerprint)
     
     # Relacionamento com tags
     tags = relationship("TrendTag", back_populates="trend", cascade="all, delete-orphan")
@@ -127,10 +161,19 @@ class Trend(Base):
         """
         Converte o modelo para um dicionário compatível com o formato esperado pelo frontend.
         """
-        time_ago = self._calculate_time_ago()
-        
-        # Obtém as tags relacionadas
-        tag_list = [tag.name for tag in self.tags]
+        return card_payload(self.render_card())
+
+    def render_card(self, tag_names=None):
+        """
+        Renderiza o card da tendência sem o campo timeAgo, que depende do momento da leitura.
+        O card guarda a data de publicação em epoch (publishedTs) para que o timeAgo
+        seja calculado na leitura sem reidratar o objeto ORM.
+
+        Args:
+            tag_names: Nomes das tags; se omitido, usa o relacionamento `tags`.
+        """
+        if tag_names is None:
+            tag_names = [tag.name for tag in self.tags]
         
         return {
             "id": self.id,
@@ -139,45 +182,149 @@ class Trend(Base):
             "platform": self.platform,
             "category": self.category,
             "author": self.author,
-            "views": f"{self.views:,}".replace(",", ".") if self.views > 1000 else str(self.views),
+            "views": format_views(self.views),
             "likes": self.likes,
             "comments": self.comments,
-            "timeAgo": time_ago,
-            "tags": tag_list,
+            "tags": list(tag_names),
             "thumbnail": self.thumbnail,
-            "url": self.url
+            "url": self.url,
+            "publishedTs": to_epoch(self.published_at),
         }
     
     def _calculate_time_ago(self):
         """
         Calcula o tempo decorrido desde a publicação em formato amigável.
         """
-        now = datetime.datetime.utcnow()
-        diff = now - self.published_at
-        
-        # Menos de 1 hora
-        if diff.total_seconds() < 3600:
-            minutes = int(diff.total_seconds() / 60)
-            return f"{minutes} {'minutos' if minutes > 1 else 'minuto'}"
-        
-        # Menos de 1 dia
-        elif diff.total_seconds() < 86400:
-            hours = int(diff.total_seconds() / 3600)
-            return f"{hours} {'horas' if hours > 1 else 'hora'}"
-        
-        # Menos de 30 dias
-        elif diff.days < 30:
-            return f"{diff.days} {'dias' if diff.days > 1 else 'dia'}"
-        
-        # Menos de 12 meses
-        elif diff.days < 365:
-            months = int(diff.days / 30)
-            return f"{months} {'meses' if months > 1 else 'mês'}"
-        
-        # Mais de 1 ano
-        else:
-            years = int(diff.days / 365)
-            return f"{years} {'anos' if years > 1 else 'ano'}"
+        return format_time_ago(time.time() - to_epoch(self.published_at))
+
+
+def to_epoch(value):
+    """
+    Converte um datetime (UTC, com ou sem fuso) para segundos desde a época.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        return int(value.timestamp())
+    return calendar.timegm(value.utctimetuple())
+
+
+def format_views(views):
+    """
+    Formata o número de visualizações com separador de milhar.
+    """
+    views = views or 0
+    return f"{views:,}".replace(",", ".") if views > 1000 else str(views)
+
+
+def format_time_ago(seconds):
+    """
+    Formata um intervalo em segundos como tempo decorrido em formato amigável.
+    """
+    days = int(seconds // 86400)
+    
+    # Menos de 1 hora
+    if seconds < 3600:
+        minutes = int(seconds / 60)
+        return f"{minutes} {'minutos' if minutes > 1 else 'minuto'}"
+    
+    # Menos de 1 dia
+    elif seconds < 86400:
+        hours = int(seconds / 3600)
+        return f"{hours} {'horas' if hours > 1 else 'hora'}"
+    
+    # Menos de 30 dias
+    elif days < 30:
+        return f"{days} {'dias' if days > 1 else 'dia'}"
+    
+    # Menos de 12 meses
+    elif days < 365:
+        months = int(days / 30)
+        return f"{months} {'meses' if months > 1 else 'mês'}"
+    
+    # Mais de 1 ano
+    else:
+        years = int(days / 365)
+        return f"{years} {'anos' if years > 1 else 'ano'}"
+
+
+def card_payload(card, now=None):
+    """
+    Monta a resposta da API a partir de um card pré-renderizado, calculando o timeAgo.
+    """
+    payload = dict(card)
+    published_ts = payload.pop("publishedTs", None)
+    now = time.time() if now is None else now
+    payload["timeAgo"] = format_time_ago(now - published_ts) if published_ts is not None else ""
+    return payload
+
+
+# Campos do card e as colunas de `trends` de onde cada um é lido na projeção
+# (fields=); as tags vêm da tabela trend_tags
+TREND_FIELD_COLUMNS = {
+    "id": (),
+    "title": ("title",),
+    "description": ("description",),
+    "platform": ("platform",),
+    "category": ("category",),
+    "author": ("author",),
+    "views": ("views",),
+    "likes": ("likes",),
+    "comments": ("comments",),
+    "timeAgo": ("published_at",),
+    "tags": (),
+    "thumbnail": ("thumbnail",),
+    "url": ("url",),
+}
+
+# Representação enxuta usada pela grade da listagem: o card sem a descrição
+LIST_VIEW_FIELDS = [field for field in TREND_FIELD_COLUMNS if field != "description"]
+
+
+def trend_field_columns(fields):
+    """
+    Retorna as colunas de `Trend` necessárias para montar os campos informados.
+    """
+    names = []
+    for field in fields:
+        for name in TREND_FIELD_COLUMNS[field]:
+            if name not in names:
+                names.append(name)
+    return [getattr(Trend, name) for name in names]
+
+
+def load_trend_fields(db, rows, fields):
+    """
+    Monta as respostas da API apenas com os campos informados, na mesma ordem,
+    a partir de linhas com `id` e as colunas de trend_field_columns(fields).
+    As tags, se pedidas, são carregadas em lotes de 500 ids.
+    """
+    tags = {}
+    if "tags" in fields:
+        ids = [row.id for row in rows]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for trend_id, name in (db.query(TrendTag.trend_id, TrendTag.name)
+                                   .filter(TrendTag.trend_id.in_(chunk))
+                                   .order_by(TrendTag.id)):
+                tags.setdefault(trend_id, []).append(name)
+
+    now = time.time()
+    items = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field == "tags":
+                item[field] = tags.get(row.id, [])
+            elif field == "views":
+                item[field] = format_views(row.views)
+            elif field == "timeAgo":
+                published_ts = to_epoch(row.published_at)
+                item[field] = format_time_ago(now - published_ts) if published_ts is not None else ""
+            else:
+                item[field] = getattr(row, field)
+        items.append(item)
+    return items
 
 
 class TrendTag(Base):
@@ -186,14 +333,135 @@ class TrendTag(Base):
     """
     __tablename__ = "trend_tags"
 
+    __table_args__ = (
+        # Carregamento das tags em lote (selectinload) e remoção por tendência
+        Index('ix_trend_tags_trend_id', 'trend_id'),
+        # Busca de tendências por tag
+        Index('ix_trend_tags_name_trend_id', 'name', 'trend_id'),
+        # Tendências de uma tag do dicionário (/api/tags/{name}/trends)
+        Index('ix_trend_tags_tag_id_trend_id', 'tag_id', 'trend_id'),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     trend_id = Column(Integer, ForeignKey("trends.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(255), nullable=False, index=True)  # Aumentado para 255
+    # Tag normalizada no dicionário; preenchida no flush a partir do nome
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), nullable=True)
     
     # Relacionamento com a tendência
     trend = relationship("Trend", back_populates="tags")
 
 
+class Tag(Base):
+    """
+    Dicionário de tags normalizadas (sem espaços nas pontas e em minúsculas).
+    """
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False, unique=True)
+
+
+class TagCount(Base):
+    """
+    Quantidade de tendências por tag em cada janela móvel (TAG_WINDOWS, em dias).
+    Pré-calculada por rebuild_tag_counts() para que /api/tags não agregue trend_tags.
+    """
+    __tablename__ = "tag_counts"
+
+    __table_args__ = (
+        # Ranking das tags de uma janela (ORDER BY count DESC)
+        Index('ix_tag_counts_window_days_count', 'window_days', 'count'),
+    )
+
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    window_days = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+# Janelas (em dias) com contagens de tags pré-calculadas
+TAG_WINDOWS = (1, 7, 30)
+
+
+def normalize_tag_name(name):
+    """
+    Normaliza o nome de uma tag para o dicionário.
+    """
+    return name.strip().lower()[:255]
+
+
+def resolve_tag_ids(connection, names):
+    """
+    Retorna {nome normalizado: id} das tags, criando no dicionário as que não existem.
+    A inserção ignora conflitos para que workers concorrentes não falhem.
+    """
+    names = {normalize_tag_name(name) for name in names if name and name.strip()}
+    if not names:
+        return {}
+
+    table = Tag.__table__
+    rows = [{"name": name} for name in sorted(names)]
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.execute(postgresql.insert(table).on_conflict_do_nothing(index_elements=[table.c.name]), rows)
+    elif dialect == "sqlite":
+        connection.execute(sqlite.insert(table).on_conflict_do_nothing(index_elements=[table.c.name]), rows)
+    elif dialect == "mysql":
+        connection.execute(table.insert().prefix_with("IGNORE"), rows)
+    else:
+        existing = {row.name for row in connection.execute(table.select().where(table.c.name.in_(names)))}
+        missing = [row for row in rows if row["name"] not in existing]
+        if missing:
+            connection.execute(table.insert(), missing)
+
+    result = connection.execute(table.select().where(table.c.name.in_(names)))
+    return {row.name: row.id for row in result}
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_tag_ids(session, flush_context, instances):
+    """
+    Associa as novas TrendTags às tags do dicionário antes de inseri-las.
+    """
+    pending = [tag for tag in session.new if isinstance(tag, TrendTag) and tag.tag_id is None and tag.name]
+    if not pending:
+        return
+
+    tag_ids = resolve_tag_ids(session.connection(), [tag.name for tag in pending])
+    for tag in pending:
+        tag.tag_id = tag_ids.get(normalize_tag_name(tag.name))
+
+
+def rebuild_tag_counts(db, now=None):
+    """
+    Recalcula as contagens de tendências por tag em cada janela de TAG_WINDOWS,
+    considerando a data de criação das tendências. A chamada é responsável pelo commit.
+
+    Returns:
+        dict: {janela: quantidade de tags com contagem}
+    """
+    now = now or datetime.datetime.utcnow()
+    table = TagCount.__table__
+    summary = {}
+
+    db.query(TagCount).delete(synchronize_session=False)
+    for window_days in TAG_WINDOWS:
+        since = now - datetime.timedelta(days=window_days)
+        counts = (db.query(TrendTag.tag_id, func.count(func.distinct(TrendTag.trend_id)))
+                  .join(Trend, Trend.id == TrendTag.trend_id)
+                  .filter(TrendTag.tag_id.isnot(None), Trend.created_at >= since)
+                  .group_by(TrendTag.tag_id)
+                  .all())
+        if counts:
+            db.execute(table.insert(), [
+                {"tag_id": tag_id, "window_days": window_days, "count": count, "updated_at": now}
+                for tag_id, count in counts
+            ])
+        summary[window_days] = len(counts)
+    return summary
+
+
 class AggregatedContent(Base):
     """
     Modelo para armazenar conteúdo agregado relacionado às tendências (tweets, posts, vídeos).
@@ -215,11 +483,411 @@ class AggregatedContent(Base):
     trend = relationship("Trend", back_populates="aggregated_contents")
 
 
+class TrendCounter(Base):
+    """
+    Quantidade de tendências por valor de cada dimensão (plataforma e categoria).
+
+    Mantida incrementalmente na mesma transação das inserções e remoções de
+    tendências, para que /api/categories e /api/platforms não precisem agregar
+    a tabela trends a cada requisição. rebuild_trend_counters() a reconstrói.
+    """
+    __tablename__ = "trend_counters"
+
+    dimension = Column(String(20), primary_key=True)  # platform, category
+    value = Column(String(50), primary_key=True)  # NULL_COUNTER_VALUE para valores nulos
+    count = Column(Integer, nullable=False, default=0)
+
+
+# Dimensões contadas em trend_counters (colunas de Trend)
+COUNTER_DIMENSIONS = ("platform", "category")
+
+# Valores nulos não podem fazer parte da chave primária; são gravados como string vazia
+NULL_COUNTER_VALUE = ""
+
+
+def apply_counter_deltas(connection, deltas):
+    """
+    Soma as variações {(dimensão, valor): delta} aos contadores com um upsert
+    atômico, para que workers concorrentes não percam incrementos.
+    """
+    table = TrendCounter.__table__
+    dialect = connection.dialect.name
+
+    for (dimension, value), delta in deltas.items():
+        if not delta:
+            continue
+        row = {"dimension": dimension, "value": NULL_COUNTER_VALUE if value is None else value, "count": delta}
+
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert(table).values(**row)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.dimension, table.c.value],
+                set_={"count": table.c.count + stmt.excluded["count"]},
+            )
+            connection.execute(stmt)
+        elif dialect == "mysql":
+            stmt = mysql.insert(table).values(**row)
+            connection.execute(stmt.on_duplicate_key_update(count=table.c.count + stmt.inserted["count"]))
+        else:
+            result = connection.execute(
+                table.update()
+                .where(table.c.dimension == row["dimension"], table.c.value == row["value"])
+                .values(count=table.c.count + delta)
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**row))
+
+
+def count_trends_by_dimension(db, *criteria):
+    """
+    Conta as tendências que atendem aos critérios, por valor de cada dimensão.
+
+    Returns:
+        dict: {(dimensão, valor): quantidade}
+    """
+    counts = {}
+    for dimension in COUNTER_DIMENSIONS:
+        column = getattr(Trend, dimension)
+        for value, count in db.query(column, func.count(Trend.id)).filter(*criteria).group_by(column):
+            counts[(dimension, value)] = count
+    return counts
+
+
+def decrement_trend_counters(db, *criteria):
+    """
+    Desconta dos contadores as tendências que atendem aos critérios.
+
+    Remoções em massa (Query.delete) não passam pelo flush da sessão; deve ser
+    chamada antes do delete, na mesma transação.
+    """
+    counts = count_trends_by_dimension(db, *criteria)
+    apply_counter_deltas(db.connection(), {key: -count for key, count in counts.items()})
+
+
+def rebuild_trend_counters(db):
+    """
+    Reconstrói os contadores a partir da tabela trends (reconciliação).
+    A chamada é responsável pelo commit.
+
+    Returns:
+        dict: {(dimensão, valor): quantidade} gravados
+    """
+    counts = count_trends_by_dimension(db)
+    db.query(TrendCounter).delete(synchronize_session=False)
+    db.add_all([
+        TrendCounter(dimension=dimension, value=NULL_COUNTER_VALUE if value is None else value, count=count)
+        for (dimension, value), count in counts.items()
+    ])
+    db.flush()
+    return counts
+
+
+def read_trend_counters(db, dimension):
+    """
+    Retorna [(valor, quantidade)] de uma dimensão, ignorando contagens zeradas.
+    """
+    rows = (db.query(TrendCounter.value, TrendCounter.count)
+            .filter(TrendCounter.dimension == dimension, TrendCounter.count > 0)
+            .order_by(TrendCounter.value))
+    return [(None if value == NULL_COUNTER_VALUE else value, count) for value, count in rows]
+
+
+@event.listens_for(Session, "after_flush")
+def _update_trend_counters(session, flush_context):
+    """
+    Atualiza os contadores com as tendências inseridas, removidas ou que mudaram
+    de plataforma/categoria neste flush, na mesma transação.
+    """
+    deltas = {}
+
+    def add(trend, sign, values=None):
+        for dimension in COUNTER_DIMENSIONS:
+            value = values[dimension] if values else getattr(trend, dimension)
+            deltas[(dimension, value)] = deltas.get((dimension, value), 0) + sign
+
+    for trend in session.new:
+        if isinstance(trend, Trend):
+            add(trend, 1)
+    for trend in session.deleted:
+        if isinstance(trend, Trend):
+            add(trend, -1)
+    for trend in session.dirty:
+        if not isinstance(trend, Trend):
+            continue
+        for dimension in COUNTER_DIMENSIONS:
+            history = inspect(trend).attrs[dimension].history
+            if history.added and history.deleted:
+                old, new = history.deleted[0], history.added[0]
+                deltas[(dimension, old)] = deltas.get((dimension, old), 0) - 1
+                deltas[(dimension, new)] = deltas.get((dimension, new), 0) + 1
+
+    if any(deltas.values()):
+        apply_counter_deltas(session.connection(), deltas)
+
+
+class TrendSnapshot(Base):
+    """
+    Histórico das estatísticas de uma tendência, um ponto por coleta.
+
+    Para ocupar pouco espaço, cada ponto guarda a variação (delta) de views,
+    likes e comments em relação ao ponto anterior; o primeiro ponto guarda os
+    valores absolutos, e a série completa é obtida pela soma acumulada. Coletas
+    sem variação não geram ponto. Como os deltas são somáveis, pontos antigos
+    são agregados por hora e depois por dia (downsample_trend_snapshots) sem
+    alterar os totais.
+    """
+    __tablename__ = "trend_snapshots"
+
+    # A chave (trend_id, ts) permite ler o histórico de uma tendência em um único intervalo do índice
+    trend_id = Column(Integer, ForeignKey("trends.id", ondelete="CASCADE"), primary_key=True)
+    ts = Column(Integer, primary_key=True)  # Epoch (UTC) em segundos
+    views = Column(Integer, nullable=False, default=0)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+
+
+# Estatísticas registradas no histórico (colunas de Trend e de TrendSnapshot)
+SNAPSHOT_FIELDS = ("views", "likes", "comments")
+
+# Pontos mais antigos que isso (em horas) são agregados por hora e por dia, respectivamente
+SNAPSHOT_HOURLY_AFTER_HOURS = int(os.getenv("SNAPSHOT_HOURLY_AFTER_HOURS", 48))
+SNAPSHOT_DAILY_AFTER_HOURS = int(os.getenv("SNAPSHOT_DAILY_AFTER_HOURS", 24 * 7))
+
+
+def snapshot_delta(trend, previous=None, ts=None):
+    """
+    Monta o ponto do histórico de uma tendência recém-coletada.
+
+    Args:
+        trend: Tendência com as estatísticas atuais (já com id).
+        previous: {campo: valor} antes da coleta; omitido para tendências novas.
+        ts: Momento da coleta em epoch; padrão: agora.
+
+    Returns:
+        dict: Linha de trend_snapshots, ou None se nada mudou.
+    """
+    previous = previous or {}
+    row = {
+        field: (getattr(trend, field) or 0) - (previous.get(field) or 0)
+        for field in SNAPSHOT_FIELDS
+    }
+    if previous and not any(row.values()):
+        return None
+    row["trend_id"] = trend.id
+    row["ts"] = int(ts if ts is not None else time.time())
+    return row
+
+
+def add_snapshot_deltas(connection, rows):
+    """
+    Soma os deltas às linhas de trend_snapshots com um único upsert em lote:
+    pontos na mesma chave (trend_id, ts) são somados em vez de falhar.
+    """
+    merged = {}
+    for row in rows:
+        key = (row["trend_id"], row["ts"])
+        if key in merged:
+            for field in SNAPSHOT_FIELDS:
+                merged[key][field] += row[field]
+        else:
+            merged[key] = dict(row)
+    if not merged:
+        return
+
+    table = TrendSnapshot.__table__
+    rows = list(merged.values())
+    dialect = connection.dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.trend_id, table.c.ts],
+            set_={field: table.c[field] + stmt.excluded[field] for field in SNAPSHOT_FIELDS},
+        )
+        connection.execute(stmt, rows)
+    elif dialect == "mysql":
+        stmt = mysql.insert(table)
+        connection.execute(stmt.on_duplicate_key_update(
+            **{field: table.c[field] + stmt.inserted[field] for field in SNAPSHOT_FIELDS}
+        ), rows)
+    else:
+        for row in rows:
+            result = connection.execute(
+                table.update()
+                .where(table.c.trend_id == row["trend_id"], table.c.ts == row["ts"])
+                .values(**{field: table.c[field] + row[field] for field in SNAPSHOT_FIELDS})
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**row))
+
+
+def record_trend_snapshots(db, rows):
+    """
+    Grava os pontos de histórico de uma coleta em lote (None é ignorado).
+    A chamada é responsável pelo commit.
+    """
+    add_snapshot_deltas(db.connection(), [row for row in rows if row])
+
+
+def downsample_trend_snapshots(db, now=None):
+    """
+    Agrega os pontos antigos do histórico: um ponto por dia depois de
+    SNAPSHOT_DAILY_AFTER_HOURS e um por hora depois de SNAPSHOT_HOURLY_AFTER_HOURS.
+    Cada ponto agregado fica no início do seu intervalo e soma os deltas do
+    intervalo. A chamada é responsável pelo commit.
+
+    Returns:
+        dict: Quantidade de pontos agregados em cada nível {"daily": n, "hourly": n}
+    """
+    now = int(now if now is not None else time.time())
+    connection = db.connection()
+    summary = {}
+
+    # Primeiro por dia, para que pontos já agregados por hora também sejam agregados
+    for name, bucket, age_hours in (("daily", 86400, SNAPSHOT_DAILY_AFTER_HOURS),
+                                    ("hourly", 3600, SNAPSHOT_HOURLY_AFTER_HOURS)):
+        cutoff = now - age_hours * 3600
+        cutoff -= cutoff % bucket
+        # Literal em vez de parâmetro: o PostgreSQL exige a mesma expressão no SELECT e no GROUP BY
+        offset = TrendSnapshot.ts % literal_column(str(bucket))
+        # Apenas pontos fora do início do intervalo; os que já estão nele recebem a soma
+        unaligned = (TrendSnapshot.ts < cutoff, offset != 0)
+        start = TrendSnapshot.ts - offset
+        aggregated = (db.query(TrendSnapshot.trend_id, start,
+                               *[func.sum(getattr(TrendSnapshot, field)) for field in SNAPSHOT_FIELDS])
+                      .filter(*unaligned)
+                      .group_by(TrendSnapshot.trend_id, start)
+                      .all())
+        if not aggregated:
+            summary[name] = 0
+            continue
+
+        summary[name] = db.query(TrendSnapshot).filter(*unaligned).delete(synchronize_session=False)
+        add_snapshot_deltas(connection, [
+            dict(zip(("trend_id", "ts") + SNAPSHOT_FIELDS, row)) for row in aggregated
+        ])
+    return summary
+
+
+def load_trend_history(db, trend_id):
+    """
+    Retorna a série de estatísticas de uma tendência em ordem cronológica,
+    com os valores absolutos reconstruídos a partir dos deltas.
+    """
+    rows = (db.query(TrendSnapshot.ts, TrendSnapshot.views, TrendSnapshot.likes, TrendSnapshot.comments)
+            .filter(TrendSnapshot.trend_id == trend_id)
+            .order_by(TrendSnapshot.ts))
+    totals = dict.fromkeys(SNAPSHOT_FIELDS, 0)
+    points = []
+    for row in rows:
+        for field in SNAPSHOT_FIELDS:
+            totals[field] += getattr(row, field)
+        points.append({"ts": row.ts, **totals})
+    return points
+
+
+# Pesos do engajamento no trending_score e expoente do decaimento pela idade (em horas)
+TRENDING_LIKE_WEIGHT = float(os.getenv("TRENDING_LIKE_WEIGHT", 5))
+TRENDING_COMMENT_WEIGHT = float(os.getenv("TRENDING_COMMENT_WEIGHT", 10))
+TRENDING_GRAVITY = float(os.getenv("TRENDING_GRAVITY", 1.5))
+
+# Variação relativa abaixo da qual o score armazenado não é regravado (cobre a precisão simples do FLOAT no MySQL)
+TRENDING_SCORE_TOLERANCE = 1e-6
+
+
+def compute_trending_score(views, likes, comments, published_at, now):
+    """
+    Calcula o momento de uma tendência: engajamento por hora desde a publicação,
+    com decaimento pela idade. Um post novo com pouco engajamento fica abaixo
+    de um vídeo viral de uma hora atrás, e ambos caem com o tempo.
+    """
+    engagement = (views or 0) + TRENDING_LIKE_WEIGHT * (likes or 0) + TRENDING_COMMENT_WEIGHT * (comments or 0)
+    age_hours = max((to_epoch(now) - to_epoch(published_at)) / 3600, 0) if published_at else 0
+    return max(engagement, 0) / (age_hours + 2) ** TRENDING_GRAVITY
+
+
+def refresh_trending_scores(db, now=None, batch_size=1000):
+    """
+    Recalcula o trending_score de todas as tendências, em lotes por id.
+
+    O score decai com o tempo, então é recalculado em massa após cada coleta
+    em vez de calculado na consulta: a ordenação por score fica uma leitura
+    direta do índice. Só as linhas cujo score mudou são gravadas, e o
+    updated_at é preservado: o recálculo não é uma alteração da tendência.
+    A chamada é responsável pelo commit.
+
+    Returns:
+        int: Quantidade de tendências atualizadas
+    """
+    now = now or datetime.datetime.utcnow()
+    table = Trend.__table__
+    # updated_at = updated_at impede o onupdate da coluna
+    update = (table.update()
+              .where(table.c.id == bindparam("trend_id"))
+              .values(trending_score=bindparam("score"), updated_at=table.c.updated_at))
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (db.query(Trend.id, Trend.views, Trend.likes, Trend.comments, Trend.published_at, Trend.created_at,
+                         Trend.trending_score)
+                .filter(Trend.id > last_id)
+                .order_by(Trend.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+
+        changes = []
+        for row in rows:
+            score = compute_trending_score(row.views, row.likes, row.comments, row.published_at or row.created_at, now)
+            if not math.isclose(score, row.trending_score or 0.0, rel_tol=TRENDING_SCORE_TOLERANCE):
+                changes.append({"trend_id": row.id, "score": score})
+        if changes:
+            db.execute(update, changes)
+        updated += len(changes)
+        if len(rows) < batch_size:
+            break
+        last_id = rows[-1].id
+    return updated
+
+
 # Função para criar todas as tabelas no banco de dados
 def create_tables():
     Base.metadata.create_all(bind=engine)
 
 
+def query_trends_with_tags(db):
+    """
+    Retorna uma consulta de tendências com as tags carregadas em lote.
+
+    As tags de todas as tendências da página são buscadas com SELECT ... IN,
+    evitando uma consulta extra por tendência ao chamar `to_dict()`.
+    """
+    return db.query(Trend).options(selectinload(Trend.tags))
+
+
+def load_trend_cards(db, rows):
+    """
+    Monta as respostas da API para linhas (id, card) já consultadas, na mesma ordem.
+
+    Linhas sem card pré-renderizado (anteriores à ingestão com cards ou criadas
+    fora das tarefas) são renderizadas a partir do ORM, todas em uma consulta.
+    """
+    missing_ids = [row.id for row in rows if row.card is None]
+    rendered = {}
+    if missing_ids:
+        for trend in query_trends_with_tags(db).filter(Trend.id.in_(missing_ids)):
+            rendered[trend.id] = trend.render_card()
+
+    now = time.time()
+    cards = [row.card if row.card is not None else rendered.get(row.id) for row in rows]
+    # Linhas removidas entre as duas consultas são ignoradas
+    return [card_payload(card, now) for card in cards if card is not None]
+
+
 # Função para obter uma sessão do banco de dados
 def get_db():
     db = SessionLocal()
@@ -0,0 +1,150 @@
+"""
+Orçamento compartilhado das APIs externas, contabilizado no Redis.
+
+Cada API tem um limite de unidades por janela de tempo: a cota diária da
+YouTube Data API (renovada à meia-noite do horário do Pacífico) e o limite de
+requisições por minuto do Reddit. Todos os workers reservam unidades no mesmo
+contador (INCRBY na chave da janela atual) antes de cada chamada; se a reserva
+passar do limite, ela é desfeita e a chamada não é feita. Assim as coletas
+agendadas e os disparos manuais (/api/fetch-trends, /api/trends/refresh)
+dividem o mesmo orçamento.
+
+Se o Redis estiver indisponível, as reservas são concedidas sem controle, para
+não interromper as coletas.
+"""
+import os
+import time
+import logging
+import datetime
+
+import redis
+
+from app.cache import get_redis_client
+
+# Configuração de logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+)
+logger = logging.getLogger(__name__)
+
+QUOTA_PREFIX = "trendpulse:quota"
+
+# Limite de unidades por janela (segundos). `offset` alinha a janela a um fuso:
+# a cota do YouTube vira à meia-noite do Pacífico; com o offset fixo do horário
+# padrão (UTC-8), no horário de verão o contador vira uma hora depois do
+# Google, o que só deixa a contabilidade mais conservadora.
+QUOTAS = {
+    "youtube": {
+        "limit": int(os.getenv("YOUTUBE_DAILY_QUOTA", 10000)),
+        "window": 24 * 60 * 60,
+        "offset": -8 * 60 * 60,
+    },
+    "reddit": {
+        "limit": int(os.getenv("REDDIT_REQUESTS_PER_MINUTE", 90)),
+        "window": 60,
+        "offset": 0,
+    },
+}
+
+# Após uma falha, o Redis não é consultado novamente durante este intervalo (segundos)
+REDIS_RETRY_INTERVAL = 30
+
+# Relógio usado nas janelas (substituído nos testes)
+clock = time.time
+
+_disabled_until = 0.0
+
+
+def _run(operation, default=None):
+    """
+    Executa `operation(client)` e retorna `default` se o Redis falhar.
+    """
+    global _disabled_until
+    if clock() < _disabled_until:
+        return default
+
+    try:
+        return operation(get_redis_client())
+    except (redis.RedisError, OSError, ValueError) as e:
+        _disabled_until = clock() + REDIS_RETRY_INTERVAL
+        logger.warning(f"Controle de cota indisponível (Redis): {str(e)}")
+        return default
+
+
+def quota_window(api, now=None):
+    """
+    Retorna (início, fim) da janela atual da API, em epoch.
+    """
+    config = QUOTAS[api]
+    now = clock() if now is None else now
+    shifted = now + config["offset"]
+    start = shifted - shifted % config["window"] - config["offset"]
+    return start, start + config["window"]
+
+
+def _quota_key(api, start):
+    return f"{QUOTA_PREFIX}:{api}:{int(start)}"
+
+
+def reserve_quota(api, cost=1, now=None):
+    """
+    Reserva `cost` unidades da janela atual da API antes de uma chamada.
+
+    Returns:
+        bool: True se a chamada pode ser feita (reservada, ou Redis
+        indisponível); False se o orçamento da janela acabou.
+    """
+    limit = QUOTAS[api]["limit"]
+    start, end = quota_window(api, now)
+    key = _quota_key(api, start)
+
+    def operation(client):
+        pipeline = client.pipeline()
+        pipeline.incrby(key, cost)
+        # A chave some pouco depois do fim da janela
+        pipeline.expireat(key, int(end) + 60)
+        used = pipeline.execute()[0]
+        if used > limit:
+            # Desfaz a reserva que estourou o limite
+            client.decrby(key, cost)
+            return False
+        return True
+
+    reserved = _run(operation, default=True)
+    if not reserved:
+        logger.warning(f"Orçamento da API {api} esgotado até {datetime.datetime.utcfromtimestamp(end).isoformat()} UTC")
+    return reserved
+
+
+def quota_remaining(api, now=None):
+    """
+    Retorna as unidades ainda disponíveis na janela atual, ou None se o Redis
+    estiver indisponível.
+    """
+    start, _ = quota_window(api, now)
+    used = _run(lambda client: int(client.get(_quota_key(api, start)) or 0))
+    if used is None:
+        return None
+    return max(0, QUOTAS[api]["limit"] - used)
+
+
+def quota_status(now=None):
+    """
+    Orçamento de cada API para monitoramento (/api/status).
+
+    Returns:
+        dict: {api: {"limit", "used", "remaining", "resets_at"}}; `used` e
+        `remaining` são None se o Redis estiver indisponível.
+    """
+    status = {}
+    for api, config in QUOTAS.items():
+        _, end = quota_window(api, now)
+        remaining = quota_remaining(api, now)
+        status[api] = {
+            "limit": config["limit"],
+            "used": config["limit"] - remaining if remaining is not None else None,
+            "remaining": remaining,
+            "resets_at": datetime.datetime.utcfromtimestamp(end).isoformat() + "Z",
+        }
+    return status
@@ -0,0 +1,310 @@
+"""
+Busca textual indexada sobre título, descrição e tags das tendências.
+
+O índice fica na tabela `trend_search`, criada junto com `trends`:
+- PostgreSQL: coluna tsvector (título e tags com peso A, descrição com peso B)
+  e índice GIN; ranking por ts_rank_cd.
+- SQLite: tabela virtual FTS5 com rowid igual ao id da tendência; ranking por bm25.
+
+O índice é atualizado no flush da sessão sempre que uma tendência é criada,
+removida ou tem o card, o título ou a descrição alterados, na mesma transação.
+Remoções em massa (Query.delete) devem chamar remove_from_search_index().
+"""
+import os
+import re
+import logging
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from app.models import Trend, TrendTag
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "trend_search"
+
+# Tabelas auxiliares criadas pelo FTS5; ignoradas na comparação com os modelos
+SEARCH_TABLES = {
+    SEARCH_TABLE,
+    f"{SEARCH_TABLE}_data",
+    f"{SEARCH_TABLE}_idx",
+    f"{SEARCH_TABLE}_content",
+    f"{SEARCH_TABLE}_docsize",
+    f"{SEARCH_TABLE}_config",
+}
+
+# Configuração de texto do PostgreSQL; "simple" não aplica stemming de um idioma,
+# já que o conteúdo mistura português e inglês
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "simple")
+
+# Quantidade máxima de termos considerados na consulta
+MAX_QUERY_TERMS = 10
+
+# Dialetos com índice textual; os demais usam LIKE (sem índice)
+_INDEXED_DIALECTS = ("postgresql", "sqlite")
+
+# Existência do índice por engine, verificada uma vez
+_index_available = {}
+
+
+def include_name(name, type_, parent_names):
+    """
+    Filtro do Alembic: ignora as tabelas do índice de busca, que não fazem
+    parte dos modelos por dependerem do dialeto.
+    """
+    return not (type_ == "table" and name in SEARCH_TABLES)
+
+
+def create_search_index(connection):
+    """
+    Cria a tabela do índice de busca para o dialeto da conexão, se não existir.
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            f"trend_id INTEGER PRIMARY KEY REFERENCES trends (id) ON DELETE CASCADE, "
+            f"document TSVECTOR NOT NULL)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+        ))
+    elif dialect == "sqlite":
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"title, description, tags, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+    _index_available.pop(connection.engine, None)
+
+
+def drop_search_index(connection):
+    """
+    Remove a tabela do índice de busca.
+    """
+    if connection.dialect.name in _INDEXED_DIALECTS:
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    _index_available.pop(connection.engine, None)
+
+
+@event.listens_for(Trend.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(Trend.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def search_index_available(connection):
+    """
+    Indica se o índice de busca existe no banco da conexão (bancos ainda não
+    migrados continuam funcionando, sem manter o índice).
+    """
+    engine = connection.engine
+    if engine not in _index_available:
+        dialect = connection.dialect.name
+        if dialect == "sqlite":
+            query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+        elif dialect == "postgresql":
+            query = "SELECT 1 FROM pg_tables WHERE schemaname = current_schema() AND tablename = :name"
+        else:
+            _index_available[engine] = False
+            return False
+        _index_available[engine] = connection.execute(text(query), {"name": SEARCH_TABLE}).first() is not None
+    return _index_available[engine]
+
+
+def index_documents(connection, documents):
+    """
+    Insere ou substitui documentos no índice.
+
+    Args:
+        documents: Lista de dicts com id, title, description e tags (texto).
+    """
+    if not documents or not search_index_available(connection):
+        return
+
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (trend_id, document) VALUES (:id, "
+            f"setweight(to_tsvector(CAST(:config AS regconfig), :title), 'A') || "
+            f"setweight(to_tsvector(CAST(:config AS regconfig), :tags), 'A') || "
+            f"setweight(to_tsvector(CAST(:config AS regconfig), :description), 'B')) "
+            f"ON CONFLICT (trend_id) DO UPDATE SET document = EXCLUDED.document"
+        ), [dict(document, config=SEARCH_TEXT_CONFIG) for document in documents])
+    else:
+        remove_from_search_index(connection, [document["id"] for document in documents])
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, title, description, tags) "
+            f"VALUES (:id, :title, :description, :tags)"
+        ), documents)
+
+
+def remove_from_search_index(connection, trend_ids):
+    """
+    Remove do índice os documentos das tendências informadas.
+    Deve ser chamada antes de remoções em massa de tendências.
+    """
+    if not trend_ids or not search_index_available(connection):
+        return
+
+    key = "trend_id" if connection.dialect.name == "postgresql" else "rowid"
+    for start in range(0, len(trend_ids), 500):
+        chunk = list(trend_ids[start:start + 500])
+        params = {f"id{i}": trend_id for i, trend_id in enumerate(chunk)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} IN ({placeholders})"), params)
+
+
+def trend_document(trend):
+    """
+    Monta o documento de busca de uma tendência a partir do card (que já tem as
+    tags) ou, sem card, do título e da descrição.
+    """
+    card = trend.card or {}
+    return {
+        "id": trend.id,
+        "title": card.get("title", trend.title) or "",
+        "description": card.get("description", trend.description) or "",
+        "tags": " ".join(card.get("tags", [])),
+    }
+
+
+def _document_changed(trend):
+    """
+    Indica se uma tendência alterada mudou algum texto indexado (atualizações
+    apenas de estatísticas não reindexam).
+    """
+    state = inspect(trend)
+    if state.attrs.title.history.has_changes() or state.attrs.description.history.has_changes():
+        return True
+
+    history = state.attrs.card.history
+    if not history.has_changes():
+        return False
+    if not history.deleted or not history.deleted[0]:
+        return True
+    old, new = history.deleted[0], history.added[0] if history.added else None
+    return any((old or {}).get(key) != (new or {}).get(key) for key in ("title", "description", "tags"))
+
+
+@event.listens_for(Session, "after_flush")
+def _update_search_index(session, flush_context):
+    """
+    Atualiza o índice com as tendências criadas, alteradas ou removidas neste flush.
+    """
+    documents = []
+    for trend in session.new:
+        if isinstance(trend, Trend):
+            documents.append(trend_document(trend))
+    for trend in session.dirty:
+        if isinstance(trend, Trend) and _document_changed(trend):
+            documents.append(trend_document(trend))
+    removed = [trend.id for trend in session.deleted if isinstance(trend, Trend)]
+
+    if documents or removed:
+        connection = session.connection()
+        remove_from_search_index(connection, removed)
+        index_documents(connection, documents)
+
+
+def rebuild_search_index(db, batch_size=1000):
+    """
+    Reconstrói o índice a partir das tabelas trends e trend_tags.
+    A chamada é responsável pelo commit.
+
+    Returns:
+        int: Quantidade de documentos indexados
+    """
+    connection = db.connection()
+    if not search_index_available(connection):
+        return 0
+
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    indexed = 0
+    last_id = 0
+    while True:
+        rows = (db.query(Trend.id, Trend.title, Trend.description)
+                .filter(Trend.id > last_id)
+                .order_by(Trend.id)
+                .limit(batch_size)
+                .all())
+        if not rows:
+            break
+
+        tags = {}
+        for trend_id, name in db.query(TrendTag.trend_id, TrendTag.name).filter(
+                TrendTag.trend_id.in_([row.id for row in rows])):
+            tags.setdefault(trend_id, []).append(name)
+
+        index_documents(connection, [
+            {"id": row.id, "title": row.title or "", "description": row.description or "",
+             "tags": " ".join(tags.get(row.id, []))}
+            for row in rows
+        ])
+        indexed += len(rows)
+        last_id = rows[-1].id
+    return indexed
+
+
+def query_terms(q):
+    """
+    Extrai os termos da consulta do usuário, descartando a sintaxe do motor de busca.
+    """
+    return re.findall(r"\w+", q.lower())[:MAX_QUERY_TERMS]
+
+
+def search_trend_ids(db, q, platform=None, category=None, limit=20, skip=0):
+    """
+    Busca tendências pelos termos de `q` (todos obrigatórios, com prefixo no último
+    termo para busca enquanto o usuário digita), em ordem de relevância.
+
+    Returns:
+        list: IDs das tendências encontradas, do mais relevante para o menos relevante.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return []
+
+    connection = db.connection()
+    dialect = connection.dialect.name
+    params = {"limit": limit, "skip": skip, "platform": platform, "category": category}
+    filters = ""
+    if platform:
+        filters += " AND trends.platform = :platform"
+    if category:
+        filters += " AND trends.category = :category"
+
+    if dialect == "postgresql" and search_index_available(connection):
+        params["config"] = SEARCH_TEXT_CONFIG
+        params["query"] = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+        sql = (
+            f"SELECT s.trend_id AS id FROM {SEARCH_TABLE} s "
+            f"JOIN trends ON trends.id = s.trend_id "
+            f"CROSS JOIN to_tsquery(CAST(:config AS regconfig), :query) AS q "
+            f"WHERE s.document @@ q{filters} "
+            f"ORDER BY ts_rank_cd(s.document, q) DESC, s.trend_id DESC LIMIT :limit OFFSET :skip"
+        )
+    elif dialect == "sqlite" and search_index_available(connection):
+        # Termos entre aspas: o FTS5 os trata como texto, não como operadores
+        params["query"] = " ".join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+        sql = (
+            f"SELECT {SEARCH_TABLE}.rowid AS id FROM {SEARCH_TABLE} "
+            f"JOIN trends ON trends.id = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH :query{filters} "
+            f"ORDER BY bm25({SEARCH_TABLE}, 10.0, 1.0, 10.0), {SEARCH_TABLE}.rowid DESC "
+            f"LIMIT :limit OFFSET :skip"
+        )
+    else:
+        logger.warning(f"Índice de busca indisponível para {dialect}; usando LIKE sem índice")
+        conditions = []
+        for i, term in enumerate(terms):
+            params[f"term{i}"] = f"%{term}%"
+            conditions.append(f"(LOWER(title) LIKE :term{i} OR LOWER(description) LIKE :term{i})")
+        sql = (
+            f"SELECT id FROM trends WHERE {' AND '.join(conditions)}{filters} "
+            f"ORDER BY created_at DESC, id DESC LIMIT :limit OFFSET :skip"
+        )
+
+    return [row.id for row in connection.execute(text(sql), params)]
@@ -5,10 +5,25 @@ import requests
 import requests.auth
 from datetime import datetime, timedelta
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import func, desc
-from app.models import SessionLocal, Trend, TrendTag, AggregatedContent
+from app.models import (
+    SessionLocal, Trend, TrendTag, AggregatedContent, query_trends_with_tags,
+    TrendCounter, NULL_COUNTER_VALUE, decrement_trend_counters, rebuild_trend_counters,
+    rebuild_tag_counts, TrendSnapshot,
+    downsample_trend_snapshots, refresh_trending_scores,
+)
 from app.celery_app import celery
-from celery.signals import task_prerun, task_postrun
+from celery import chord
+from app.ingestion import batches, upsert_trends
+from app.bloom import ensure_seen_filter, rebuild_seen_filter
+from app.cache import bump_data_generation, get_redis_client
+from app.quota import reserve_quota, quota_remaining
+from app.search import remove_from_search_index, rebuild_search_index
+from celery.signals import task_prerun, task_postrun, worker_process_init
 from celery.schedules import crontab
 import redis
 import gc
@@ -67,6 +82,26 @@ celery.conf.beat_schedule = {
         'schedule': crontab(day_of_week='sunday', hour=2, minute=0),  # Todo domingo às 2h da manhã
         'kwargs': {'max_days': 60, 'max_records': 5000},
     },
+    # Renderiza cards de tendências que ainda não foram pré-renderizados
+    'refresh-trend-cards-daily': {
+        'task': 'app.tasks.refresh_trend_cards',
+        'schedule': crontab(minute=30, hour=3),  # Todos os dias às 3h30
+    },
+    # Reconstrói os contadores de /api/categories e /api/platforms
+    'reconcile-trend-counters-daily': {
+        'task': 'app.tasks.reconcile_trend_counters',
+        'schedule': crontab(minute=0, hour=4),  # Todos os dias às 4h
+    },
+    # Contagens das janelas móveis de /api/tags
+    'refresh-tag-counts-hourly': {
+        'task': 'app.tasks.refresh_tag_counts',
+        'schedule': crontab(minute=15),  # A cada hora, aos 15 minutos
+    },
+    # Agregação por hora e por dia dos pontos antigos do histórico de estatísticas
+    'downsample-trend-snapshots-daily': {
+        'task': 'app.tasks.compact_trend_history',
+        'schedule': crontab(minute=45, hour=4),  # Todos os dias às 4h45
+    },
 }
 
 # Função para obter variáveis de ambiente com log
@@ -90,6 +125,52 @@ REDDIT_SECRET = get_env_var('REDDIT_SECRET')
 REDDIT_USERNAME = get_env_var('REDDIT_USERNAME')
 REDDIT_PASSWORD = get_env_var('REDDIT_PASSWORD')
 
+# Subreddits coletados (separados por vírgula) e posts por subreddit
+REDDIT_SUBREDDITS = [
+    name.strip()
+    for name in os.getenv('REDDIT_SUBREDDITS', 'popular,brasil,technology,programming,science').split(',')
+    if name.strip()
+]
+REDDIT_POSTS_PER_SUBREDDIT = int(os.getenv('REDDIT_POSTS_PER_SUBREDDIT', 20))
+# O PRAW busca as listagens em páginas de até 100 posts, uma requisição cada
+REDDIT_LISTING_PAGE_SIZE = 100
+# Listagens buscadas em paralelo; o limite da API do Reddit é por aplicação
+# (cerca de 100 requisições por minuto com OAuth), então o valor deve ser baixo
+REDDIT_MAX_WORKERS = int(os.getenv('REDDIT_MAX_WORKERS', 4))
+# Modo de coleta: "hot" baixa a listagem hot completa a cada execução; "new"
+# baixa da listagem new apenas os posts mais novos que a marca d'água do
+# subreddit (before=) e usa a hot só para atualizar score e comentários, no
+# máximo a cada REDDIT_HOT_REFRESH_MINUTES
+REDDIT_LISTING = os.getenv('REDDIT_LISTING', 'hot').lower()
+REDDIT_HOT_REFRESH_MINUTES = int(os.getenv('REDDIT_HOT_REFRESH_MINUTES', 240))
+# Sem posts novos, uma marca d'água mais velha que isto é conferida sem before=
+# (o post de referência pode ter sido removido, e aí before= nunca retorna nada)
+REDDIT_WATERMARK_MAX_AGE_HOURS = int(os.getenv('REDDIT_WATERMARK_MAX_AGE_HOURS', 24))
+# Hash do Redis com as marcas d'água por subreddit e listagem
+REDDIT_WATERMARKS_KEY = "trendpulse:reddit:watermarks"
+
+# Regiões (códigos ISO 3166-1) e categorias de vídeo coletadas do YouTube,
+# separadas por vírgula; sem categorias, usa o ranking geral de cada região
+YOUTUBE_REGIONS = [
+    code.strip().upper() for code in os.getenv('YOUTUBE_REGIONS', 'BR').split(',') if code.strip()
+]
+YOUTUBE_CATEGORY_IDS = [
+    category_id.strip() for category_id in os.getenv('YOUTUBE_CATEGORY_IDS', '').split(',') if category_id.strip()
+]
+# Tamanho máximo de página aceito por videos.list
+YOUTUBE_PAGE_SIZE = 50
+# Limite de vídeos por região (cada página custa 1 unidade da cota diária)
+YOUTUBE_MAX_VIDEOS_PER_REGION = int(os.getenv('YOUTUBE_MAX_VIDEOS_PER_REGION', 200))
+# Custo de cada chamada a videos.list na cota diária da API (ver app.quota)
+YOUTUBE_LIST_COST = 1
+# Regiões buscadas em paralelo
+YOUTUBE_MAX_WORKERS = int(os.getenv('YOUTUBE_MAX_WORKERS', 4))
+# Documento de descoberta da API do YouTube: por padrão, o que acompanha o
+# google-api-python-client; a variável aponta para uma cópia local, se preciso
+YOUTUBE_DISCOVERY_DOCUMENT = os.getenv('YOUTUBE_DISCOVERY_DOCUMENT', '')
+# Timeout (segundos) das requisições à API do YouTube
+YOUTUBE_HTTP_TIMEOUT = int(os.getenv('YOUTUBE_HTTP_TIMEOUT', 30))
+
 # Função para verificar conexão com Redis
 def check_redis_connection(verbose=True):
     """
@@ -177,6 +258,73 @@ def check_redis_before_task(task_id, task, *args, **kwargs):
     
     logger.info(f"Redis está acessível. Executando tarefa {task.name}...")
 
+# Clientes da API do YouTube reaproveitados entre execuções, por processo
+_youtube_discovery_document = None
+_youtube_clients = {}
+_youtube_clients_lock = threading.Lock()
+
+def load_youtube_discovery_document():
+    """
+    Lê (uma vez por processo) o documento de descoberta da API do YouTube,
+    do arquivo em YOUTUBE_DISCOVERY_DOCUMENT ou do que acompanha a biblioteca.
+    Nunca acessa a rede.
+    """
+    global _youtube_discovery_document
+    if _youtube_discovery_document is None:
+        if YOUTUBE_DISCOVERY_DOCUMENT:
+            with open(YOUTUBE_DISCOVERY_DOCUMENT, encoding='utf-8') as f:
+                _youtube_discovery_document = f.read()
+        else:
+            from googleapiclient.discovery_cache import get_static_doc
+            _youtube_discovery_document = get_static_doc('youtube', 'v3')
+            if _youtube_discovery_document is None:
+                raise RuntimeError("Documento de descoberta youtube v3 não encontrado na biblioteca")
+    return _youtube_discovery_document
+
+def create_youtube_client(api_key):
+    """
+    Cria um cliente da API do YouTube a partir do documento de descoberta local,
+    com um transporte HTTP próprio (httplib2.Http mantém as conexões abertas).
+    """
+    import httplib2
+    from googleapiclient.discovery import build_from_document
+    return build_from_document(
+        load_youtube_discovery_document(),
+        developerKey=api_key,
+        http=httplib2.Http(timeout=YOUTUBE_HTTP_TIMEOUT),
+    )
+
+def acquire_youtube_client(api_key):
+    """
+    Retira um cliente do pool do processo, criando um se o pool estiver vazio.
+    Os clientes não são thread-safe: devolva com release_youtube_client.
+    """
+    with _youtube_clients_lock:
+        if api_key not in _youtube_clients:
+            # Troca da chave: os clientes da chave anterior são descartados
+            _youtube_clients.clear()
+            _youtube_clients[api_key] = queue.SimpleQueue()
+        clients = _youtube_clients[api_key]
+    try:
+        return clients.get_nowait()
+    except queue.Empty:
+        return create_youtube_client(api_key)
+
+def release_youtube_client(api_key, client):
+    """
+    Devolve um cliente ao pool do processo.
+    """
+    with _youtube_clients_lock:
+        clients = _youtube_clients.get(api_key)
+    if clients is not None:
+        clients.put(client)
+
+@worker_process_init.connect
+def reset_youtube_clients(**kwargs):
+    """Descarta os clientes herdados do processo pai (conexões não sobrevivem ao fork)."""
+    with _youtube_clients_lock:
+        _youtube_clients.clear()
+
 # Sinal executado após cada tarefa
 @task_postrun.connect
 def cleanup_after_task(task_id, task, *args, **kwargs):
@@ -245,13 +393,19 @@ def setup_initial_tasks(sender, **kwargs):
     except Exception as e:
         logger.error(f"Erro ao verificar o banco de dados: {str(e)}")
 
+# Plataformas coletadas por fetch_all_trends (nome da tarefa em app.tasks)
+FETCH_ALL_PLATFORMS = ("youtube", "reddit")
+
 @celery.task
 def fetch_all_trends():
     """
     Tarefa principal que dispara a busca de tendências em todas as plataformas.
+    
+    As coletas rodam em paralelo, cada uma na fila da sua plataforma, como um
+    chord: quando todas terminam, finish_fetch_all_trends agrega o resultado e
+    faz, uma única vez, o recálculo do trending_score e a invalidação do cache.
     """
     logger.info("Iniciando busca de tendências de todas as plataformas")
-    results = {}
     
     # Verifica se o Redis está acessível
     if not check_redis_connection():
@@ -259,18 +413,13 @@ def fetch_all_trends():
         return {"error": "Redis não está acessível"}
     
     try:
-        # Busca tendências do YouTube
-        logger.info("Buscando tendências do YouTube")
-        youtube_result = fetch_youtube_trends.delay()
-        results["youtube"] = "Tarefa iniciada"
-        
-        # Busca tendências do Reddit
-        logger.info("Buscando tendências do Reddit")
-        reddit_result = fetch_reddit_trends.delay()
-        results["reddit"] = "Tarefa iniciada"
-        
-        logger.info("Todas as tarefas de busca de tendências foram iniciadas")
-        return results
+        fetchers = {"youtube": fetch_youtube_trends, "reddit": fetch_reddit_trends}
+        header = [fetchers[platform].s(finalize=False) for platform in FETCH_ALL_PLATFORMS]
+        callback = finish_fetch_all_trends.s(platforms=list(FETCH_ALL_PLATFORMS), started_at=time.time())
+        result = chord(header)(callback)
+        
+        logger.info(f"Busca de tendências iniciada em {len(header)} plataformas [{result.id}]")
+        return {"status": "Tarefas iniciadas", "platforms": list(FETCH_ALL_PLATFORMS), "task_id": result.id}
     except Exception as e:
         logger.error(f"Erro ao buscar tendências: {str(e)}")
         return {"error": str(e)}
@@ -279,14 +428,71 @@ def fetch_all_trends():
         gc.collect()
 
 @celery.task
-def fetch_youtube_trends():
+def finish_fetch_all_trends(results, platforms, started_at):
+    """
+    Callback do chord de fetch_all_trends: agrega contagens, tempos e erros
+    das coletas e finaliza a rodada uma única vez.
+    
+    Args:
+        results: Retornos das tarefas de coleta, na ordem de `platforms`.
+        started_at: Momento (epoch) em que fetch_all_trends disparou a rodada.
+    """
+    summary = {"count": 0, "skipped": 0, "platforms": {}, "errors": {}}
+    for platform, result in zip(platforms, results):
+        result = result or {}
+        summary["platforms"][platform] = result
+        if "error" in result:
+            summary["errors"][platform] = result["error"]
+            continue
+        summary["count"] += result.get("count", 0)
+        summary["skipped"] += result.get("skipped", 0)
+    
+    if len(summary["errors"]) == len(platforms):
+        summary["status"] = "error"
+    elif summary["errors"]:
+        summary["status"] = "partial"
+    else:
+        summary["status"] = "success"
+    
+    if summary["status"] != "error":
+        db = SessionLocal()
+        try:
+            # Recalcula o trending_score de todas as tendências (que decai com o tempo)
+            refresh_trending_scores(db)
+            db.commit()
+        except Exception as e:
+            # As coletas já foram gravadas: a rodada é finalizada mesmo assim, e
+            # os scores são recalculados na próxima
+            logger.error(f"Erro ao recalcular o trending_score: {str(e)}")
+        finally:
+            db.close()
+        
+        # Invalida o cache de respostas da API
+        bump_data_generation()
+    
+    summary["elapsed"] = round(time.time() - started_at, 3)
+    logger.info(
+        f"Busca de tendências concluída ({summary['status']}) em {summary['elapsed']}s: "
+        f"{summary['count']} novas, {summary['skipped']} sem mudança"
+        + (f", erros: {summary['errors']}" if summary["errors"] else "")
+    )
+    return summary
+
+@celery.task
+def fetch_youtube_trends(finalize=True):
     """
     Busca os vídeos em tendência no YouTube e salva no banco.
-    Otimizado para usar menos cotas da API:
-    - Reduzido para 10 vídeos por requisição
-    - Adicionado controle de erros melhor
-    - Cache de respostas de erro para evitar chamadas repetidas
+    Uso da cota da API:
+    - Páginas de 50 vídeos (o máximo), com snippet e estatísticas na mesma chamada
+    - Limite de vídeos por região (YOUTUBE_MAX_VIDEOS_PER_REGION)
+    - Regiões buscadas em paralelo e vídeos repetidos gravados uma vez só
+
+    
+    Args:
+        finalize: Recalcula o trending_score e invalida o cache ao final; falso
+            quando a coleta faz parte de fetch_all_trends, que finaliza a rodada.
     """
+    started = time.perf_counter()
     # Recarrega a chave da API do ambiente
     youtube_api_key = get_env_var('YOUTUBE_API_KEY')
     
@@ -301,111 +507,200 @@ def fetch_youtube_trends():
     
     logger.info("Iniciando busca de tendências do YouTube")
     
+    # Com pouca cota restante, cada região busca menos páginas (ou só as primeiras regiões)
+    regions, max_videos = youtube_region_budget(YOUTUBE_REGIONS)
+    if max_videos == 0:
+        logger.warning("Cota diária da API do YouTube esgotada; a coleta fica para a próxima execução")
+        return {"error": "Cota da API do YouTube esgotada"}
+    if len(regions) < len(YOUTUBE_REGIONS):
+        logger.warning(f"Cota da API do YouTube baixa: uma página de {', '.join(regions)} nesta coleta")
+    elif max_videos < YOUTUBE_MAX_VIDEOS_PER_REGION:
+        logger.warning(f"Cota da API do YouTube baixa: até {max_videos} vídeos por região nesta coleta")
+    
     try:
-        import requests
-        from googleapiclient.discovery import build
-        from googleapiclient.errors import HttpError
-        
-        # Cria o serviço do YouTube
-        youtube = build('youtube', 'v3', developerKey=youtube_api_key, cache_discovery=False)
-        
-        # Busca vídeos em tendência
-        request = youtube.videos().list(
-            part="snippet,statistics",
-            chart="mostPopular",
-            regionCode="BR",
-            maxResults=10
-        )
-        response = request.execute()
+        # O cliente da API (httplib2) não é thread-safe: cada região usa um
+        # cliente exclusivo, tirado do pool do processo, que só cresce até o
+        # número de threads e é reaproveitado entre execuções. O primeiro é
+        # obtido aqui, para que uma falha interrompa a tarefa
+        release_youtube_client(youtube_api_key, acquire_youtube_client(youtube_api_key))
+        
+        def fetch_region(region_code):
+            client = acquire_youtube_client(youtube_api_key)
+            try:
+                return fetch_youtube_region_items(client, region_code, YOUTUBE_CATEGORY_IDS, max_videos)
+            finally:
+                release_youtube_client(youtube_api_key, client)
+        
+        # Busca as regiões em paralelo; a gravação acontece depois, em uma única etapa
+        items = {}
+        errors = []
+        with ThreadPoolExecutor(max_workers=max(1, min(YOUTUBE_MAX_WORKERS, len(regions))),
+                                thread_name_prefix="youtube") as executor:
+            futures = [executor.submit(fetch_region, code) for code in regions]
+            for region_code, future in zip(regions, futures):
+                try:
+                    region_items = future.result()
+                except Exception as e:
+                    logger.error(f"Erro ao buscar vídeos da região {region_code}: {str(e)}")
+                    errors.append(e)
+                    continue
+                # Vídeos em alta em várias regiões são gravados uma vez só (vale a primeira região)
+                for item in region_items:
+                    items.setdefault(item["external_id"], item)
+        if errors and len(errors) == len(regions):
+            # Nenhuma região respondeu (cota esgotada, chave inválida...)
+            raise errors[0]
+        items = list(items.values())
         
-        # Processa os resultados
+        # Grava em lote: novas tendências inseridas e existentes atualizadas, um commit por lote
         db = SessionLocal()
         try:
+            # Filtro de Bloom dos itens já gravados (construído na primeira coleta)
+            ensure_seen_filter(db, "youtube")
             count = 0
-            for item in response.get('items', []):
-                # Extrai dados do vídeo
-                video_id = item['id']
-                snippet = item['snippet']
-                statistics = item.get('statistics', {})
-                
-                # Verifica se o vídeo já existe no banco
-                existing = db.query(Trend).filter(
-                    Trend.platform == 'youtube',
-                    Trend.external_id == video_id
-                ).first()
-                
-                if existing:
-                    logger.info(f"Vídeo {video_id} já existe no banco, atualizando...")
-                    # Atualiza estatísticas
-                    existing.views = int(statistics.get('viewCount', 0))
-                    existing.likes = int(statistics.get('likeCount', 0))
-                    existing.comments = int(statistics.get('commentCount', 0))
-                    existing.updated_at = datetime.now()
-                    db.commit()
-                else:
-                    # Cria nova tendência
-                    title = snippet.get('title', '')
-                    description = snippet.get('description', '')
-                    
-                    # Classifica a categoria
-                    category = classify_trend_category(title + " " + description)
-                    
-                    # Extrai hashtags
-                    tags = extract_hashtags(description)
-                    if not tags and 'tags' in snippet:
-                        tags = snippet.get('tags', [])[:10]  # Limita a 10 tags
-                    
-                    # Cria o objeto Trend
-                    trend = Trend(
-                        title=title[:255],  # Limita tamanho
-                        description=description[:1000],  # Limita tamanho
-                        platform="youtube",
-                        external_id=video_id,
-                        category=category,
-                        author=snippet.get('channelTitle', '')[:100],  # Limita tamanho
-                        url=f"https://www.youtube.com/watch?v={video_id}",
-                        thumbnail=snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
-                        views=int(statistics.get('viewCount', 0)),
-                        likes=int(statistics.get('likeCount', 0)),
-                        comments=int(statistics.get('commentCount', 0)),
-                        published_at=datetime.fromisoformat(snippet.get('publishedAt', '').replace('Z', '+00:00'))
-                    )
-                    
-                    # Adiciona a tendência ao banco
-                    db.add(trend)
-                    db.commit()
-                    
-                    # Adiciona as tags
-                    if tags:
-                        for tag_name in tags:
-                            tag = TrendTag(
-                                trend_id=trend.id,
-                                name=tag_name[:50]  # Limita tamanho
-                            )
-                            db.add(tag)
-                        db.commit()
-                    
-                    count += 1
-                    logger.info(f"Vídeo {video_id} adicionado ao banco")
+            skipped = 0
+            for batch in batches(items):
+                result = upsert_trends(db, "youtube", batch)
+                db.commit()
+                count += result["inserted"]
+                skipped += result["skipped"]
+                logger.info(f"Lote do YouTube gravado: {result['inserted']} novos, {result['updated']} atualizados, "
+                            f"{result['skipped']} sem mudança")
             
-            logger.info(f"Busca de tendências do YouTube concluída. {count} novos vídeos adicionados.")
-            return {"status": "success", "count": count}
+            if finalize:
+                # Recalcula o trending_score de todas as tendências (que decai com o tempo)
+                refresh_trending_scores(db)
+                db.commit()
+            
+            logger.info(f"Busca de tendências do YouTube concluída. {count} novos vídeos adicionados, "
+                        f"{skipped} sem mudança (não regravados).")
+            
+            if finalize:
+                # Invalida o cache de respostas da API
+                bump_data_generation()
+            return {"status": "success", "platform": "youtube", "count": count, "skipped": skipped,
+                    "elapsed": round(time.perf_counter() - started, 3)}
         
         finally:
+            # Os clientes ficam no pool; a coleta de lixo já roda em cleanup_after_task
             db.close()
-            # Limpa recursos
-            del youtube
-            gc.collect()
     
     except Exception as e:
         logger.error(f"Erro ao buscar tendências do YouTube: {str(e)}")
         return {"error": str(e)}
 
+def youtube_video_item(video):
+    """
+    Converte um vídeo retornado por videos.list em um item para upsert_trends.
+    """
+    video_id = video['id']
+    snippet = video['snippet']
+    statistics = video.get('statistics', {})
+    title = snippet.get('title', '')
+    description = snippet.get('description', '')
+    
+    # Extrai hashtags
+    tags = extract_hashtags(description)
+    if not tags and 'tags' in snippet:
+        tags = snippet.get('tags', [])[:10]  # Limita a 10 tags
+    
+    return {
+        "external_id": video_id,
+        "title": title[:255],  # Limita tamanho
+        "description": description[:1000],  # Limita tamanho
+        "category": classify_trend_category(title + " " + description),
+        "author": snippet.get('channelTitle', '')[:100],  # Limita tamanho
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "thumbnail": snippet.get('thumbnails', {}).get('high', {}).get('url', ''),
+        "views": int(statistics.get('viewCount', 0)),
+        "likes": int(statistics.get('likeCount', 0)),
+        "comments": int(statistics.get('commentCount', 0)),
+        "published_at": datetime.fromisoformat(snippet.get('publishedAt', '').replace('Z', '+00:00')),
+        "tags": [tag_name[:50] for tag_name in tags],  # Limita tamanho
+    }
+
+def youtube_region_budget(regions):
+    """
+    Distribui o que resta da cota diária do YouTube entre as regiões.
+    
+    Returns:
+        tuple: (regiões a buscar, vídeos por região). Se a cota não cobre uma
+        página por região, as primeiras regiões (a ordem de YOUTUBE_REGIONS é a
+        prioridade) recebem uma página cada. Sem controle de cota, todas as
+        regiões com YOUTUBE_MAX_VIDEOS_PER_REGION.
+    """
+    regions = list(regions)
+    remaining = quota_remaining("youtube")
+    if remaining is None:
+        return regions, YOUTUBE_MAX_VIDEOS_PER_REGION
+    pages = remaining // YOUTUBE_LIST_COST
+    if pages < len(regions):
+        return regions[:pages], YOUTUBE_PAGE_SIZE if pages else 0
+    return regions, min(YOUTUBE_MAX_VIDEOS_PER_REGION, pages // max(1, len(regions)) * YOUTUBE_PAGE_SIZE)
+
+def fetch_youtube_region_items(youtube, region_code, category_ids=None, max_videos=None):
+    """
+    Busca os vídeos mais populares de uma região, seguindo nextPageToken até
+    o limite da região, e os converte em itens para upsert_trends.
+    
+    Snippet e estatísticas vêm na mesma chamada (part="snippet,statistics"),
+    uma por página de até YOUTUBE_PAGE_SIZE vídeos. Cada página é reservada
+    na cota compartilhada antes da chamada; sem cota, a região para ali.
+    
+    Com várias categorias, o limite da região é dividido entre elas, para que
+    o ranking da primeira não ocupe o limite inteiro.
+    
+    Args:
+        youtube: Cliente da API do YouTube, de uso exclusivo durante a chamada.
+        category_ids: IDs de categorias de vídeo; vazio para o ranking geral.
+        max_videos: Limite de vídeos da região (padrão: YOUTUBE_MAX_VIDEOS_PER_REGION).
+    """
+    max_videos = max_videos or YOUTUBE_MAX_VIDEOS_PER_REGION
+    categories = category_ids or [None]
+    category_limit = -(-max_videos // len(categories))
+    items = []
+    for category_id in categories:
+        params = {"part": "snippet,statistics", "chart": "mostPopular", "regionCode": region_code}
+        if category_id:
+            params["videoCategoryId"] = category_id
+        page_token = None
+        # Limite desta categoria, sem passar do total da região
+        limit = min(category_limit, max_videos - len(items))
+        category_count = 0
+        while category_count < limit:
+            if page_token:
+                params["pageToken"] = page_token
+            params["maxResults"] = min(YOUTUBE_PAGE_SIZE, limit - category_count)
+            if not reserve_quota("youtube", YOUTUBE_LIST_COST):
+                logger.warning(f"Cota do YouTube esgotada: região {region_code} interrompida com {len(items)} vídeos")
+                return items
+            try:
+                response = youtube.videos().list(**params).execute()
+            except Exception as e:
+                # Nem toda categoria tem ranking em todas as regiões
+                logger.warning(f"Erro ao buscar a categoria {category_id} da região {region_code}: {str(e)}")
+                if category_id is None:
+                    raise
+                break
+            videos = list(response.get('items', []))[:limit - category_count]
+            items.extend(youtube_video_item(video) for video in videos)
+            category_count += len(videos)
+            page_token = response.get('nextPageToken')
+            # Página vazia encerra a listagem mesmo que venha um token
+            if not videos or not page_token:
+                break
+    logger.info(f"{len(items)} vídeos encontrados na região {region_code}")
+    return items[:max_videos]
+
 @celery.task
-def fetch_reddit_trends():
+def fetch_reddit_trends(finalize=True):
     """
     Busca os posts em tendência no Reddit e salva no banco.
+    
+    Args:
+        finalize: Ver fetch_youtube_trends.
     """
+    started = time.perf_counter()
     # Recarrega as credenciais do ambiente
     reddit_client_id = get_env_var('REDDIT_CLIENT_ID')
     reddit_secret = get_env_var('REDDIT_SECRET')
@@ -438,112 +733,237 @@ def fetch_reddit_trends():
     try:
         import praw
         
-        # Cria o cliente do Reddit
-        reddit = praw.Reddit(
-            client_id=reddit_client_id,
-            client_secret=reddit_secret,
-            username=reddit_username,
-            password=reddit_password,
-            user_agent="TrendPulse/1.0"
-        )
+        def create_client():
+            return praw.Reddit(
+                client_id=reddit_client_id,
+                client_secret=reddit_secret,
+                username=reddit_username,
+                password=reddit_password,
+                user_agent="TrendPulse/1.0"
+            )
         
-        # Subreddits populares no Brasil
-        subreddits = ["popular", "brasil", "technology", "programming", "science"]
+        # O PRAW não é thread-safe: cada busca usa um cliente exclusivo, tirado
+        # de um pool que só cresce até o número de threads. O primeiro cliente é
+        # criado aqui, para que uma configuração inválida interrompa a tarefa
+        clients = queue.SimpleQueue()
+        clients.put(create_client())
         
-        # Processa os resultados
-        db = SessionLocal()
-        try:
-            count = 0
-            for subreddit_name in subreddits:
-                logger.info(f"Buscando posts do subreddit: {subreddit_name}")
-                
+        subreddits = REDDIT_SUBREDDITS
+        incremental = REDDIT_LISTING == "new"
+        watermarks = load_reddit_watermarks() if incremental else {}
+        
+        def fetch_subreddit(subreddit_name):
+            try:
+                client = clients.get_nowait()
+            except queue.Empty:
+                client = create_client()
+            try:
+                if incremental:
+                    return fetch_subreddit_increment(client, subreddit_name, watermarks)
+                return fetch_subreddit_items(client, subreddit_name), [], {}
+            finally:
+                clients.put(client)
+        
+        # Busca as listagens em paralelo, com no máximo REDDIT_MAX_WORKERS
+        # requisições simultâneas; a gravação acontece depois, em uma única etapa
+        items = {}
+        hot_items = []
+        new_watermarks = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(REDDIT_MAX_WORKERS, len(subreddits))),
+                                thread_name_prefix="reddit") as executor:
+            futures = [executor.submit(fetch_subreddit, name) for name in subreddits]
+            for subreddit_name, future in zip(subreddits, futures):
                 try:
-                    subreddit = reddit.subreddit(subreddit_name)
-                    
-                    # Busca posts populares
-                    for post in subreddit.hot(limit=20):
-                        # Verifica se o post já existe no banco
-                        existing = db.query(Trend).filter(
-                            Trend.platform == 'reddit',
-                            Trend.external_id == post.id
-                        ).first()
-                        
-                        if existing:
-                            logger.info(f"Post {post.id} já existe no banco, atualizando...")
-                            # Atualiza estatísticas
-                            existing.views = post.score
-                            existing.comments = post.num_comments
-                            existing.updated_at = datetime.now()
-                            db.commit()
-                        else:
-                            # Cria nova tendência
-                            title = post.title
-                            
-                            # Obtém descrição formatada
-                            description = get_reddit_description(post)
-                            
-                            # Classifica a categoria
-                            category = classify_trend_category(title + " " + description)
-                            
-                            # Extrai hashtags
-                            tags = extract_hashtags(description)
-                            if not tags:
-                                # Usa flairs como tags
-                                if post.link_flair_text:
-                                    tags = [post.link_flair_text]
-                            
-                            # Obtém thumbnail
-                            thumbnail = get_reddit_thumbnail(post)
-                            
-                            # Cria o objeto Trend
-                            trend = Trend(
-                                title=title[:255],  # Limita tamanho
-                                description=description[:1000],  # Limita tamanho
-                                platform="reddit",
-                                external_id=post.id,
-                                category=category,
-                                author=str(post.author)[:100] if post.author else "deleted",  # Limita tamanho
-                                url=f"https://www.reddit.com{post.permalink}",
-                                thumbnail=thumbnail,
-                                views=post.score,
-                                likes=post.score,
-                                comments=post.num_comments,
-                                published_at=datetime.fromtimestamp(post.created_utc)
-                            )
-                            
-                            # Adiciona a tendência ao banco
-                            db.add(trend)
-                            db.commit()
-                            
-                            # Adiciona as tags
-                            if tags:
-                                for tag_name in tags:
-                                    tag = TrendTag(
-                                        trend_id=trend.id,
-                                        name=tag_name[:50]  # Limita tamanho
-                                    )
-                                    db.add(tag)
-                                db.commit()
-                            
-                            count += 1
-                            logger.info(f"Post {post.id} adicionado ao banco")
+                    subreddit_items, subreddit_hot_items, subreddit_watermarks = future.result()
                 except Exception as e:
                     logger.error(f"Erro ao processar subreddit {subreddit_name}: {str(e)}")
                     continue
+                for item in subreddit_items:
+                    items[item["external_id"]] = item
+                hot_items.extend(subreddit_hot_items)
+                new_watermarks.update(subreddit_watermarks)
+        
+        # Na coleta incremental, a hot só atualiza posts já gravados (os novos
+        # vêm da new); um post nas duas listagens fica com o score da hot
+        refreshed = {}
+        for item in hot_items:
+            if item["external_id"] in items:
+                items[item["external_id"]] = item
+            else:
+                refreshed[item["external_id"]] = item
+        items = list(items.values())
+        writes = ([(batch, True) for batch in batches(items)] +
+                  [(batch, False) for batch in batches(list(refreshed.values()))])
+        
+        # Grava em lote: novas tendências inseridas e existentes atualizadas, um commit por lote
+        db = SessionLocal()
+        try:
+            # Filtro de Bloom dos itens já gravados (construído na primeira coleta)
+            ensure_seen_filter(db, "reddit")
+            count = 0
+            skipped = 0
+            for batch, insert_new in writes:
+                # Posts existentes têm apenas score e comentários atualizados
+                result = upsert_trends(db, "reddit", batch, update_fields=("views", "comments"), insert_new=insert_new)
+                db.commit()
+                count += result["inserted"]
+                skipped += result["skipped"]
+                logger.info(f"Lote do Reddit gravado: {result['inserted']} novos, {result['updated']} atualizados, "
+                            f"{result['skipped']} sem mudança")
+            
+            if finalize:
+                # Recalcula o trending_score de todas as tendências (que decai com o tempo)
+                refresh_trending_scores(db)
+                db.commit()
+            
+            # As marcas d'água só avançam depois que os posts foram gravados
+            save_reddit_watermarks(new_watermarks)
             
-            logger.info(f"Busca de tendências do Reddit concluída. {count} novos posts adicionados.")
-            return {"status": "success", "count": count}
+            logger.info(f"Busca de tendências do Reddit concluída. {count} novos posts adicionados, "
+                        f"{skipped} sem mudança (não regravados).")
+            
+            if finalize:
+                # Invalida o cache de respostas da API
+                bump_data_generation()
+            return {"status": "success", "platform": "reddit", "count": count, "skipped": skipped,
+                    "elapsed": round(time.perf_counter() - started, 3)}
         
         finally:
             db.close()
             # Limpa recursos
-            del reddit
             gc.collect()
     
     except Exception as e:
         logger.error(f"Erro ao buscar tendências do Reddit: {str(e)}")
         return {"error": str(e)}
 
+def reddit_post_item(post):
+    """
+    Converte um post do Reddit em um item para upsert_trends.
+    """
+    title = post.title
+    
+    # Obtém descrição formatada
+    description = get_reddit_description(post)
+    
+    # Extrai hashtags
+    tags = extract_hashtags(description)
+    if not tags:
+        # Usa flairs como tags
+        if post.link_flair_text:
+            tags = [post.link_flair_text]
+    
+    return {
+        "external_id": post.id,
+        "title": title[:255],  # Limita tamanho
+        "description": description[:1000],  # Limita tamanho
+        "category": classify_trend_category(title + " " + description),
+        "author": str(post.author)[:100] if post.author else "deleted",  # Limita tamanho
+        "url": f"https://www.reddit.com{post.permalink}",
+        "thumbnail": get_reddit_thumbnail(post),
+        "views": post.score,
+        "likes": post.score,
+        "comments": post.num_comments,
+        "published_at": datetime.fromtimestamp(post.created_utc),
+        "tags": [tag_name[:50] for tag_name in tags],  # Limita tamanho
+    }
+
+def fetch_subreddit_items(reddit, subreddit_name, limit=None):
+    """
+    Busca os posts populares de um subreddit e os converte em itens para upsert_trends.
+    
+    Args:
+        reddit: Cliente do Reddit (praw.Reddit), de uso exclusivo durante a chamada.
+        limit: Quantidade de posts (padrão: REDDIT_POSTS_PER_SUBREDDIT).
+    """
+    limit = limit or REDDIT_POSTS_PER_SUBREDDIT
+    # Reserva as requisições da listagem no limite por minuto compartilhado
+    if not reserve_quota("reddit", -(-limit // REDDIT_LISTING_PAGE_SIZE)):
+        logger.warning(f"Limite de requisições do Reddit atingido: r/{subreddit_name} fica para a próxima coleta")
+        return []
+    
+    logger.info(f"Buscando posts do subreddit: {subreddit_name}")
+    return [reddit_post_item(post) for post in reddit.subreddit(subreddit_name).hot(limit=limit)]
+
+def fetch_subreddit_increment(reddit, subreddit_name, watermarks, now=None):
+    """
+    Coleta incremental de um subreddit (REDDIT_LISTING="new").
+    
+    Da listagem new vêm só os posts mais novos que a marca d'água (before=),
+    em uma requisição; a listagem hot é buscada apenas quando a última
+    atualização de score e comentários tem mais de REDDIT_HOT_REFRESH_MINUTES,
+    e seus posts só atualizam as tendências já gravadas.
+    
+    Args:
+        watermarks: Marcas d'água lidas por load_reddit_watermarks.
+    
+    Returns:
+        tuple: (itens novos, itens da hot para atualizar, marcas d'água a gravar depois dos itens)
+    """
+    now = now or time.time()
+    items = []
+    hot_items = []
+    updates = {}
+    
+    new_key = f"{subreddit_name}:new"
+    watermark = watermarks.get(new_key)
+    if reserve_quota("reddit"):
+        params = {"before": watermark["fullname"]} if watermark else {}
+        posts = list(reddit.subreddit(subreddit_name).new(limit=REDDIT_LISTING_PAGE_SIZE, params=params))
+        if watermark and not posts and now - watermark["seen_at"] > REDDIT_WATERMARK_MAX_AGE_HOURS * 3600:
+            # Nada depois da marca há muito tempo: confere a listagem sem before=,
+            # guardando só o que for mais novo que a marca
+            if reserve_quota("reddit"):
+                posts = [post for post in reddit.subreddit(subreddit_name).new(limit=REDDIT_LISTING_PAGE_SIZE)
+                         if post.created_utc > watermark["created_utc"]]
+            updates[new_key] = dict(watermark, seen_at=now)
+        if posts:
+            newest = max(posts, key=lambda post: post.created_utc)
+            updates[new_key] = {"fullname": f"t3_{newest.id}", "created_utc": newest.created_utc, "seen_at": now}
+        items.extend(reddit_post_item(post) for post in posts)
+        logger.info(f"{len(posts)} posts novos em r/{subreddit_name}")
+    else:
+        logger.warning(f"Limite de requisições do Reddit atingido: r/{subreddit_name} fica para a próxima coleta")
+        return items, hot_items, updates
+    
+    hot_key = f"{subreddit_name}:hot"
+    refreshed_at = (watermarks.get(hot_key) or {}).get("refreshed_at", 0)
+    if now - refreshed_at >= REDDIT_HOT_REFRESH_MINUTES * 60:
+        hot_items = fetch_subreddit_items(reddit, subreddit_name)
+        if hot_items:
+            updates[hot_key] = {"refreshed_at": now}
+    return items, hot_items, updates
+
+def load_reddit_watermarks():
+    """
+    Lê do Redis as marcas d'água dos subreddits ({"<subreddit>:<listagem>": dict}).
+    Sem Redis, retorna {} e a coleta volta a ser completa.
+    """
+    try:
+        raw = get_redis_client().hgetall(REDDIT_WATERMARKS_KEY)
+    except (redis.RedisError, OSError, ValueError) as e:
+        logger.warning(f"Marcas d'água do Reddit indisponíveis: {str(e)}")
+        return {}
+    watermarks = {}
+    for field, value in raw.items():
+        try:
+            watermarks[field.decode() if isinstance(field, bytes) else field] = json.loads(value)
+        except ValueError:
+            continue
+    return watermarks
+
+def save_reddit_watermarks(watermarks):
+    """
+    Grava no Redis as marcas d'água atualizadas pela coleta.
+    """
+    if not watermarks:
+        return
+    try:
+        get_redis_client().hset(REDDIT_WATERMARKS_KEY,
+                                mapping={field: json.dumps(value) for field, value in watermarks.items()})
+    except (redis.RedisError, OSError, ValueError) as e:
+        logger.warning(f"Não foi possível gravar as marcas d'água do Reddit: {str(e)}")
+
 def get_reddit_description(post):
     """
     Obtém a descrição formatada de um post do Reddit.
@@ -608,10 +1028,13 @@ def clean_old_trends(max_days=30, max_records=10000):
             # Obter IDs das tendências a serem removidas
             old_trend_ids = [trend.id for trend in old_trends]
             
-            # Remover tags associadas
+            # Remover tags, histórico e documentos do índice de busca associados
             session.query(TrendTag).filter(TrendTag.trend_id.in_(old_trend_ids)).delete(synchronize_session=False)
+            session.query(TrendSnapshot).filter(TrendSnapshot.trend_id.in_(old_trend_ids)).delete(synchronize_session=False)
+            remove_from_search_index(session.connection(), old_trend_ids)
             
-            # Remover tendências
+            # Remover tendências (descontando dos contadores na mesma transação)
+            decrement_trend_counters(session, Trend.created_at < cutoff_date)
             old_trends.delete(synchronize_session=False)
             
             session.commit()
@@ -650,10 +1073,13 @@ def clean_old_trends(max_days=30, max_records=10000):
                     # Obtém IDs das tendências a serem removidas
                     remove_ids = [trend.id for trend in to_remove]
                     
-                    # Remove tags associadas
+                    # Remove tags, histórico e documentos do índice de busca associados
                     session.query(TrendTag).filter(TrendTag.trend_id.in_(remove_ids)).delete(synchronize_session=False)
+                    session.query(TrendSnapshot).filter(TrendSnapshot.trend_id.in_(remove_ids)).delete(synchronize_session=False)
+                    remove_from_search_index(session.connection(), remove_ids)
                     
-                    # Remove tendências
+                    # Remove tendências (descontando dos contadores na mesma transação)
+                    decrement_trend_counters(session, Trend.platform == platform, ~Trend.id.in_(keep_ids))
                     to_remove.delete(synchronize_session=False)
                     
                     session.commit()
@@ -670,6 +1096,14 @@ def clean_old_trends(max_days=30, max_records=10000):
         # Commit das alterações
         session.commit()
         
+        # Invalida o cache de respostas da API se algo foi removido
+        if stats["removed"] > 0:
+            bump_data_generation()
+            
+            # Reconstrói os filtros de itens vistos sem os external_ids removidos
+            for platform in set(FETCH_ALL_PLATFORMS) | {platform for (platform,) in platforms if platform}:
+                rebuild_seen_filter(session, platform)
+        
         # 3. Executar VACUUM para recuperar espaço
         try:
             session.execute("VACUUM FULL")
@@ -687,6 +1121,153 @@ def clean_old_trends(max_days=30, max_records=10000):
     finally:
         session.close()
 
+@celery.task
+def refresh_trend_cards(batch_size=500):
+    """
+    Renderiza os cards das tendências que ainda não têm card pré-renderizado
+    (por exemplo, registros anteriores à ingestão com cards).
+    
+    Args:
+        batch_size: Número de tendências renderizadas por commit (padrão: 500)
+    
+    Returns:
+        dict: Quantidade de cards renderizados
+    """
+    session = get_db_session()
+    rendered = 0
+    
+    try:
+        while True:
+            trends = (query_trends_with_tags(session)
+                      .filter(Trend.card.is_(None))
+                      .order_by(Trend.id)
+                      .limit(batch_size)
+                      .all())
+            if not trends:
+                break
+            
+            for trend in trends:
+                trend.card = trend.render_card()
+            session.commit()
+            rendered += len(trends)
+        
+        if rendered:
+            logger.info(f"{rendered} cards de tendências renderizados")
+            bump_data_generation()
+        return {"status": "success", "rendered": rendered}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erro ao renderizar cards das tendências: {e}")
+        raise
+    finally:
+        session.close()
+
+@celery.task
+def reconcile_trend_counters():
+    """
+    Reconstrói a tabela de contadores por plataforma e categoria a partir da
+    tabela trends, corrigindo qualquer divergência acumulada.
+    
+    Returns:
+        dict: Quantidade de contadores reconstruídos e divergências corrigidas
+    """
+    session = get_db_session()
+    
+    try:
+        previous = {(counter.dimension, counter.value): counter.count for counter in session.query(TrendCounter)}
+        counts = rebuild_trend_counters(session)
+        session.commit()
+        
+        current = {(dimension, NULL_COUNTER_VALUE if value is None else value): count
+                   for (dimension, value), count in counts.items()}
+        mismatches = sum(
+            1 for key in set(previous) | set(current)
+            if previous.get(key, 0) != current.get(key, 0)
+        )
+        if mismatches:
+            logger.warning(f"Reconciliação dos contadores corrigiu {mismatches} divergências")
+            bump_data_generation()
+        else:
+            logger.info("Contadores de tendências consistentes")
+        
+        return {"status": "success", "counters": len(current), "mismatches": mismatches}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erro ao reconciliar contadores de tendências: {e}")
+        raise
+    finally:
+        session.close()
+
+@celery.task
+def refresh_tag_counts():
+    """
+    Recalcula as contagens de tendências por tag nas janelas móveis usadas por /api/tags.
+    
+    Returns:
+        dict: Quantidade de tags com contagem em cada janela
+    """
+    session = get_db_session()
+    
+    try:
+        summary = rebuild_tag_counts(session)
+        session.commit()
+        logger.info(f"Contagens de tags recalculadas: {summary}")
+        bump_data_generation()
+        return {"status": "success", "windows": summary}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erro ao recalcular contagens de tags: {e}")
+        raise
+    finally:
+        session.close()
+
+@celery.task
+def rebuild_trend_search():
+    """
+    Reconstrói o índice de busca textual a partir das tabelas trends e trend_tags.
+    
+    Returns:
+        dict: Quantidade de tendências indexadas
+    """
+    session = get_db_session()
+    
+    try:
+        indexed = rebuild_search_index(session)
+        session.commit()
+        logger.info(f"Índice de busca reconstruído: {indexed} tendências indexadas")
+        bump_data_generation()
+        return {"status": "success", "indexed": indexed}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erro ao reconstruir o índice de busca: {e}")
+        raise
+    finally:
+        session.close()
+
+@celery.task
+def compact_trend_history():
+    """
+    Agrega os pontos antigos do histórico de estatísticas das tendências por hora e por dia.
+    
+    Returns:
+        dict: Quantidade de pontos agregados em cada nível
+    """
+    session = get_db_session()
+    
+    try:
+        summary = downsample_trend_snapshots(session)
+        session.commit()
+        logger.info(f"Histórico de estatísticas agregado: {summary}")
+        if any(summary.values()):
+            bump_data_generation()
+        return {"status": "success", **summary}
+    except Exception as e:
+        session.rollback()
+        logger.error(f"Erro ao agregar o histórico de estatísticas: {e}")
+        raise
+    finally:
+        session.close()
+
 def extract_hashtags(text):
     """
     Extrai hashtags do texto.
@@ -0,0 +1,81 @@
+"""Esquema inicial (trends, trend_tags, aggregated_contents)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 00:00:00
+
+Bancos criados antes das migrations (via create_tables) já possuem estas
+tabelas; nesse caso a criação é pulada e apenas a versão é registrada.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('trends'):
+        op.create_table(
+            'trends',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('title', sa.Text(), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('platform', sa.String(length=50), nullable=False),
+            sa.Column('category', sa.String(length=50), nullable=True),
+            sa.Column('external_id', sa.String(length=255), nullable=True),
+            sa.Column('author', sa.String(length=255), nullable=True),
+            sa.Column('views', sa.Integer(), nullable=True),
+            sa.Column('likes', sa.Integer(), nullable=True),
+            sa.Column('comments', sa.Integer(), nullable=True),
+            sa.Column('published_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('thumbnail', sa.Text(), nullable=True),
+            sa.Column('content', sa.JSON(), nullable=True),
+            sa.Column('volume', sa.Integer(), nullable=True),
+            sa.Column('url', sa.Text(), nullable=True),
+            sa.UniqueConstraint('platform', 'external_id', name='uix_platform_external_id'),
+        )
+        op.create_index('ix_trends_id', 'trends', ['id'])
+        op.create_index('ix_trends_platform', 'trends', ['platform'])
+        op.create_index('ix_trends_category', 'trends', ['category'])
+        op.create_index('ix_trends_external_id', 'trends', ['external_id'])
+
+    if not inspector.has_table('trend_tags'):
+        op.create_table(
+            'trend_tags',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('trend_id', sa.Integer(), sa.ForeignKey('trends.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=False),
+        )
+        op.create_index('ix_trend_tags_id', 'trend_tags', ['id'])
+        op.create_index('ix_trend_tags_name', 'trend_tags', ['name'])
+
+    if not inspector.has_table('aggregated_contents'):
+        op.create_table(
+            'aggregated_contents',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('trend_id', sa.Integer(), sa.ForeignKey('trends.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('platform', sa.String(length=50), nullable=False),
+            sa.Column('title', sa.Text(), nullable=True),
+            sa.Column('content', sa.JSON(), nullable=True),
+            sa.Column('author', sa.String(length=255), nullable=True),
+            sa.Column('likes', sa.Integer(), nullable=True),
+            sa.Column('comments', sa.Integer(), nullable=True),
+            sa.Column('views', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_aggregated_contents_id', 'aggregated_contents', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('aggregated_contents')
+    op.drop_table('trend_tags')
+    op.drop_table('trends')
@@ -0,0 +1,45 @@
+"""Índices compostos para as consultas de listagem, paginação e limpeza
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+
+- trends(platform, created_at) e trends(category, created_at): listagem filtrada
+  ordenada por data e limite de registros por plataforma em clean_old_trends
+- trends(created_at, id): paginação por cursor e corte por idade da limpeza
+- trend_tags(trend_id): carregamento das tags em lote e remoção por tendência
+- trend_tags(name, trend_id): busca de tendências por tag
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_trends_platform_created_at', 'trends', ['platform', 'created_at']),
+    ('ix_trends_category_created_at', 'trends', ['category', 'created_at']),
+    ('ix_trends_created_at_id', 'trends', ['created_at', 'id']),
+    ('ix_trend_tags_trend_id', 'trend_tags', ['trend_id']),
+    ('ix_trend_tags_name_trend_id', 'trend_tags', ['name', 'trend_id']),
+]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    for name, table, columns in INDEXES:
+        # Bancos criados por create_tables() já podem ter o índice
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,32 @@
+"""Card pré-renderizado das tendências
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+
+Os cards de registros existentes ficam nulos e são renderizados pela tarefa
+refresh_trend_cards; até lá a API os renderiza a partir do ORM.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # Bancos criados por create_tables() já podem ter a coluna
+    existing = {column['name'] for column in inspector.get_columns('trends')}
+    if 'card' not in existing:
+        op.add_column('trends', sa.Column('card', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('trends') as batch_op:
+        batch_op.drop_column('card')
@@ -0,0 +1,46 @@
+"""Contadores de tendências por plataforma e categoria
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+
+A tabela é preenchida a partir de trends; depois disso é mantida pela
+aplicação a cada inserção/remoção e reconstruída pela tarefa
+reconcile_trend_counters.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # Bancos criados por create_tables() já podem ter a tabela
+    if not inspector.has_table('trend_counters'):
+        op.create_table(
+            'trend_counters',
+            sa.Column('dimension', sa.String(length=20), nullable=False),
+            sa.Column('value', sa.String(length=50), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('dimension', 'value'),
+        )
+
+    # Reconstrói a partir de trends (valores nulos são gravados como string vazia)
+    op.execute("DELETE FROM trend_counters")
+    for dimension in ('platform', 'category'):
+        op.execute(
+            f"INSERT INTO trend_counters (dimension, value, count) "
+            f"SELECT '{dimension}', COALESCE({dimension}, ''), COUNT(id) FROM trends "
+            f"GROUP BY COALESCE({dimension}, '')"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('trend_counters')
@@ -0,0 +1,61 @@
+"""Índice de busca textual das tendências
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00
+
+- PostgreSQL: trend_search(trend_id, document tsvector) com índice GIN
+- SQLite: tabela virtual FTS5 trend_search(title, description, tags)
+
+O índice é preenchido a partir de trends e trend_tags e, depois disso,
+mantido pela aplicação (app/search.py). O backfill usa a configuração de
+texto padrão ('simple'); com outro SEARCH_TEXT_CONFIG, execute a tarefa
+rebuild_trend_search depois da migração.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS trend_search ("
+            "trend_id INTEGER PRIMARY KEY REFERENCES trends (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_trend_search_document ON trend_search USING GIN (document)")
+        op.execute("DELETE FROM trend_search")
+        op.execute(
+            "INSERT INTO trend_search (trend_id, document) "
+            "SELECT t.id, "
+            "setweight(to_tsvector('simple', coalesce(t.title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(string_agg(g.name, ' '), '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(t.description, '')), 'B') "
+            "FROM trends t LEFT JOIN trend_tags g ON g.trend_id = t.id "
+            "GROUP BY t.id, t.title, t.description"
+        )
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS trend_search USING fts5("
+            "title, description, tags, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute("DELETE FROM trend_search")
+        op.execute(
+            "INSERT INTO trend_search (rowid, title, description, tags) "
+            "SELECT t.id, coalesce(t.title, ''), coalesce(t.description, ''), "
+            "coalesce((SELECT group_concat(g.name, ' ') FROM trend_tags g WHERE g.trend_id = t.id), '') "
+            "FROM trends t"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name in ('postgresql', 'sqlite'):
+        op.execute("DROP TABLE IF EXISTS trend_search")
@@ -0,0 +1,77 @@
+"""Dicionário de tags, associação (tag_id, trend_id) e contagens por janela
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 00:00:00
+
+- tags: nomes normalizados (sem espaços nas pontas, em minúsculas)
+- trend_tags.tag_id e índice (tag_id, trend_id), preenchidos a partir dos nomes
+- tag_counts: contagens por janela, calculadas pela tarefa refresh_tag_counts
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # Bancos criados por create_tables() já podem ter as tabelas e a coluna
+    if not inspector.has_table('tags'):
+        op.create_table(
+            'tags',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name'),
+        )
+
+    if not inspector.has_table('tag_counts'):
+        op.create_table(
+            'tag_counts',
+            sa.Column('tag_id', sa.Integer(), nullable=False),
+            sa.Column('window_days', sa.Integer(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('tag_id', 'window_days'),
+        )
+        op.create_index('ix_tag_counts_window_days_count', 'tag_counts', ['window_days', 'count'])
+
+    columns = {column['name'] for column in inspector.get_columns('trend_tags')}
+    if 'tag_id' not in columns:
+        with op.batch_alter_table('trend_tags') as batch_op:
+            batch_op.add_column(sa.Column('tag_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_trend_tags_tag_id', 'tags', ['tag_id'], ['id'], ondelete='CASCADE')
+
+    indexes = {index['name'] for index in inspector.get_indexes('trend_tags')}
+    if 'ix_trend_tags_tag_id_trend_id' not in indexes:
+        op.create_index('ix_trend_tags_tag_id_trend_id', 'trend_tags', ['tag_id', 'trend_id'])
+
+    # Preenche o dicionário e a associação a partir dos nomes existentes
+    op.execute(
+        "INSERT INTO tags (name) "
+        "SELECT DISTINCT LOWER(TRIM(name)) FROM trend_tags "
+        "WHERE TRIM(name) <> '' AND LOWER(TRIM(name)) NOT IN (SELECT name FROM tags)"
+    )
+    op.execute(
+        "UPDATE trend_tags SET tag_id = "
+        "(SELECT tags.id FROM tags WHERE tags.name = LOWER(TRIM(trend_tags.name))) "
+        "WHERE tag_id IS NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_trend_tags_tag_id_trend_id', table_name='trend_tags')
+    with op.batch_alter_table('trend_tags') as batch_op:
+        batch_op.drop_constraint('fk_trend_tags_tag_id', type_='foreignkey')
+        batch_op.drop_column('tag_id')
+    op.drop_index('ix_tag_counts_window_days_count', table_name='tag_counts')
+    op.drop_table('tag_counts')
+    op.drop_table('tags')
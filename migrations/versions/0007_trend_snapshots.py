@@ -0,0 +1,56 @@
+"""Histórico das estatísticas das tendências
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 00:00:00
+
+Cada tendência existente recebe um ponto inicial com os valores atuais, para
+que os deltas gravados pelas próximas coletas partam dos valores corretos.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Bancos criados por create_tables() já podem ter a tabela
+    if not inspector.has_table('trend_snapshots'):
+        op.create_table(
+            'trend_snapshots',
+            sa.Column('trend_id', sa.Integer(), nullable=False),
+            sa.Column('ts', sa.Integer(), nullable=False),
+            sa.Column('views', sa.Integer(), nullable=False),
+            sa.Column('likes', sa.Integer(), nullable=False),
+            sa.Column('comments', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['trend_id'], ['trends.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('trend_id', 'ts'),
+        )
+
+    timestamp = "COALESCE(updated_at, created_at)"
+    # Epoch em UTC, como to_epoch(); no MySQL, UNIX_TIMESTAMP() usaria o fuso da sessão
+    if bind.dialect.name == "sqlite":
+        epoch = f"CAST(strftime('%s', {timestamp}) AS INTEGER)"
+    elif bind.dialect.name == "mysql":
+        epoch = f"TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', {timestamp})"
+    else:
+        epoch = f"CAST(EXTRACT(EPOCH FROM {timestamp}) AS INTEGER)"
+
+    op.execute(
+        f"INSERT INTO trend_snapshots (trend_id, ts, views, likes, comments) "
+        f"SELECT id, {epoch}, COALESCE(views, 0), COALESCE(likes, 0), COALESCE(comments, 0) FROM trends "
+        f"WHERE {timestamp} IS NOT NULL "
+        f"AND NOT EXISTS (SELECT 1 FROM trend_snapshots s WHERE s.trend_id = trends.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('trend_snapshots')
@@ -0,0 +1,45 @@
+"""Coluna trending_score e índices da ordenação sort=trending
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 00:00:00
+
+Os scores começam em zero e são calculados pela próxima coleta
+(refresh_trending_scores).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_trends_trending_score_id': ['trending_score', 'id'],
+    'ix_trends_platform_trending_score': ['platform', 'trending_score', 'id'],
+    'ix_trends_category_trending_score': ['category', 'trending_score', 'id'],
+}
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # Bancos criados por create_tables() já podem ter a coluna e os índices
+    columns = {column['name'] for column in inspector.get_columns('trends')}
+    if 'trending_score' not in columns:
+        op.add_column('trends', sa.Column('trending_score', sa.Float(), nullable=False, server_default='0'))
+
+    existing = {index['name'] for index in inspector.get_indexes('trends')}
+    for name, index_columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, 'trends', index_columns)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name='trends')
+    with op.batch_alter_table('trends') as batch_op:
+        batch_op.drop_column('trending_score')
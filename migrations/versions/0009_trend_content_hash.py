@@ -0,0 +1,32 @@
+"""Coluna content_hash com a impressão digital das estatísticas das tendências
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16 00:00:00
+
+Tendências existentes ficam com content_hash nulo e são regravadas uma vez,
+na próxima coleta que as encontrar.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # Bancos criados por create_tables() já podem ter a coluna
+    columns = {column['name'] for column in inspector.get_columns('trends')}
+    if 'content_hash' not in columns:
+        op.add_column('trends', sa.Column('content_hash', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('trends') as batch_op:
+        batch_op.drop_column('content_hash')
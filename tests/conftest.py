@@ -3,7 +3,8 @@ Configurações e fixtures compartilhadas para testes.
 """
 import os
 import pytest
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
@@ -55,6 +56,33 @@ def client(db_session):
         yield test_client
     app.dependency_overrides.clear()
 
+@pytest.fixture(scope="function")
+def capture_sql(db_session):
+    """
+    Captura o SQL emitido no banco de teste dentro de um bloco `with`:
+
+        with capture_sql() as statements:
+            client.get("/api/trends")
+
+    Com `selects_only=True`, guarda apenas as consultas.
+    """
+    @contextmanager
+    def capture(selects_only=False):
+        statements = []
+
+        def listener(conn, cursor, statement, parameters, context, executemany):
+            if not selects_only or statement.lstrip().upper().startswith("SELECT"):
+                statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+    return capture
+
 @pytest.fixture(scope="function")
 def sample_trends(db_session):
     """Cria tendências de exemplo para testes."""
@@ -168,4 +196,111 @@ def mock_celery(monkeypatch):
     monkeypatch.setattr(fetch_all_trends, "delay", MockTask().delay)
     monkeypatch.setattr(cleanup_database, "delay", MockTask().delay)
     
-    return MockTask() 
\ No newline at end of file
+    return MockTask()
+
+
+class FakeRedis:
+    """Implementação mínima em memória dos comandos Redis usados pela aplicação."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode("utf-8") if isinstance(value, str) else value
+        return True
+
+    def incr(self, key, amount=1):
+        value = int(self.data.get(key, 0)) + amount
+        self.data[key] = str(value).encode("utf-8")
+        return value
+
+    def incrby(self, key, amount):
+        return self.incr(key, amount)
+
+    def decrby(self, key, amount):
+        return self.incr(key, -amount)
+
+    def expireat(self, key, when):
+        return key in self.data
+
+    def exists(self, *keys):
+        return sum(1 for key in keys if key in self.data)
+
+    def rename(self, src, dst):
+        self.data[dst] = self.data.pop(src)
+        return True
+
+    def getbit(self, key, offset):
+        bits = self.data.get(key, b"")
+        byte = offset >> 3
+        return (bits[byte] >> (7 - (offset & 7))) & 1 if byte < len(bits) else 0
+
+    def setbit(self, key, offset, value):
+        bits = bytearray(self.data.get(key, b""))
+        byte = offset >> 3
+        if byte >= len(bits):
+            bits.extend(bytes(byte + 1 - len(bits)))
+        previous = (bits[byte] >> (7 - (offset & 7))) & 1
+        if value:
+            bits[byte] |= 0x80 >> (offset & 7)
+        else:
+            bits[byte] &= ~(0x80 >> (offset & 7)) & 0xFF
+        self.data[key] = bytes(bits)
+        return previous
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        hash_ = self.data.setdefault(key, {})
+        items = dict(mapping or {}, **({field: value} if field is not None else {}))
+        for name, item in items.items():
+            hash_[name.encode("utf-8")] = item.encode("utf-8") if isinstance(item, str) else item
+        return len(items)
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def ping(self):
+        return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Pipeline do FakeRedis: acumula os comandos e os executa em execute()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append((getattr(self.redis, name), args, kwargs))
+            return self
+        return command
+
+    def execute(self):
+        results = [method(*args, **kwargs) for method, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    """Substitui o cliente Redis do cache de respostas por um Redis em memória."""
+    from app import cache
+
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "_client", fake)
+    monkeypatch.setattr(cache, "_disabled_until", 0.0)
+    monkeypatch.setattr(cache, "RESPONSE_CACHE_ENABLED", True)
+    return fake
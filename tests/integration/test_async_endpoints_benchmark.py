@@ -0,0 +1,96 @@
+"""
+Benchmark de concorrência: os endpoints assíncronos de estatísticas não podem
+bloquear o event loop enquanto outras requisições estão em andamento.
+
+O custo das consultas de estatísticas em uma base grande é simulado com um
+atraso configurável (BENCHMARK_STATS_DELAY, em segundos).
+"""
+import asyncio
+import os
+import statistics
+import time
+import pytest
+import httpx
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.main as main
+from app.main import app
+from app.models import Base, Trend, get_db
+
+pytestmark = [pytest.mark.integration, pytest.mark.slow]
+
+STATS_DELAY = float(os.getenv("BENCHMARK_STATS_DELAY", 1.0))
+CONCURRENT_REQUESTS = int(os.getenv("BENCHMARK_CONCURRENT_REQUESTS", 20))
+
+
+@pytest.fixture
+def file_session_factory(tmp_path):
+    """Banco SQLite em arquivo, com uma conexão por sessão (acesso concorrente real)."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'benchmark.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    session = factory()
+    session.add_all([
+        Trend(title=f"Benchmark {i}", platform="youtube", external_id=f"bench-{i}")
+        for i in range(200)
+    ])
+    session.commit()
+    session.close()
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield factory
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_trends_requests_not_stalled_by_stats(file_session_factory):
+    """Requisições de listagem continuam sendo atendidas enquanto /api/stats executa."""
+    collect = main.collect_database_stats
+
+    def slow_collect(db):
+        time.sleep(STATS_DELAY)
+        return collect(db)
+
+    with patch("app.main.collect_database_stats", slow_collect):
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            stats_started = time.perf_counter()
+            stats_request = asyncio.create_task(client.get("/api/stats"))
+            # Garante que a requisição de estatísticas já está em execução
+            await asyncio.sleep(0.05)
+
+            async def timed_get(url):
+                started = time.perf_counter()
+                response = await client.get(url)
+                return response, time.perf_counter() - started
+
+            results = await asyncio.gather(*[
+                timed_get(f"/api/trends?limit=50&skip={i}") for i in range(CONCURRENT_REQUESTS)
+            ])
+            trends_finished = time.perf_counter() - stats_started
+
+            stats_response = await stats_request
+            stats_elapsed = time.perf_counter() - stats_started
+
+    latencies = [elapsed for _, elapsed in results]
+    print(
+        f"\n/api/stats: {stats_elapsed:.3f}s | {CONCURRENT_REQUESTS} x /api/trends concluídas em "
+        f"{trends_finished:.3f}s (mediana {statistics.median(latencies) * 1000:.1f}ms, "
+        f"máx {max(latencies) * 1000:.1f}ms)"
+    )
+
+    assert stats_response.status_code == 200
+    assert stats_response.json()["total_trends"] == 200
+    assert all(response.status_code == 200 for response, _ in results)
+    # Com o event loop bloqueado, as listagens só terminariam depois das estatísticas
+    assert trends_finished < STATS_DELAY
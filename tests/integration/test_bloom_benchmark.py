@@ -0,0 +1,110 @@
+"""
+Benchmark do filtro de Bloom dos external_ids já gravados (app.bloom).
+
+Mede a taxa de falsos positivos do filtro cheio contra o alvo
+SEEN_FILTER_FP_RATE e as consultas ao banco que a ingestão deixa de fazer
+para itens novos. Usa um SQLite em arquivo e o Redis de TEST_REDIS_URL, se
+configurada (senão, o Redis em memória dos testes). Para uma medição maior:
+
+    BENCHMARK_BLOOM_ITEMS=20000 pytest -m slow tests/integration/test_bloom_benchmark.py -s
+"""
+import os
+import time
+import pytest
+import redis
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import bloom
+from app.ingestion import batches, upsert_trends
+from app.models import Base
+from tests.conftest import FakeRedis
+
+pytestmark = [pytest.mark.integration, pytest.mark.slow]
+
+BLOOM_ITEMS = int(os.getenv("BENCHMARK_BLOOM_ITEMS", 2000))
+FP_PROBES = int(os.getenv("BENCHMARK_BLOOM_PROBES", 10000))
+
+
+def collected_items(prefix, count):
+    return [
+        {"external_id": f"{prefix}-{i}", "title": f"Bloom benchmark {i}", "category": "benchmark",
+         "views": i, "likes": 1, "comments": 1, "published_at": datetime(2024, 1, 1), "tags": []}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def bloom_redis(monkeypatch):
+    if os.getenv("TEST_REDIS_URL"):
+        client = redis.from_url(os.environ["TEST_REDIS_URL"])
+    else:
+        client = FakeRedis()
+    monkeypatch.setattr(bloom, "get_redis_client", lambda: client)
+    monkeypatch.setattr(bloom, "_disabled_until", 0.0)
+    yield client
+    client.delete(bloom.seen_filter_key("bench-bloom"))
+
+
+@pytest.fixture
+def bench_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bloom_benchmark.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_seen_filter_fp_rate_and_lookups(bench_session, bloom_redis, monkeypatch):
+    """Mede consultas evitadas na ingestão de itens novos e a taxa de falsos positivos do filtro cheio."""
+    platform = "bench-bloom"
+    monkeypatch.setattr(bloom, "SEEN_FILTER_CAPACITY", 3 * BLOOM_ITEMS)
+
+    # Itens já gravados antes das coletas medidas
+    for batch in batches(collected_items("seed", BLOOM_ITEMS)):
+        upsert_trends(bench_session, platform, batch)
+        bench_session.commit()
+
+    lookups = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "trends.content_hash" in statement:
+            # Parâmetros da consulta: a plataforma e os external_ids procurados
+            lookups.append(len(parameters) - 1)
+
+    engine = bench_session.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    results = {}
+    try:
+        for name, prefix, enabled in (("sem filtro", "plain", False), ("com filtro", "bloom", True)):
+            if enabled:
+                bloom.rebuild_seen_filter(bench_session, platform)
+            else:
+                bloom_redis.delete(bloom.seen_filter_key(platform))
+            lookups.clear()
+            started = time.perf_counter()
+            for batch in batches(collected_items(prefix, BLOOM_ITEMS)):
+                upsert_trends(bench_session, platform, batch)
+                bench_session.commit()
+            results[name] = (time.perf_counter() - started, len(lookups), sum(lookups))
+            print(f"\n{name}: {BLOOM_ITEMS / results[name][0]:.0f} itens novos/s, "
+                  f"{results[name][1]} consultas de existentes, {results[name][2]} ids procurados")
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert results["sem filtro"][1] == len(list(batches(range(BLOOM_ITEMS))))
+    assert results["sem filtro"][2] == BLOOM_ITEMS
+    # Com o filtro, só os falsos positivos são procurados no banco
+    assert results["com filtro"][2] <= 2 * bloom.SEEN_FILTER_FP_RATE * BLOOM_ITEMS
+
+    # Filtro cheio (na capacidade): a taxa medida deve ficar perto do alvo
+    assert bloom.rebuild_seen_filter(bench_session, platform) == 3 * BLOOM_ITEMS
+    probes = [f"nunca-visto-{i}" for i in range(FP_PROBES)]
+    false_positives = sum(bloom.maybe_seen(platform, probes))
+    fp_rate = false_positives / FP_PROBES
+    bits, hashes = bloom.bloom_parameters()
+    print(f"\nfiltro de {bits / 8 / 1024:.0f} KB, {hashes} hashes: "
+          f"falsos positivos {fp_rate:.4f} (alvo {bloom.SEEN_FILTER_FP_RATE})")
+    assert fp_rate <= 2 * bloom.SEEN_FILTER_FP_RATE
@@ -0,0 +1,139 @@
+"""
+Benchmark da escrita das tarefas de coleta: a gravação em lote (upsert_trends)
+contra a gravação item a item usada antes (SELECT, INSERT e dois commits por item).
+
+Roda contra um SQLite em arquivo e, se TEST_POSTGRES_URL estiver configurada,
+contra o PostgreSQL. Para uma medição maior:
+
+    BENCHMARK_INGEST_ITEMS=5000 pytest -m slow tests/integration/test_ingest_benchmark.py -s
+"""
+import os
+import time
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.ingestion import batches, upsert_trends
+from app.models import Base, Trend, TrendTag, TrendSnapshot, decrement_trend_counters
+from app.search import remove_from_search_index
+
+pytestmark = [pytest.mark.integration, pytest.mark.slow]
+
+INGEST_ITEMS = int(os.getenv("BENCHMARK_INGEST_ITEMS", 500))
+
+
+def collected_items(prefix, views=100):
+    """Itens sintéticos no formato das tarefas de coleta, com duas tags cada."""
+    return [
+        {
+            "external_id": f"{prefix}-{i}",
+            "title": f"Tendência de benchmark {i}",
+            "description": "Descrição de benchmark " * 5,
+            "category": "benchmark",
+            "author": "Benchmark",
+            "url": f"https://example.com/{prefix}/{i}",
+            "thumbnail": "",
+            "views": views + i,
+            "likes": 10,
+            "comments": 1,
+            "published_at": datetime(2024, 1, 1),
+            "tags": [f"bench{i % 50}", "benchmark"],
+        }
+        for i in range(INGEST_ITEMS)
+    ]
+
+
+def write_row_by_row(session, platform, items):
+    """Gravação item a item, como as tarefas faziam antes da etapa em lote."""
+    for item in items:
+        existing = session.query(Trend).filter(
+            Trend.platform == platform,
+            Trend.external_id == item["external_id"]
+        ).first()
+        if existing:
+            existing.views = item["views"]
+            existing.likes = item["likes"]
+            existing.comments = item["comments"]
+            existing.updated_at = datetime.now()
+            existing.card = existing.render_card(existing.card["tags"] if existing.card else None)
+            session.commit()
+        else:
+            trend = Trend(platform=platform, **{key: value for key, value in item.items() if key != "tags"})
+            session.add(trend)
+            session.commit()
+            for name in item["tags"]:
+                session.add(TrendTag(trend_id=trend.id, name=name))
+            trend.card = trend.render_card(item["tags"])
+            session.commit()
+
+
+def write_batched(session, platform, items):
+    """Gravação em lote, como as tarefas fazem hoje."""
+    for batch in batches(items):
+        upsert_trends(session, platform, batch)
+        session.commit()
+
+
+def remove_platform(session, platform):
+    """Remove as tendências de benchmark, mantendo contadores e índice de busca consistentes."""
+    ids = [trend_id for (trend_id,) in session.query(Trend.id).filter(Trend.platform == platform)]
+    session.query(TrendTag).filter(TrendTag.trend_id.in_(ids)).delete(synchronize_session=False)
+    session.query(TrendSnapshot).filter(TrendSnapshot.trend_id.in_(ids)).delete(synchronize_session=False)
+    remove_from_search_index(session.connection(), ids)
+    decrement_trend_counters(session, Trend.platform == platform)
+    session.query(Trend).filter(Trend.platform == platform).delete(synchronize_session=False)
+    session.commit()
+
+
+def database_urls():
+    urls = [pytest.param("sqlite", id="sqlite")]
+    urls.append(pytest.param(
+        "postgresql", id="postgresql",
+        marks=pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL não configurada"),
+    ))
+    return urls
+
+
+@pytest.fixture
+def bench_session(request, tmp_path):
+    if request.param == "sqlite":
+        # Em arquivo: o custo de cada commit (fsync) entra na medição
+        engine = create_engine(f"sqlite:///{tmp_path / 'ingest_benchmark.db'}")
+    else:
+        engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    yield session
+
+    for platform in ("bench-row", "bench-batch"):
+        remove_platform(session, platform)
+    session.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("bench_session", database_urls(), indirect=True)
+def test_batched_writes_outperform_row_by_row(bench_session):
+    """Mede itens gravados por segundo na primeira coleta (inserções) e na seguinte (atualizações)."""
+    results = {}
+    for name, platform, write in (("item a item", "bench-row", write_row_by_row),
+                                  ("em lote", "bench-batch", write_batched)):
+        timings = []
+        for views in (100, 200):
+            items = collected_items(platform, views=views)
+            started = time.perf_counter()
+            write(bench_session, platform, items)
+            timings.append(time.perf_counter() - started)
+        results[name] = timings
+        print(f"\n{name}: inserções {INGEST_ITEMS / timings[0]:.0f} itens/s, "
+              f"atualizações {INGEST_ITEMS / timings[1]:.0f} itens/s")
+
+    # As duas estratégias gravam o mesmo conteúdo
+    for platform in ("bench-row", "bench-batch"):
+        assert bench_session.query(Trend).filter(Trend.platform == platform).count() == INGEST_ITEMS
+
+    row_insert, row_update = results["item a item"]
+    batch_insert, batch_update = results["em lote"]
+    assert batch_insert < row_insert / 5
+    assert batch_update < row_update / 5
@@ -0,0 +1,108 @@
+"""
+Benchmark da busca textual: consulta no índice (FTS5) contra a varredura com
+LIKE que seria necessária sem ele.
+
+O tamanho do corpus é configurável; para a medição de referência com um
+milhão de linhas:
+
+    BENCHMARK_SEARCH_ROWS=1000000 pytest -m slow tests/integration/test_search_benchmark.py -s
+"""
+import os
+import random
+import statistics
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.search import rebuild_search_index, search_trend_ids
+
+pytestmark = [pytest.mark.integration, pytest.mark.slow]
+
+SEARCH_ROWS = int(os.getenv("BENCHMARK_SEARCH_ROWS", 50000))
+REPETITIONS = 5
+
+
+def timed(function, repetitions=REPETITIONS):
+    """Executa `function` várias vezes e retorna (resultado, mediana em segundos)."""
+    durations = []
+    for _ in range(repetitions):
+        started = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - started)
+    return result, statistics.median(durations)
+
+
+@pytest.fixture(scope="module")
+def search_corpus(tmp_path_factory):
+    """Corpus sintético com vocabulário de 5000 palavras e um termo raro (1 a cada 1000 linhas)."""
+    path = tmp_path_factory.mktemp("search") / "search_benchmark.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+
+    rng = random.Random(42)
+    vocabulary = [f"palavra{i}" for i in range(5000)]
+    platforms = ["youtube", "reddit", "twitter"]
+
+    with engine.begin() as connection:
+        batch = []
+        for i in range(1, SEARCH_ROWS + 1):
+            title = " ".join(rng.choices(vocabulary, k=6))
+            if i % 1000 == 0:
+                title += " raridade"
+            batch.append({
+                "id": i,
+                "title": title,
+                "description": " ".join(rng.choices(vocabulary, k=30)),
+                "platform": platforms[i % 3],
+                "external_id": f"bench-{i}",
+            })
+            if len(batch) == 10000 or i == SEARCH_ROWS:
+                connection.execute(text(
+                    "INSERT INTO trends (id, title, description, platform, external_id, created_at) "
+                    "VALUES (:id, :title, :description, :platform, :external_id, CURRENT_TIMESTAMP)"
+                ), batch)
+                batch = []
+
+    session = sessionmaker(bind=engine)()
+    started = time.perf_counter()
+    indexed = rebuild_search_index(session, batch_size=10000)
+    session.commit()
+    print(f"\nÍndice construído para {indexed} linhas em {time.perf_counter() - started:.1f}s")
+
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def like_scan(session, term, limit=20):
+    """Busca equivalente sem índice, como o filtro feito hoje no cliente."""
+    pattern = f"%{term}%"
+    return [row.id for row in session.execute(text(
+        "SELECT id FROM trends WHERE LOWER(title) LIKE :p OR LOWER(description) LIKE :p "
+        "ORDER BY created_at DESC LIMIT :limit"
+    ), {"p": pattern, "limit": limit})]
+
+
+# Termo ausente (o LIKE varre a tabela inteira), seletivo (0,1% das linhas) e
+# frequente (~0,7%); no frequente o LIKE para após os 20 primeiros resultados
+# sem ranquear, então só é reportado
+@pytest.mark.parametrize("term,index_must_win", [
+    ("ausente", True),
+    ("raridade", True),
+    ("palavra4999", False),
+])
+def test_search_index_vs_like_scan(search_corpus, term, index_must_win):
+    """A consulta no índice deve ser mais rápida que a varredura da tabela."""
+    fts_ids, fts_time = timed(lambda: search_trend_ids(search_corpus, term, limit=20))
+    like_ids, like_time = timed(lambda: like_scan(search_corpus, term))
+
+    print(
+        f"\n'{term}' em {SEARCH_ROWS} linhas: índice {fts_time * 1000:.2f}ms | "
+        f"LIKE {like_time * 1000:.2f}ms ({like_time / fts_time:.1f}x)"
+    )
+
+    assert len(fts_ids) == len(like_ids)
+    if index_must_win:
+        assert fts_time < like_time
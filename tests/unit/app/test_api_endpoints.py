@@ -248,4 +248,252 @@ def test_stats_endpoint(client):
         # Se não houver erro, verifica os campos da resposta
         assert "environment" in data
         assert "database_type" in data
-        assert "tables" in data 
\ No newline at end of file
+        assert "tables" in data 
+def test_get_trends_loads_tags_in_constant_queries(client, db_session, capture_sql):
+    """Testa que a listagem não faz uma consulta de tags por tendência (N+1)."""
+    from app.models import Trend, TrendTag
+
+    # Cria uma página cheia de tendências, cada uma com tags
+    trends = [
+        Trend(title=f"Tendência N+1 {i}", platform="youtube", external_id=f"nplus1-{i}")
+        for i in range(1000)
+    ]
+    db_session.add_all(trends)
+    db_session.flush()
+    db_session.add_all([TrendTag(trend_id=trend.id, name=f"tag{trend.id}") for trend in trends])
+    db_session.commit()
+
+    # Conta os SELECTs emitidos durante a requisição
+    with capture_sql(selects_only=True) as statements:
+        response = client.get("/api/trends?platform=youtube&limit=1000")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["trends"]) == 1000
+    assert all(item["tags"] == [f"tag{item['id']}"] for item in data["trends"] if item["title"].startswith("Tendência N+1"))
+
+    # Validador do ETag, uma consulta para os cards e, para tendências sem card,
+    # uma consulta para as tendências e no máximo duas para as tags (lotes de 500 ids)
+    assert len(statements) <= 5
+
+def test_get_trends_cursor_pagination(client, db_session):
+    """Testa a paginação por cursor (created_at, id) do endpoint de listagem."""
+    from datetime import datetime, timedelta
+    from app.models import Trend
+
+    # Duas tendências com o mesmo created_at para exercitar o desempate por id
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    created = [base, base, base - timedelta(hours=1), base - timedelta(hours=2), base - timedelta(hours=3)]
+    trends = [
+        Trend(title=f"Cursor {i}", platform="reddit", category="cursor-teste", created_at=created_at)
+        for i, created_at in enumerate(created)
+    ]
+    db_session.add_all(trends)
+    db_session.commit()
+    expected = [t.id for t in sorted(trends, key=lambda t: (t.created_at, t.id), reverse=True)]
+
+    # Percorre as páginas seguindo next_cursor
+    seen = []
+    response = client.get("/api/trends?category=cursor-teste&limit=2")
+    while True:
+        assert response.status_code == 200
+        data = response.json()
+        seen.extend(item["id"] for item in data["trends"])
+        if not data["next_cursor"]:
+            break
+
+        # Inserções entre páginas não deslocam as linhas já paginadas
+        db_session.add(Trend(title="Nova", platform="reddit", category="cursor-teste", created_at=datetime.utcnow()))
+        db_session.commit()
+
+        response = client.get(f"/api/trends?category=cursor-teste&limit=2&cursor={data['next_cursor']}")
+
+    assert seen == expected
+
+def test_get_trends_invalid_cursor(client):
+    """Testa que um cursor malformado é rejeitado."""
+    response = client.get("/api/trends?cursor=invalido")
+    assert response.status_code == 400
+
+    response = client.get("/api/trends?cursor=abc&skip=10")
+    assert response.status_code == 400
+
+def test_get_trends_serves_prerendered_cards(client, db_session, capture_sql):
+    """Testa que a listagem usa o card gravado sem hidratar a tendência e suas tags."""
+    from datetime import datetime, timedelta
+    from app.models import Trend, TrendTag
+
+    published_at = datetime.utcnow() - timedelta(hours=3)
+    trend = Trend(title="Card pronto", platform="twitter", category="card-teste",
+                  external_id="card-1", views=12345, published_at=published_at)
+    db_session.add(trend)
+    db_session.flush()
+    db_session.add(TrendTag(trend_id=trend.id, name="cards"))
+    trend.card = trend.render_card(["cards"])
+    db_session.commit()
+
+    with capture_sql(selects_only=True) as statements:
+        response = client.get("/api/trends?category=card-teste")
+
+    assert response.status_code == 200
+    item = response.json()["trends"][0]
+    assert item["views"] == "12.345"
+    assert item["tags"] == ["cards"]
+    # timeAgo é calculado na leitura a partir do instante de publicação gravado no card
+    assert item["timeAgo"] == "3 horas"
+    assert "publishedTs" not in item
+
+    # Nenhuma consulta às tags: o card já contém tudo o que a listagem retorna
+    assert not any("trend_tags" in statement for statement in statements)
+
+def test_export_trends_streams_ndjson(client, db_session):
+    """Testa a exportação em NDJSON de todas as tendências, em lotes."""
+    import json
+    from app.models import Trend
+
+    trends = [
+        Trend(title=f"Exportação {i}", platform="twitter", category="exportacao", external_id=f"export-{i}")
+        for i in range(25)
+    ]
+    db_session.add_all(trends)
+    db_session.commit()
+    # Metade com card pré-renderizado, metade renderizada na exportação
+    for trend in trends[::2]:
+        trend.card = trend.render_card([])
+    db_session.commit()
+
+    with patch("app.main.EXPORT_BATCH_SIZE", 10):
+        response = client.get("/api/trends/export?category=exportacao")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["cache-control"] == "no-store"
+
+    lines = response.text.splitlines()
+    items = [json.loads(line) for line in lines]
+    assert [item["id"] for item in items] == [trend.id for trend in trends]
+    assert all("timeAgo" in item for item in items)
+
+def test_export_trends_empty(client):
+    """Testa a exportação sem resultados."""
+    response = client.get("/api/trends/export?platform=inexistente")
+    assert response.status_code == 200
+    assert response.text == ""
+
+def test_get_trends_fields_projection(client, db_session, capture_sql):
+    """Testa que fields= retorna e carrega apenas as colunas pedidas."""
+    from datetime import datetime, timedelta
+    from app.models import Trend, TrendTag
+
+    trend = Trend(title="Projeção", description="x" * 1000, platform="twitter", category="projecao",
+                  external_id="fields-1", views=2500, published_at=datetime.utcnow() - timedelta(days=2))
+    db_session.add(trend)
+    db_session.flush()
+    db_session.add_all([TrendTag(trend_id=trend.id, name="a"), TrendTag(trend_id=trend.id, name="b")])
+    db_session.commit()
+
+    with capture_sql(selects_only=True) as statements:
+        response = client.get("/api/trends?category=projecao&fields=id,title,views,timeAgo,tags")
+
+    assert response.status_code == 200
+    assert response.json()["trends"] == [
+        {"id": trend.id, "title": "Projeção", "views": "2.500", "timeAgo": "2 dias", "tags": ["a", "b"]}
+    ]
+    # Nem a descrição nem o card completo são lidos do banco
+    assert not any("trends.description" in statement or "trends.card" in statement for statement in statements)
+
+def test_get_trends_list_view(client, db_session):
+    """Testa a visão enxuta da listagem, sem a descrição."""
+    from app.models import Trend, LIST_VIEW_FIELDS
+
+    db_session.add(Trend(title="Visão lista", description="longa", platform="twitter", category="visao-lista"))
+    db_session.commit()
+
+    response = client.get("/api/trends?category=visao-lista&view=list")
+    assert response.status_code == 200
+    item = response.json()["trends"][0]
+    assert list(item) == LIST_VIEW_FIELDS
+    assert "description" not in item
+
+    # O detalhe continua com o card completo
+    response = client.get(f"/api/trends/{item['id']}")
+    assert response.json()["trend"]["description"] == "longa"
+
+def test_get_trends_invalid_fields(client):
+    """Testa que campos desconhecidos são rejeitados."""
+    response = client.get("/api/trends?fields=id,senha")
+    assert response.status_code == 400
+    assert "senha" in response.json()["detail"]
+
+    response = client.get("/api/trends?view=compacta")
+    assert response.status_code == 422
+
+def test_database_stats_runs_off_event_loop(client):
+    """Testa que as consultas de estatísticas rodam no pool de threads do banco."""
+    import threading
+    import app.main as main
+
+    collect = main.collect_database_stats
+    threads = []
+
+    def recording_collect(db):
+        threads.append(threading.current_thread().name)
+        return collect(db)
+
+    with patch("app.main.collect_database_stats", recording_collect):
+        assert client.get("/api/database/stats").status_code == 200
+        assert client.get("/api/stats").status_code == 200
+
+    assert len(threads) == 2
+    assert all(name.startswith("db") for name in threads)
+
+def test_categories_and_platforms_read_counters(client, db_session, capture_sql):
+    """Testa que categorias e plataformas vêm de trend_counters, sem agregar a tabela trends."""
+    from app.models import Trend
+
+    db_session.add(Trend(title="Contagem", platform="twitter", category="contagem-endpoint"))
+    db_session.commit()
+
+    with capture_sql() as statements:
+        categories = client.get("/api/categories").json()["categories"]
+        platforms = client.get("/api/platforms").json()["platforms"]
+
+    assert {"name": "contagem-endpoint", "count": 1} in categories
+    assert any(item["name"] == "twitter" and item["count"] >= 1 for item in platforms)
+    assert not any("FROM trends" in statement for statement in statements)
+
+def test_get_trends_by_ids_preserves_order(client, db_session, capture_sql):
+    """Testa a busca em lote por IDs: ordem pedida, repetições e IDs inexistentes."""
+    from app.models import Trend, TrendTag
+
+    trends = [Trend(title=f"Lote {i}", platform="youtube", category="lote-ids") for i in range(3)]
+    db_session.add_all(trends)
+    db_session.flush()
+    db_session.add(TrendTag(trend_id=trends[1].id, name="lote"))
+    for trend in trends:
+        trend.card = trend.render_card(["lote"] if trend is trends[1] else [])
+    db_session.commit()
+    first, second, third = [trend.id for trend in trends]
+
+    with capture_sql(selects_only=True) as statements:
+        response = client.get(f"/api/trends?ids={third},999999,{first},{second},{third}")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["id"] for item in data["trends"]] == [third, first, second]
+    assert data["trends"][2]["tags"] == ["lote"]
+    assert data["missing"] == [999999]
+    # Cards pré-renderizados: uma única consulta para todas as tendências
+    assert len(statements) == 1
+
+def test_get_trends_by_ids_invalid(client):
+    """Testa a validação do parâmetro ids."""
+    from app.main import MULTI_GET_MAX_IDS
+
+    assert client.get("/api/trends?ids=1,abc").status_code == 400
+    assert client.get("/api/trends?ids=,").status_code == 400
+
+    too_many = ",".join(str(i) for i in range(1, MULTI_GET_MAX_IDS + 2))
+    response = client.get(f"/api/trends?ids={too_many}")
+    assert response.status_code == 400
+    assert str(MULTI_GET_MAX_IDS) in response.json()["detail"]
@@ -0,0 +1,93 @@
+"""
+Testes para o filtro de Bloom dos external_ids já gravados (app.bloom).
+"""
+import pytest
+from datetime import datetime
+
+from app import bloom
+from app.bloom import (
+    add_seen, bloom_parameters, bloom_positions, ensure_seen_filter, maybe_seen,
+    rebuild_seen_filter, seen_filter_key,
+)
+from app.ingestion import upsert_trends
+from app.models import Trend
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def fake_bloom(fake_cache, monkeypatch):
+    """Filtro sobre o Redis em memória, com capacidade pequena."""
+    monkeypatch.setattr(bloom, "_disabled_until", 0.0)
+    monkeypatch.setattr(bloom, "SEEN_FILTER_CAPACITY", 1000)
+    return fake_cache
+
+
+def collected(external_id):
+    return {"external_id": external_id, "title": f"Bloom {external_id}", "category": "bloom-teste",
+            "views": 1, "likes": 1, "comments": 1, "published_at": datetime(2024, 1, 1), "tags": []}
+
+
+def test_bloom_parameters_follow_fp_rate():
+    """Testa o dimensionamento pelo alvo de falsos positivos."""
+    assert bloom_parameters(1000, 0.01) == (9586, 7)
+    bits, hashes = bloom_parameters(1000, 0.001)
+    assert bits > 9586 and hashes == 10
+    assert len(set(bloom_positions("abc", bits, hashes))) == hashes
+
+
+def test_filter_unavailable_until_built(fake_bloom, db_session):
+    """Testa que o filtro só é usado depois de construído a partir do banco."""
+    db_session.add(Trend(title="Bloom existente", platform="reddit", external_id="bloom-existente"))
+    db_session.commit()
+
+    assert maybe_seen("reddit", ["bloom-existente"]) is None
+    # Sem filtro construído, nada é marcado (um filtro parcial pareceria completo)
+    add_seen("reddit", ["bloom-parcial"])
+    assert seen_filter_key("reddit") not in fake_bloom.data
+
+    ensure_seen_filter(db_session, "reddit")
+    assert maybe_seen("reddit", ["bloom-existente", "bloom-inedito"]) == [True, False]
+
+    add_seen("reddit", ["bloom-inedito"])
+    assert maybe_seen("reddit", ["bloom-inedito"]) == [True]
+
+
+def test_rebuild_drops_removed_ids(fake_bloom, db_session):
+    """Testa que a reconstrução reflete as remoções do banco."""
+    trend = Trend(title="Bloom removido", platform="youtube", external_id="bloom-removido")
+    db_session.add(trend)
+    db_session.commit()
+    rebuild_seen_filter(db_session, "youtube")
+    assert maybe_seen("youtube", ["bloom-removido"]) == [True]
+
+    db_session.delete(trend)
+    db_session.commit()
+    assert rebuild_seen_filter(db_session, "youtube") == db_session.query(Trend).filter(
+        Trend.platform == "youtube", Trend.external_id.isnot(None)).count()
+    assert maybe_seen("youtube", ["bloom-removido"]) == [False]
+
+
+def test_upsert_skips_lookup_for_new_items(fake_bloom, db_session, capture_sql):
+    """Testa que itens certamente novos não são procurados no banco."""
+    ensure_seen_filter(db_session, "twitter")
+    upsert_trends(db_session, "twitter", [collected("bloom-1")])
+    db_session.commit()
+
+    def lookups(statements):
+        return [statement for statement in statements if "trends.content_hash" in statement]
+
+    with capture_sql(selects_only=True) as statements:
+        result = upsert_trends(db_session, "twitter", [collected("bloom-2"), collected("bloom-3")])
+        db_session.commit()
+    assert result["inserted"] == 2
+    assert lookups(statements) == []
+
+    # Itens já gravados continuam sendo procurados e atualizados
+    with capture_sql(selects_only=True) as statements:
+        result = upsert_trends(db_session, "twitter", [dict(collected("bloom-1"), views=50), collected("bloom-4")])
+        db_session.commit()
+    assert (result["inserted"], result["updated"]) == (1, 1)
+    # Parâmetros da consulta: a plataforma e só o bloom-1
+    [lookup] = lookups(statements)
+    assert lookup.count("?") == 2
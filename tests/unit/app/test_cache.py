@@ -0,0 +1,147 @@
+"""
+Testes unitários para o cache de respostas no Redis.
+"""
+import pytest
+from unittest.mock import PropertyMock, patch
+
+from app import cache
+from app.main import app
+from app.models import get_db
+
+
+@pytest.fixture
+def counting_client(client, db_session):
+    """Cliente de teste que conta quantas sessões do banco foram abertas."""
+    opened = []
+
+    def override_get_db():
+        opened.append(1)
+        yield db_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    client.opened_sessions = opened
+    return client
+
+
+def test_cache_hit_does_not_open_session(counting_client, fake_cache, sample_trends):
+    """Testa que um acerto no cache não abre sessão com o banco."""
+    response = counting_client.get("/api/trends?platform=youtube")
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "MISS"
+    assert len(counting_client.opened_sessions) == 1
+
+    cached = counting_client.get("/api/trends?platform=youtube")
+    assert cached.status_code == 200
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.json() == response.json()
+    assert len(counting_client.opened_sessions) == 1
+
+
+def test_cache_key_per_query_combination(counting_client, fake_cache, sample_trends):
+    """Testa que cada combinação de parâmetros tem sua própria entrada."""
+    counting_client.get("/api/trends?platform=youtube&limit=2")
+    counting_client.get("/api/trends?platform=reddit&limit=2")
+    assert len(counting_client.opened_sessions) == 2
+
+    # A ordem dos parâmetros na URL não muda a chave
+    response = counting_client.get("/api/trends?limit=2&platform=youtube")
+    assert response.headers["X-Cache"] == "HIT"
+    assert len(counting_client.opened_sessions) == 2
+
+
+def test_bump_generation_invalidates(counting_client, fake_cache, sample_trends):
+    """Testa que incrementar a geração invalida as respostas em cache."""
+    counting_client.get("/api/platforms")
+    assert counting_client.get("/api/platforms").headers["X-Cache"] == "HIT"
+
+    assert cache.bump_data_generation() == 1
+
+    response = counting_client.get("/api/platforms")
+    assert response.headers["X-Cache"] == "MISS"
+    assert len(counting_client.opened_sessions) == 2
+
+
+def test_cache_hit_keeps_cors_headers(client, fake_cache, sample_trends):
+    """Testa que respostas servidas do cache recebem os cabeçalhos de CORS."""
+    origin = "https://onezer00.github.io"
+    client.get("/api/categories", headers={"Origin": origin})
+
+    response = client.get("/api/categories", headers={"Origin": origin})
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.headers["access-control-allow-origin"] == origin
+
+
+def test_errors_and_not_found_are_not_cached(client, fake_cache):
+    """Testa que respostas de erro não são gravadas no cache."""
+    assert client.get("/api/trends/999999").status_code == 404
+    assert client.get("/api/trends/999999").status_code == 404
+
+    with patch("app.main.load_trend_cards", side_effect=Exception("falha")):
+        response = client.get("/api/trends?limit=3")
+    assert "error" in response.json()
+    assert "X-Cache" not in response.headers
+
+    assert not any(b"/api/trends" in key.encode() for key in fake_cache.data)
+
+
+def test_cache_disabled_when_redis_unavailable(client, monkeypatch, sample_trends):
+    """Testa que a API responde normalmente sem Redis."""
+    class BrokenRedis:
+        def get(self, key):
+            raise cache.redis.ConnectionError("sem conexão")
+
+    monkeypatch.setattr(cache, "_client", BrokenRedis())
+    monkeypatch.setattr(cache, "_disabled_until", 0.0)
+    monkeypatch.setattr(cache, "RESPONSE_CACHE_ENABLED", True)
+
+    response = client.get("/api/trends")
+    assert response.status_code == 200
+    assert "X-Cache" not in response.headers
+    assert cache._disabled_until > 0
+
+
+def test_redis_client_does_not_finalize_celery(monkeypatch):
+    """Testa que o cliente usa a URL do broker sem ler celery.conf (o que finalizaria o app Celery)."""
+    from app import celery_app
+
+    monkeypatch.setattr(cache, "_client", None)
+    monkeypatch.setattr(celery_app, "broker_url", "redis://broker-teste:6380/2")
+
+    with patch.object(type(celery_app.celery), "conf", new_callable=PropertyMock) as conf:
+        client = cache.get_redis_client()
+    conf.assert_not_called()
+    assert client.connection_pool.connection_kwargs["host"] == "broker-teste"
+    assert client.connection_pool.connection_kwargs["db"] == 2
+
+
+def test_multi_get_reuses_detail_cache(counting_client, fake_cache, sample_trends):
+    """Testa que a busca por IDs usa e preenche o cache das respostas de detalhe."""
+    first, second = sample_trends[0].id, sample_trends[1].id
+    detail = counting_client.get(f"/api/trends/{first}")
+    assert detail.headers["X-Cache"] == "MISS"
+
+    response = counting_client.get(f"/api/trends?ids={second},{first}")
+    assert response.headers["X-Cache"] == "MISS"
+    assert [item["id"] for item in response.json()["trends"]] == [second, first]
+    assert response.json()["trends"][1] == detail.json()["trend"]
+
+    # A tendência carregada do banco passa a estar em cache como resposta de detalhe
+    cached = counting_client.get(f"/api/trends/{second}")
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.json()["trend"] == response.json()["trends"][0]
+    assert cached.headers["ETag"]
+    assert len(counting_client.opened_sessions) == 2
+
+
+def test_multi_get_cache_entries(fake_cache):
+    """Testa a leitura e a gravação de várias respostas de uma vez."""
+    cache.set_cached_responses(0, [
+        ("/api/trends/1", [], '{"trend":{"id":1}}', {"ETag": '"a"'}),
+        ("/api/trends/2", [], b'{"trend":{"id":2}}', None),
+    ])
+
+    entries = cache.get_cached_responses(0, [("/api/trends/2", []), ("/api/trends/3", []), ("/api/trends/1", [])])
+    assert entries[0] == {"body": '{"trend":{"id":2}}', "headers": {}}
+    assert entries[1] is None
+    assert entries[2]["headers"] == {"ETag": '"a"'}
+    assert cache.get_cached_responses(0, []) == []
@@ -0,0 +1,114 @@
+"""
+Testes para a compressão das respostas da API.
+"""
+import gzip
+import json
+import zlib
+import pytest
+from unittest.mock import patch
+
+from app.compression import negotiate_encoding
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def large_trends(db_session):
+    """Tendências suficientes para a listagem passar do tamanho mínimo de compressão."""
+    from app.models import Trend
+
+    # O banco de teste é compartilhado entre os testes: cria as tendências uma única vez
+    trends = db_session.query(Trend).filter(Trend.category == "compressao").all()
+    if not trends:
+        trends = [
+            Trend(title=f"Compressão {i}", description="descrição repetitiva " * 20,
+                  platform="twitter", category="compressao", external_id=f"gzip-{i}")
+            for i in range(20)
+        ]
+        db_session.add_all(trends)
+        db_session.commit()
+    return trends
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("GZIP", "gzip"),
+    ("deflate", None),
+    ("gzip;q=0", None),
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+    ("", None),
+    (None, None),
+])
+def test_negotiate_encoding(header, expected):
+    """Testa a negociação pelo Accept-Encoding sem brotli instalado."""
+    with patch("app.compression.brotli", None):
+        assert negotiate_encoding(header) == expected
+
+
+def test_negotiate_encoding_prefers_brotli():
+    """Testa que br tem preferência sobre gzip quando disponível, respeitando os pesos."""
+    with patch("app.compression.brotli", object()):
+        assert negotiate_encoding("gzip, br") == "br"
+        assert negotiate_encoding("gzip, br;q=0.5") == "gzip"
+
+
+def test_large_response_is_gzipped(client, large_trends):
+    """Testa que respostas grandes são comprimidas e mantêm CORS e ETag."""
+    headers = {"Accept-Encoding": "gzip", "Origin": "http://localhost:3000"}
+    # O cliente de teste descomprime automaticamente; lê o corpo bruto para verificar
+    with client.stream("GET", "/api/trends?category=compressao", headers=headers) as response:
+        raw = b"".join(response.iter_raw())
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in response.headers["vary"].lower()
+    assert response.headers["access-control-allow-origin"] == "http://localhost:3000"
+    assert response.headers["etag"].startswith("W/")
+    assert "content-length" not in response.headers or int(response.headers["content-length"]) == len(raw)
+
+    data = json.loads(gzip.decompress(raw))
+    assert len(data["trends"]) == len(large_trends)
+    assert len(raw) < len(json.dumps(data)) / 2
+
+
+def test_small_response_not_compressed(client):
+    """Testa que respostas abaixo do tamanho mínimo são enviadas sem compressão."""
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert "Bem-vindo à API TrendPulse" in response.json()["message"]
+
+
+def test_response_not_compressed_without_accept_encoding(client, large_trends):
+    """Testa que clientes sem suporte recebem a resposta original."""
+    response = client.get("/api/trends?category=compressao", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert len(response.json()["trends"]) == len(large_trends)
+
+
+def test_streaming_export_is_gzipped(client, large_trends):
+    """Testa a compressão incremental da exportação em streaming."""
+    with patch("app.main.EXPORT_BATCH_SIZE", 5):
+        with client.stream("GET", "/api/trends/export?category=compressao",
+                           headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "gzip"
+    lines = zlib.decompress(raw, 31).decode("utf-8").splitlines()
+    assert len(lines) == len(large_trends)
+
+
+def test_brotli_response():
+    """Testa a compressão brotli quando o pacote opcional está instalado."""
+    brotli = pytest.importorskip("brotli")
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        with client.stream("GET", "/openapi.json", headers={"Accept-Encoding": "br"}) as response:
+            raw = b"".join(response.iter_raw())
+
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(brotli.decompress(raw))["info"]["title"] == "TrendPulse API"
@@ -0,0 +1,84 @@
+"""
+Testes unitários para as respostas condicionais (ETag / If-None-Match).
+"""
+from datetime import datetime
+from unittest.mock import patch
+
+from app import cache
+from app.main import build_etag, etag_matches
+from app.models import Trend
+
+
+def test_etag_matches():
+    """Testa a comparação fraca do If-None-Match."""
+    etag = build_etag(1, "/api/trends")
+    assert etag.startswith('W/"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag.removeprefix("W/"), etag)
+    assert etag_matches(f'W/"outro", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"outro"', etag)
+
+
+def test_listing_not_modified_without_redis(client, db_session, sample_trends, capture_sql):
+    """Testa o 304 com o validador calculado pelo banco (sem Redis)."""
+    response = client.get("/api/trends?platform=youtube")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "must-revalidate" in response.headers["Cache-Control"]
+
+    # Com o mesmo ETag, nenhum card é carregado nem serializado
+    with patch("app.main.load_trend_cards") as load_trend_cards, capture_sql(selects_only=True) as statements:
+        not_modified = client.get("/api/trends?platform=youtube", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+    load_trend_cards.assert_not_called()
+    # Só a consulta do validador: nenhuma linha de tendência é lida
+    assert len(statements) == 1
+    assert not any("trends.card" in statement for statement in statements)
+
+    # Outro filtro tem outro validador
+    other = client.get("/api/trends?platform=reddit", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    # Uma nova tendência no filtro muda o validador
+    db_session.add(Trend(title="Nova tendência", platform="youtube", created_at=datetime.utcnow()))
+    db_session.commit()
+    changed = client.get("/api/trends?platform=youtube", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_listing_not_modified_with_generation(client, fake_cache, sample_trends):
+    """Testa o 304 com o validador derivado da geração dos dados no Redis."""
+    response = client.get("/api/trends")
+    etag = response.headers["ETag"]
+
+    # O acerto no cache devolve o mesmo ETag
+    cached = client.get("/api/trends")
+    assert cached.headers["X-Cache"] == "HIT"
+    assert cached.headers["ETag"] == etag
+
+    with patch("app.main.cache.get_cached_response") as get_cached_response:
+        not_modified = client.get("/api/trends", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    get_cached_response.assert_not_called()
+
+    # Uma nova ingestão invalida o ETag
+    cache.bump_data_generation()
+    response = client.get("/api/trends", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_not_modified_keeps_cors_headers(client, fake_cache, sample_trends):
+    """Testa que o 304 também recebe os cabeçalhos de CORS e expõe o ETag."""
+    origin = "https://onezer00.github.io"
+    etag = client.get("/api/platforms", headers={"Origin": origin}).headers["ETag"]
+
+    response = client.get("/api/platforms", headers={"Origin": origin, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["access-control-allow-origin"] == origin
+    assert "etag" in response.headers["access-control-expose-headers"].lower()
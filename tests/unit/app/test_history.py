@@ -0,0 +1,115 @@
+"""
+Testes para o histórico de estatísticas das tendências e /api/trends/{id}/history.
+"""
+import pytest
+
+from app.models import (
+    Trend, TrendSnapshot, SNAPSHOT_FIELDS, snapshot_delta, record_trend_snapshots, downsample_trend_snapshots,
+    load_trend_history,
+)
+
+pytestmark = pytest.mark.unit
+
+# Meia-noite UTC, para que os intervalos de hora e de dia fiquem alinhados
+DAY = 86400
+BASE_TS = 1_700_006_400
+
+
+def add_trend(db_session, title, views=0, likes=0, comments=0):
+    """Cria uma tendência com as estatísticas informadas."""
+    trend = Trend(title=title, platform="youtube", category="historico-teste",
+                  views=views, likes=likes, comments=comments)
+    db_session.add(trend)
+    db_session.commit()
+    return trend
+
+
+def collect(db_session, trend, ts, **stats):
+    """Simula uma coleta: atualiza as estatísticas e grava o ponto do histórico."""
+    previous = {field: getattr(trend, field) for field in SNAPSHOT_FIELDS}
+    for field, value in stats.items():
+        setattr(trend, field, value)
+    record_trend_snapshots(db_session, [snapshot_delta(trend, previous, ts=ts)])
+    db_session.commit()
+
+
+def test_snapshots_store_deltas_and_rebuild_totals(db_session):
+    """Testa que os pontos guardam deltas e o histórico devolve os valores absolutos."""
+    trend = add_trend(db_session, "Histórico deltas", views=100, likes=10, comments=1)
+    record_trend_snapshots(db_session, [snapshot_delta(trend, ts=BASE_TS)])
+    db_session.commit()
+
+    collect(db_session, trend, BASE_TS + 60, views=250, likes=12)
+    # Coleta sem variação não gera ponto
+    collect(db_session, trend, BASE_TS + 120, views=250, likes=12)
+    # Estatísticas podem diminuir (score do Reddit)
+    collect(db_session, trend, BASE_TS + 180, views=240)
+
+    stored = (db_session.query(TrendSnapshot.views, TrendSnapshot.likes)
+              .filter(TrendSnapshot.trend_id == trend.id).order_by(TrendSnapshot.ts).all())
+    assert stored == [(100, 10), (150, 2), (-10, 0)]
+
+    assert load_trend_history(db_session, trend.id) == [
+        {"ts": BASE_TS, "views": 100, "likes": 10, "comments": 1},
+        {"ts": BASE_TS + 60, "views": 250, "likes": 12, "comments": 1},
+        {"ts": BASE_TS + 180, "views": 240, "likes": 12, "comments": 1},
+    ]
+
+
+def test_snapshots_in_same_second_are_merged(db_session):
+    """Testa que pontos na mesma chave (trend_id, ts) são somados."""
+    trend = add_trend(db_session, "Histórico mesmo segundo", views=5)
+    rows = [snapshot_delta(trend, ts=BASE_TS), {"trend_id": trend.id, "ts": BASE_TS, "views": 3, "likes": 0, "comments": 0}]
+    record_trend_snapshots(db_session, rows)
+    record_trend_snapshots(db_session, [dict(rows[1])])
+    db_session.commit()
+
+    assert load_trend_history(db_session, trend.id) == [{"ts": BASE_TS, "views": 11, "likes": 0, "comments": 0}]
+
+
+def test_downsample_keeps_totals(db_session):
+    """Testa a agregação por hora e por dia sem alterar os totais."""
+    trend = add_trend(db_session, "Histórico agregado")
+    now = BASE_TS + 30 * DAY
+    # Dois dias antigos com quatro coletas cada, e coletas recentes a cada 15 minutos
+    timestamps = [BASE_TS + day * DAY + hour * 3600 + 900 for day in (0, 1) for hour in (1, 2, 5, 9)]
+    timestamps += [now - 3600 * 60 + minutes * 60 for minutes in (0, 15, 30, 45)]
+    timestamps += [now - 600, now - 300]
+    for views, ts in enumerate(timestamps, start=1):
+        collect(db_session, trend, ts, views=views * 10)
+
+    before = load_trend_history(db_session, trend.id)
+    summary = downsample_trend_snapshots(db_session, now=now)
+    db_session.commit()
+    after = load_trend_history(db_session, trend.id)
+
+    # O banco de testes é compartilhado: outros testes podem ter pontos antigos
+    assert summary["daily"] >= 8
+    assert summary["hourly"] >= 3
+    assert [point["ts"] for point in after] == [
+        BASE_TS, BASE_TS + DAY, now - 3600 * 60, now - 600, now - 300,
+    ]
+    assert after[-1] == before[-1]
+    # Cada ponto agregado tem o valor do fim do seu intervalo
+    assert [point["views"] for point in after] == [40, 80, 120, 130, 140]
+
+    # Rodar de novo não altera nada
+    assert downsample_trend_snapshots(db_session, now=now) == {"daily": 0, "hourly": 0}
+
+
+def test_get_trend_history_endpoint(client, db_session):
+    """Testa o endpoint de histórico e o 404 para tendências inexistentes."""
+    trend = add_trend(db_session, "Histórico endpoint", views=7)
+    record_trend_snapshots(db_session, [snapshot_delta(trend, ts=BASE_TS)])
+    db_session.commit()
+    collect(db_session, trend, BASE_TS + 3600, views=9, comments=2)
+
+    response = client.get(f"/api/trends/{trend.id}/history")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["trend_id"] == trend.id
+    assert [(point["views"], point["comments"]) for point in data["points"]] == [(7, 0), (9, 2)]
+
+    untracked = add_trend(db_session, "Histórico vazio")
+    assert client.get(f"/api/trends/{untracked.id}/history").json()["points"] == []
+    assert client.get("/api/trends/999999/history").status_code == 404
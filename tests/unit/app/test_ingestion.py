@@ -0,0 +1,213 @@
+"""
+Testes para a etapa de escrita em lote das tarefas de coleta.
+"""
+import pytest
+from datetime import datetime
+
+from app.ingestion import upsert_trends, batches, content_fingerprint, _insert_new_trends
+from app.models import Trend, TrendTag, TrendCounter, TrendSnapshot, Tag, load_trend_history
+from app.search import search_trend_ids
+
+pytestmark = pytest.mark.unit
+
+
+def collected(external_id, **values):
+    """Item coletado no formato esperado por upsert_trends."""
+    item = {
+        "external_id": external_id,
+        "title": f"Lote {external_id}",
+        "description": "Descrição do lote",
+        "category": "lote-ingestao",
+        "author": "Autor",
+        "url": f"https://example.com/{external_id}",
+        "thumbnail": "",
+        "views": 100,
+        "likes": 10,
+        "comments": 1,
+        "published_at": datetime(2024, 1, 1, 12, 0, 0),
+        "tags": [],
+    }
+    item.update(values)
+    return item
+
+
+def category_count(db_session):
+    counter = db_session.get(TrendCounter, ("category", "lote-ingestao"))
+    return counter.count if counter else 0
+
+
+def commands(statements):
+    """Comando SQL (SELECT, INSERT, UPDATE...) de cada instrução capturada."""
+    return [statement.lstrip().split()[0].upper() for statement in statements]
+
+
+def test_upsert_inserts_new_trends_with_tags_cards_and_index(db_session):
+    """Testa a inserção em lote com tags, card, contadores, busca e histórico."""
+    before = category_count(db_session)
+    result = upsert_trends(db_session, "twitter", [
+        collected("ing-1", title="Ingestão zebraquasar", tags=["Ingestao", "lote"]),
+        collected("ing-2"),
+        collected("ing-1", title="Ingestão zebraquasar", tags=["Ingestao", "lote"], views=150),
+    ])
+    db_session.commit()
+
+    assert result == {"inserted": 2, "updated": 0, "skipped": 0}
+    trend = db_session.query(Trend).filter(Trend.platform == "twitter", Trend.external_id == "ing-1").one()
+    # Itens repetidos no lote valem pela última ocorrência
+    assert trend.views == 150
+    assert trend.card["id"] == trend.id
+    assert trend.card["tags"] == ["Ingestao", "lote"]
+    assert trend.card["views"] == "150"
+
+    tags = db_session.query(TrendTag).filter(TrendTag.trend_id == trend.id).all()
+    tag = db_session.query(Tag).filter(Tag.name == "ingestao").one()
+    assert {link.tag_id for link in tags if link.name == "Ingestao"} == {tag.id}
+
+    assert category_count(db_session) == before + 2
+    assert search_trend_ids(db_session, "zebraquasar") == [trend.id]
+    assert [point["views"] for point in load_trend_history(db_session, trend.id)] == [150]
+
+
+def test_upsert_updates_existing_stats_in_one_lookup(db_session, capture_sql):
+    """Testa a atualização em lote das estatísticas com uma única consulta."""
+    first_run = datetime(2024, 1, 2, 12, 0, 0)
+    upsert_trends(db_session, "twitter", [collected("ing-upd-1"), collected("ing-upd-2")],
+                  update_fields=("views", "comments"), now=first_run)
+    db_session.commit()
+    before = category_count(db_session)
+
+    with capture_sql() as statements:
+        result = upsert_trends(db_session, "twitter", [
+            collected("ing-upd-1", views=2500, likes=12),
+            collected("ing-upd-2"),
+            collected("ing-upd-3"),
+        ], update_fields=("views", "comments"), now=first_run.replace(hour=13))
+        db_session.commit()
+
+    # ing-upd-2 não mudou: é contado como ignorado e não entra no UPDATE
+    assert result == {"inserted": 1, "updated": 1, "skipped": 1}
+    assert commands(statements).count("SELECT") <= 3  # lote, ids sem RETURNING e dicionário de tags
+    assert commands(statements).count("UPDATE") == 2  # estatísticas e cards, cada um em lote
+
+    trend = db_session.query(Trend).filter(Trend.platform == "twitter", Trend.external_id == "ing-upd-1").one()
+    db_session.refresh(trend)
+    assert (trend.views, trend.likes) == (2500, 10)
+    assert trend.card["views"] == "2.500"
+    assert category_count(db_session) == before + 1
+
+    # Sem variação, a coleta não gera ponto no histórico
+    unchanged = db_session.query(Trend.id).filter(Trend.external_id == "ing-upd-2").scalar()
+    assert db_session.query(TrendSnapshot).filter(TrendSnapshot.trend_id == unchanged).count() == 1
+    assert [point["views"] for point in load_trend_history(db_session, trend.id)] == [100, 2500]
+
+
+def test_upsert_keeps_missing_card_null(db_session):
+    """Testa que atualizar uma tendência antiga sem card não grava o JSON 'null' no lugar do NULL."""
+    db_session.add(Trend(title="Sem card", platform="reddit", external_id="ing-nocard", views=5))
+    db_session.commit()
+
+    result = upsert_trends(db_session, "reddit", [collected("ing-nocard", views=900)])
+    db_session.commit()
+
+    assert result["updated"] == 1
+    # refresh_trend_cards procura as tendências sem card com IS NULL
+    without_card = db_session.query(Trend.views).filter(Trend.external_id == "ing-nocard", Trend.card.is_(None))
+    assert without_card.scalar() == 900
+
+
+def test_upsert_update_only_ignores_new_items(db_session):
+    """Testa que, com insert_new=False, só as tendências existentes são atualizadas."""
+    upsert_trends(db_session, "reddit", [collected("ing-only-1")], update_fields=("views", "comments"))
+    db_session.commit()
+    before = category_count(db_session)
+
+    result = upsert_trends(db_session, "reddit", [collected("ing-only-1", views=700), collected("ing-only-2")],
+                           update_fields=("views", "comments"), insert_new=False)
+    db_session.commit()
+
+    assert result == {"inserted": 0, "updated": 1, "skipped": 0}
+    assert db_session.query(Trend.views).filter(Trend.external_id == "ing-only-1").scalar() == 700
+    assert db_session.query(Trend).filter(Trend.external_id == "ing-only-2").count() == 0
+    assert category_count(db_session) == before
+
+
+def test_upsert_skips_unchanged_trends(db_session, capture_sql):
+    """Testa que tendências sem mudança nas estatísticas não são regravadas."""
+    first_run = datetime(2024, 1, 3, 12, 0, 0)
+    items = [collected("ing-same-1"), collected("ing-same-2", views=300)]
+    upsert_trends(db_session, "reddit", items, now=first_run)
+    db_session.commit()
+
+    # Linhas anteriores à impressão digital (content_hash nulo) são regravadas uma vez
+    legacy = db_session.query(Trend).filter(Trend.external_id == "ing-same-2").one()
+    legacy.content_hash = None
+    db_session.commit()
+
+    second_run = first_run.replace(hour=14)
+    with capture_sql() as statements:
+        assert upsert_trends(db_session, "reddit", items, now=second_run) == {"inserted": 0, "updated": 1, "skipped": 1}
+        db_session.commit()
+        assert upsert_trends(db_session, "reddit", items, now=second_run.replace(hour=16)) == \
+            {"inserted": 0, "updated": 0, "skipped": 2}
+        db_session.commit()
+
+    assert commands(statements).count("UPDATE") == 1
+    assert commands(statements).count("INSERT") == 0
+    unchanged = db_session.query(Trend).filter(Trend.external_id == "ing-same-1").one()
+    db_session.refresh(unchanged)
+    assert unchanged.updated_at == first_run
+    db_session.refresh(legacy)
+    assert legacy.content_hash is not None and legacy.updated_at == second_run
+
+
+def test_content_fingerprint():
+    """Testa que a impressão digital depende dos valores e cabe em um BIGINT com sinal."""
+    fingerprint = content_fingerprint({"views": 10, "comments": 2})
+    assert fingerprint == content_fingerprint({"comments": 2, "views": 10})
+    assert fingerprint != content_fingerprint({"views": 11, "comments": 2})
+    assert -2 ** 63 <= fingerprint < 2 ** 63
+
+
+def test_insert_skips_rows_inserted_concurrently(db_session):
+    """Testa que linhas já existentes (ON CONFLICT DO NOTHING) não são tratadas como inseridas."""
+    upsert_trends(db_session, "reddit", [collected("ing-conflict")])
+    db_session.commit()
+
+    now = datetime.utcnow()
+    rows = [
+        {"title": title, "platform": "reddit", "external_id": external_id, "created_at": now, "updated_at": now}
+        for title, external_id in (("Conflito", "ing-conflict"), ("Sem conflito", "ing-no-conflict"))
+    ]
+    inserted = _insert_new_trends(db_session.connection(), rows)
+    db_session.rollback()
+
+    assert list(inserted) == ["ing-no-conflict"]
+
+
+def test_insert_without_returning_and_whole_second_datetimes(db_session):
+    """Testa a identificação das linhas inseridas sem RETURNING num banco que descarta frações de segundo (MySQL)."""
+    connection = db_session.connection()
+    assert not connection.dialect.full_returning
+    # Simula o DATETIME do MySQL: o valor gravado perde os microssegundos
+    connection.exec_driver_sql(
+        "CREATE TRIGGER trends_whole_seconds AFTER INSERT ON trends BEGIN "
+        "UPDATE trends SET created_at = substr(NEW.created_at, 1, 20) || '000000' WHERE id = NEW.id; END"
+    )
+    try:
+        result = upsert_trends(db_session, "reddit", [collected("ing-mysql", tags=["Segundos"])],
+                               now=datetime(2024, 1, 4, 12, 0, 0, 654321))
+        db_session.commit()
+    finally:
+        db_session.connection().exec_driver_sql("DROP TRIGGER trends_whole_seconds")
+        db_session.commit()
+
+    assert result["inserted"] == 1
+    trend = db_session.query(Trend).filter(Trend.external_id == "ing-mysql").one()
+    assert trend.card is not None
+    assert [link.name for link in db_session.query(TrendTag).filter(TrendTag.trend_id == trend.id)] == ["Segundos"]
+
+
+def test_batches():
+    """Testa a divisão dos itens em lotes."""
+    assert [len(batch) for batch in batches(list(range(5)), size=2)] == [2, 2, 1]
+    assert list(batches([], size=2)) == []
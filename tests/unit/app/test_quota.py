@@ -0,0 +1,161 @@
+"""
+Testes para o orçamento compartilhado das APIs externas (app.quota).
+"""
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from app import quota
+from app.tasks import fetch_youtube_region_items, fetch_youtube_trends, reset_youtube_clients, youtube_region_budget
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    """Relógio controlado pelo teste."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def epoch(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def fake_quota(fake_cache, monkeypatch):
+    """Controle de cota sobre o Redis em memória, com relógio falso e limites pequenos."""
+    clock = FakeClock(epoch(2024, 1, 10, 12, 0, 0))
+    monkeypatch.setattr(quota, "clock", clock)
+    monkeypatch.setattr(quota, "_disabled_until", 0.0)
+    monkeypatch.setitem(quota.QUOTAS, "reddit", dict(quota.QUOTAS["reddit"], limit=3))
+    monkeypatch.setitem(quota.QUOTAS, "youtube", dict(quota.QUOTAS["youtube"], limit=10))
+    return clock
+
+
+def test_reserve_quota_per_minute_window(fake_quota):
+    """Testa o limite por minuto: reservas negadas até a janela virar."""
+    assert [quota.reserve_quota("reddit") for _ in range(4)] == [True, True, True, False]
+    assert quota.quota_remaining("reddit") == 0
+
+    fake_quota.advance(59)
+    assert not quota.reserve_quota("reddit")
+
+    fake_quota.advance(1)
+    assert quota.quota_remaining("reddit") == 3
+    assert quota.reserve_quota("reddit", cost=2)
+    # Uma reserva que estoura o limite é desfeita por inteiro
+    assert not quota.reserve_quota("reddit", cost=2)
+    assert quota.quota_remaining("reddit") == 1
+
+
+def test_youtube_quota_resets_at_pacific_midnight(fake_quota):
+    """Testa que a cota diária do YouTube vira à meia-noite do Pacífico (08:00 UTC)."""
+    fake_quota.now = epoch(2024, 1, 11, 7, 59, 0)
+    assert quota.reserve_quota("youtube", cost=10)
+    assert not quota.reserve_quota("youtube")
+    assert quota.quota_status()["youtube"] == {
+        "limit": 10, "used": 10, "remaining": 0, "resets_at": "2024-01-11T08:00:00Z",
+    }
+
+    fake_quota.advance(60)
+    assert quota.quota_remaining("youtube") == 10
+    assert quota.reserve_quota("youtube")
+
+
+def test_quota_degrades_without_redis(monkeypatch):
+    """Testa que, sem Redis, as reservas são concedidas e o restante é desconhecido."""
+    client = MagicMock()
+    client.get.side_effect = OSError("sem conexão")
+    client.pipeline.side_effect = OSError("sem conexão")
+    monkeypatch.setattr(quota, "get_redis_client", lambda: client)
+    monkeypatch.setattr(quota, "_disabled_until", 0.0)
+
+    assert quota.reserve_quota("youtube")
+    assert quota.quota_remaining("youtube") is None
+    assert quota.quota_status()["reddit"]["remaining"] is None
+
+
+def test_youtube_fetch_degrades_with_low_budget(fake_quota):
+    """Testa que, com pouca cota, as regiões buscam menos páginas e param quando ela acaba."""
+    # 10 unidades para 4 regiões: 2 páginas por região
+    regions = ["BR", "PT", "US", "MX"]
+    assert youtube_region_budget(regions) == (regions, 100)
+    # Menos unidades que regiões: uma página para cada uma das primeiras
+    many = [f"R{i}" for i in range(20)]
+    assert youtube_region_budget(many) == (many[:10], 50)
+
+    pages = []
+
+    def list_videos(**params):
+        pages.append(params)
+        request = MagicMock()
+        request.execute.return_value = {
+            "items": [{"id": f"v{len(pages)}-{i}", "snippet": {"publishedAt": "2024-01-01T00:00:00Z"}}
+                      for i in range(params["maxResults"])],
+            "nextPageToken": "mais",
+        }
+        return request
+
+    youtube = MagicMock()
+    youtube.videos.return_value.list.side_effect = list_videos
+
+    # O restante da cota acaba no meio da região: ela é interrompida, sem erro
+    quota.reserve_quota("youtube", cost=7)
+    items = fetch_youtube_region_items(youtube, "BR", max_videos=200)
+    assert len(pages) == 3
+    assert len(items) == 150
+    assert quota.quota_remaining("youtube") == 0
+    assert youtube_region_budget(regions) == ([], 0)
+
+
+def test_youtube_fetch_spends_low_budget_on_first_regions(fake_quota):
+    """Testa que, com menos cota que regiões, as primeiras regiões ainda são buscadas."""
+    quota.reserve_quota("youtube", cost=8)
+    # Sem clientes de outros testes no pool do processo
+    reset_youtube_clients()
+    regions = []
+
+    def list_videos(**params):
+        regions.append(params["regionCode"])
+        request = MagicMock()
+        request.execute.return_value = {
+            "items": [{"id": f"{params['regionCode']}-{i}", "snippet": {"publishedAt": "2024-01-01T00:00:00Z"}}
+                      for i in range(params["maxResults"])],
+            "nextPageToken": "mais",
+        }
+        return request
+
+    youtube = MagicMock()
+    youtube.videos.return_value.list.side_effect = list_videos
+    upsert = MagicMock(return_value={"inserted": 100, "updated": 0, "skipped": 0})
+
+    with patch("app.tasks.SessionLocal", MagicMock()), \
+         patch("googleapiclient.discovery.build_from_document", MagicMock(return_value=youtube)), \
+         patch("app.tasks.get_env_var", MagicMock(return_value="fake_api_key")), \
+         patch("app.tasks.upsert_trends", upsert), \
+         patch("app.tasks.YOUTUBE_REGIONS", ["BR", "PT", "US"]), \
+         patch("app.tasks.YOUTUBE_MAX_WORKERS", 1):
+        result = fetch_youtube_trends()
+
+    assert result["status"] == "success"
+    assert regions == ["BR", "PT"]
+    assert len(upsert.call_args[0][2]) == 100
+    assert quota.quota_remaining("youtube") == 0
+
+
+def test_status_endpoint_reports_quota(fake_quota, client):
+    """Testa o orçamento das APIs em /api/status."""
+    quota.reserve_quota("reddit", cost=2)
+
+    with patch("app.tasks.check_redis_connection", return_value=True):
+        data = client.get("/api/status").json()
+
+    assert data["quota"]["reddit"]["remaining"] == 1
+    assert data["quota"]["youtube"]["limit"] == 10
@@ -0,0 +1,93 @@
+"""
+Testes para a busca textual de tendências (/api/search).
+"""
+import pytest
+
+from app.models import Trend, TrendTag
+from app.search import query_terms, rebuild_search_index, remove_from_search_index, search_trend_ids
+
+pytestmark = pytest.mark.unit
+
+
+def add_trend(db_session, title, description=None, tags=(), **kwargs):
+    """Cria uma tendência com card renderizado, como faz a ingestão."""
+    trend = Trend(title=title, description=description, platform=kwargs.pop("platform", "twitter"), **kwargs)
+    db_session.add(trend)
+    db_session.flush()
+    db_session.add_all([TrendTag(trend_id=trend.id, name=tag) for tag in tags])
+    trend.card = trend.render_card(list(tags))
+    db_session.commit()
+    return trend
+
+
+def search(client, q, **params):
+    response = client.get("/api/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return [item["id"] for item in response.json()["trends"]]
+
+
+def test_query_terms_strip_syntax():
+    """Testa que operadores e aspas da consulta são descartados."""
+    assert query_terms('Zebra" OR title:* AND -(gato)') == ["zebra", "or", "title", "and", "gato"]
+    assert query_terms("***") == []
+
+
+def test_search_ranks_title_matches_first(client, db_session):
+    """Testa que ocorrências no título pesam mais que na descrição."""
+    in_description = add_trend(db_session, "Outro assunto", description="fala sobre quokkabusca de passagem")
+    in_title = add_trend(db_session, "Quokkabusca no zoológico", description="um vídeo curto")
+
+    assert search(client, "quokkabusca") == [in_title.id, in_description.id]
+
+
+def test_search_matches_tags_prefix_and_accents(client, db_session):
+    """Testa a busca por tags, por prefixo e sem acentos."""
+    trend = add_trend(db_session, "Aula de programação funcional", tags=["lambdaquest"])
+
+    assert search(client, "lambdaquest") == [trend.id]
+    assert search(client, "programacao funci") == [trend.id]
+    assert search(client, "programação imperativa") == []
+
+
+def test_search_filters_and_pagination(client, db_session):
+    """Testa os filtros por plataforma e a paginação."""
+    youtube = add_trend(db_session, "Ornitorrinco raro", platform="youtube")
+    reddit = add_trend(db_session, "Ornitorrinco raro de novo", platform="reddit")
+
+    assert search(client, "ornitorrinco", platform="reddit") == [reddit.id]
+    assert len(search(client, "ornitorrinco", limit=1)) == 1
+    assert set(search(client, "ornitorrinco")) == {youtube.id, reddit.id}
+
+
+def test_search_index_follows_updates_and_deletes(client, db_session):
+    """Testa que o índice acompanha alterações e remoções na mesma transação."""
+    trend = add_trend(db_session, "Capivara surfista")
+    assert search(client, "capivara") == [trend.id]
+
+    trend.title = "Lontra surfista"
+    trend.card = trend.render_card([])
+    db_session.commit()
+    assert search(client, "capivara") == []
+    assert search(client, "lontra") == [trend.id]
+
+    db_session.delete(trend)
+    db_session.commit()
+    assert search(client, "lontra") == []
+
+
+def test_remove_and_rebuild_search_index(db_session):
+    """Testa a remoção em massa e a reconstrução do índice."""
+    trend = add_trend(db_session, "Tamanduá bandeira", tags=["xenarthra"])
+
+    remove_from_search_index(db_session.connection(), [trend.id])
+    assert search_trend_ids(db_session, "xenarthra") == []
+
+    assert rebuild_search_index(db_session) >= 1
+    db_session.commit()
+    assert search_trend_ids(db_session, "xenarthra") == [trend.id]
+
+
+def test_search_requires_query(client):
+    """Testa a validação do parâmetro q."""
+    assert client.get("/api/search").status_code == 422
+    assert client.get("/api/search", params={"q": "!!!"}).json()["trends"] == []
@@ -0,0 +1,90 @@
+"""
+Testes para o dicionário de tags e os endpoints /api/tags.
+"""
+import pytest
+from datetime import datetime, timedelta
+
+from app.models import Tag, TagCount, Trend, TrendTag, rebuild_tag_counts, resolve_tag_ids
+
+pytestmark = pytest.mark.unit
+
+
+def add_tagged_trend(db_session, title, tags, created_at=None):
+    """Cria uma tendência com tags, como faz a ingestão."""
+    trend = Trend(title=title, platform="twitter", created_at=created_at or datetime.utcnow())
+    db_session.add(trend)
+    db_session.flush()
+    db_session.add_all([TrendTag(trend_id=trend.id, name=name) for name in tags])
+    db_session.commit()
+    return trend
+
+
+def test_trend_tags_are_linked_to_normalized_dictionary(db_session):
+    """Testa que novas TrendTags recebem o tag_id da tag normalizada."""
+    add_tagged_trend(db_session, "Dicionário 1", ["  Dicionario ", "DICIONARIO"])
+    add_tagged_trend(db_session, "Dicionário 2", ["dicionario"])
+
+    tags = db_session.query(Tag).filter(Tag.name == "dicionario").all()
+    assert len(tags) == 1
+
+    links = db_session.query(TrendTag).filter(TrendTag.name.in_(["  Dicionario ", "DICIONARIO", "dicionario"])).all()
+    assert {link.tag_id for link in links} == {tags[0].id}
+
+
+def test_resolve_tag_ids_is_idempotent(db_session):
+    """Testa que resolver nomes existentes não duplica o dicionário."""
+    first = resolve_tag_ids(db_session.connection(), ["Idempotente", "outra-idempotente"])
+    second = resolve_tag_ids(db_session.connection(), ["idempotente"])
+    db_session.commit()
+
+    assert second == {"idempotente": first["idempotente"]}
+    assert db_session.query(Tag).filter(Tag.name == "idempotente").count() == 1
+
+
+def test_rebuild_tag_counts_windows(db_session):
+    """Testa as contagens por janela, considerando a data de criação das tendências."""
+    now = datetime.utcnow()
+    add_tagged_trend(db_session, "Janela hoje", ["janela-teste"], created_at=now - timedelta(hours=2))
+    add_tagged_trend(db_session, "Janela semana", ["janela-teste"], created_at=now - timedelta(days=3))
+    add_tagged_trend(db_session, "Janela mês", ["janela-teste"], created_at=now - timedelta(days=20))
+
+    rebuild_tag_counts(db_session, now=now)
+    db_session.commit()
+
+    tag = db_session.query(Tag).filter(Tag.name == "janela-teste").one()
+    counts = {row.window_days: row.count for row in db_session.query(TagCount).filter(TagCount.tag_id == tag.id)}
+    assert counts == {1: 1, 7: 2, 30: 3}
+
+
+def test_get_tags_endpoint(client, db_session):
+    """Testa o ranking de tags a partir das contagens pré-calculadas."""
+    for i in range(3):
+        add_tagged_trend(db_session, f"Popular {i}", ["tag-popular"])
+    add_tagged_trend(db_session, "Rara", ["tag-rara"])
+    rebuild_tag_counts(db_session)
+    db_session.commit()
+
+    response = client.get("/api/tags?days=1&limit=500")
+    assert response.status_code == 200
+    data = response.json()
+    names = [item["name"] for item in data["tags"]]
+    assert names.index("tag-popular") < names.index("tag-rara")
+    assert {"name": "tag-popular", "count": 3} in data["tags"]
+    assert data["updated_at"]
+
+    assert client.get("/api/tags?days=2").status_code == 400
+
+
+def test_get_tag_trends_endpoint(client, db_session):
+    """Testa a listagem das tendências de uma tag, mais recentes primeiro."""
+    now = datetime.utcnow()
+    older = add_tagged_trend(db_session, "Tag antiga", ["Navegavel"], created_at=now - timedelta(days=1))
+    newer = add_tagged_trend(db_session, "Tag nova", ["navegavel", "outra"], created_at=now)
+
+    response = client.get("/api/tags/NAVEGAVEL/trends")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["tag"] == "navegavel"
+    assert [item["id"] for item in data["trends"]] == [newer.id, older.id]
+
+    assert client.get("/api/tags/inexistente-xyz/trends").status_code == 404
@@ -10,7 +10,10 @@ from app.tasks import (
     extract_hashtags,
     classify_trend_category,
     get_reddit_description,
-    get_reddit_thumbnail
+    get_reddit_thumbnail,
+    fetch_reddit_trends,
+    fetch_subreddit_increment,
+    load_reddit_watermarks,
 )
 from app.models import Trend, TrendTag
 from tests.fixtures.reddit_data import MockRedditSubmission
@@ -256,4 +259,85 @@ def test_clean_old_trends_max_records(mock_get_db_session, db_session):
     # Verifica o resultado da limpeza
     assert result["removed"] >= 2  # Pelo menos 2 registros removidos (yt4 e yt5)
     assert "youtube" in result["by_platform"]
-    assert result["by_platform"]["youtube"]["kept"] == 3 
\ No newline at end of file
+    assert result["by_platform"]["youtube"]["kept"] == 3 
+
+def make_reddit_client(new_posts, hot_posts, calls):
+    """Cliente falso do Reddit que registra as listagens pedidas."""
+    def new(limit, params=None):
+        calls.append(("new", dict(params or {})))
+        before = (params or {}).get("before")
+        if before is None:
+            return list(new_posts)
+        # before= retorna só os posts mais novos que a referência
+        reference = next(post.created_utc for post in new_posts if f"t3_{post.id}" == before)
+        return [post for post in new_posts if post.created_utc > reference]
+
+    def hot(limit):
+        calls.append(("hot", {}))
+        return list(hot_posts)
+
+    client = MagicMock()
+    client.subreddit.return_value = MagicMock(new=new, hot=hot)
+    return client
+
+
+def reddit_post(post_id, created_utc, score=10):
+    return MockRedditSubmission(id=post_id, title=f"Post {post_id}", score=score, num_comments=1,
+                                url="https://example.com", created_utc=created_utc, author="autor")
+
+
+@patch("app.tasks.REDDIT_SUBREDDITS", ["incremental"])
+@patch("app.tasks.REDDIT_LISTING", "new")
+@patch("app.tasks.REDDIT_MAX_WORKERS", 1)
+@patch("app.tasks.get_env_var", MagicMock(return_value="fake"))
+@patch("app.tasks.SessionLocal", MagicMock())
+def test_fetch_reddit_trends_incremental(fake_cache):
+    """Testa a coleta incremental: só posts depois da marca d'água, e a hot apenas para atualizar."""
+    posts = [reddit_post("p2", 1700000200), reddit_post("p1", 1700000100)]
+    calls = []
+    hot = [reddit_post("p1", 1700000100, score=99), reddit_post("p0", 1699999000, score=50)]
+    client = make_reddit_client(posts, hot, calls)
+    mock_upsert = MagicMock(return_value={"inserted": 0, "updated": 0, "skipped": 0})
+
+    with patch("praw.Reddit", MagicMock(return_value=client)), \
+         patch("app.tasks.upsert_trends", mock_upsert):
+        assert fetch_reddit_trends()["status"] == "success"
+        # Primeira coleta: listagem new completa e a hot, que traz o score atualizado de p1
+        assert calls == [("new", {}), ("hot", {})]
+        inserts, refresh = mock_upsert.call_args_list
+        assert [(item["external_id"], item["views"]) for item in inserts[0][2]] == [("p2", 10), ("p1", 99)]
+        assert inserts[1]["insert_new"]
+        # p0 só aparece na hot: atualiza a tendência se ela existir, mas não é inserido
+        assert [item["external_id"] for item in refresh[0][2]] == ["p0"]
+        assert refresh[1]["insert_new"] is False
+        assert load_reddit_watermarks()["incremental:new"]["fullname"] == "t3_p2"
+
+        # Segunda coleta: só o que veio depois de p2; a hot ainda não precisa ser atualizada
+        posts.insert(0, reddit_post("p3", 1700000300))
+        calls.clear()
+        mock_upsert.reset_mock()
+        assert fetch_reddit_trends()["status"] == "success"
+        assert calls == [("new", {"before": "t3_p2"})]
+        assert [item["external_id"] for item in mock_upsert.call_args[0][2]] == ["p3"]
+        assert load_reddit_watermarks()["incremental:new"]["fullname"] == "t3_p3"
+
+
+def test_fetch_subreddit_increment_rechecks_stale_watermark():
+    """Testa que uma marca d'água antiga sem posts novos é conferida sem before=."""
+    now = 1700100000
+    calls = []
+    # O post da marca foi removido: before= não retorna nada
+    client = make_reddit_client([], [], calls)
+    client.subreddit.return_value.new = MagicMock(side_effect=lambda limit, params=None: (
+        calls.append(("new", dict(params or {}))) or ([] if params else [reddit_post("p5", now - 10)])))
+    watermarks = {
+        "sub:new": {"fullname": "t3_removido", "created_utc": now - 15, "seen_at": now - 2 * 86400},
+        "sub:hot": {"refreshed_at": now},
+    }
+
+    items, hot_items, updates = fetch_subreddit_increment(client, "sub", watermarks, now=now)
+
+    assert calls == [("new", {"before": "t3_removido"}), ("new", {})]
+    assert [item["external_id"] for item in items] == ["p5"]
+    assert hot_items == []
+    assert updates == {"sub:new": {"fullname": "t3_p5", "created_utc": now - 10, "seen_at": now}}
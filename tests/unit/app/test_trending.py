@@ -0,0 +1,118 @@
+"""
+Testes para o trending_score e a ordenação sort=trending.
+"""
+import pytest
+from datetime import datetime, timedelta
+
+from app.models import Trend, compute_trending_score, refresh_trending_scores
+
+pytestmark = pytest.mark.unit
+
+
+def test_viral_video_outranks_fresh_post():
+    """Testa que engajamento alto de uma hora atrás supera um post novo com pouco engajamento."""
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    fresh = compute_trending_score(10, 0, 0, now - timedelta(minutes=1), now)
+    viral = compute_trending_score(500000, 20000, 3000, now - timedelta(hours=1), now)
+    assert viral > fresh
+
+    # Com o mesmo engajamento, o mais antigo perde momento
+    assert compute_trending_score(1000, 10, 5, now - timedelta(hours=1), now) > \
+        compute_trending_score(1000, 10, 5, now - timedelta(hours=24), now)
+    # Estatísticas ausentes ou negativas (score do Reddit) não geram score negativo
+    assert compute_trending_score(None, None, -5, None, now) == 0
+
+
+def test_refresh_trending_scores_updates_all_rows(db_session):
+    """Testa o recálculo em lote do score armazenado."""
+    now = datetime.utcnow()
+    trends = [
+        Trend(title=f"Momento {i}", platform="reddit", category="momento-teste",
+              views=views, published_at=now - timedelta(hours=hours))
+        for i, (views, hours) in enumerate([(100, 1), (100, 10), (5000, 3)])
+    ]
+    db_session.add_all(trends)
+    db_session.commit()
+    assert all(trend.trending_score == 0 for trend in trends)
+
+    updated = refresh_trending_scores(db_session, now=now, batch_size=2)
+    db_session.commit()
+    assert updated >= 3
+
+    for trend in trends:
+        db_session.refresh(trend)
+        assert trend.trending_score == pytest.approx(
+            compute_trending_score(trend.views, trend.likes, trend.comments, trend.published_at, now))
+    assert trends[2].trending_score > trends[0].trending_score > trends[1].trending_score
+
+
+def test_refresh_trending_scores_keeps_updated_at(db_session):
+    """Testa que o recálculo não toca o updated_at e só grava scores que mudaram."""
+    now = datetime.utcnow()
+    stamped = datetime(2024, 1, 1, 12, 0, 0)
+    trends = [
+        Trend(title=f"Recalculo {i}", platform="reddit", category="recalculo-teste", views=views,
+              published_at=now - timedelta(hours=2), updated_at=stamped)
+        for i, views in enumerate([100, 0])
+    ]
+    db_session.add_all(trends)
+    db_session.commit()
+
+    # O score nulo do post sem engajamento já está correto
+    assert refresh_trending_scores(db_session, now=now) >= 1
+    db_session.commit()
+    for trend in trends:
+        db_session.refresh(trend)
+        assert trend.updated_at == stamped
+    assert trends[0].trending_score > 0
+
+    # Nada mudou desde o último recálculo
+    assert refresh_trending_scores(db_session, now=now) == 0
+
+
+def test_get_trends_sorted_by_trending(client, db_session):
+    """Testa sort=trending com paginação por cursor."""
+    now = datetime.utcnow()
+    trends = [
+        Trend(title=f"Ordem momento {i}", platform="youtube", category="ordem-momento",
+              views=views, created_at=now - timedelta(minutes=i), published_at=now - timedelta(hours=2))
+        for i, views in enumerate([10, 900, 50, 900, 300])
+    ]
+    db_session.add_all(trends)
+    db_session.commit()
+    refresh_trending_scores(db_session, now=now)
+    db_session.commit()
+
+    # Empate de score desfeito pelo id, em ordem decrescente
+    expected = [trends[3].id, trends[1].id, trends[4].id, trends[2].id, trends[0].id]
+
+    first = client.get("/api/trends?category=ordem-momento&sort=trending&limit=3").json()
+    assert [item["id"] for item in first["trends"]] == expected[:3]
+    second = client.get(f"/api/trends?category=ordem-momento&sort=trending&limit=3&cursor={first['next_cursor']}").json()
+    assert [item["id"] for item in second["trends"]] == expected[3:]
+
+    recent = client.get("/api/trends?category=ordem-momento&limit=2").json()
+    assert [item["id"] for item in recent["trends"]] == [trends[0].id, trends[1].id]
+
+    # Cursores não servem para outra ordenação
+    response = client.get(f"/api/trends?category=ordem-momento&sort=trending&cursor={recent['next_cursor']}")
+    assert response.status_code == 400
+    assert client.get("/api/trends?sort=popular").status_code == 422
+
+
+def test_trending_etag_changes_after_refresh(client, db_session):
+    """Testa que, sem Redis, o recálculo dos scores muda o ETag de sort=trending."""
+    now = datetime.utcnow()
+    db_session.add(Trend(title="ETag momento", platform="youtube", category="etag-momento",
+                         views=1000, published_at=now - timedelta(hours=3)))
+    db_session.commit()
+    refresh_trending_scores(db_session, now=now)
+    db_session.commit()
+
+    url = "/api/trends?category=etag-momento&sort=trending"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    refresh_trending_scores(db_session, now=now + timedelta(hours=1))
+    db_session.commit()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
@@ -1,6 +1,8 @@
 """
 Testes unitários para as tarefas Celery.
 """
+import json
+import time
 import unittest
 import pytest
 from unittest.mock import patch, MagicMock
@@ -9,9 +11,11 @@ from datetime import datetime, timedelta
 # Atualizando as importações para refletir a estrutura atual do projeto
 from app.tasks import (
     fetch_all_trends,
+    finish_fetch_all_trends,
     fetch_youtube_trends,
     fetch_reddit_trends,
-    check_redis_connection
+    check_redis_connection,
+    reset_youtube_clients,
 )
 from app.main import cleanup_database
 from app.models import Trend
@@ -20,30 +24,80 @@ from app.models import Trend
 class TestFetchTrendsTasks(unittest.TestCase):
     """Testes para as tarefas de busca de tendências."""
     
-    @patch('app.tasks.fetch_reddit_trends')
-    @patch('app.tasks.fetch_youtube_trends')
+    @patch('app.tasks.chord')
     @patch('app.tasks.check_redis_connection')
-    def test_fetch_all_trends(self, mock_check_redis, mock_fetch_youtube, mock_fetch_reddit):
-        """Testa a busca de todas as tendências."""
+    def test_fetch_all_trends(self, mock_check_redis, mock_chord):
+        """Testa o disparo das coletas em paralelo, como um chord."""
         # Configurar os mocks
         mock_check_redis.return_value = True
-        mock_fetch_youtube.delay = MagicMock()
-        mock_fetch_reddit.delay = MagicMock()
+        mock_chord.return_value.return_value = MagicMock(id="rodada-1")
 
         # Executar a tarefa
         result = fetch_all_trends()
 
-        # Verificar se as tarefas foram chamadas
-        mock_fetch_youtube.delay.assert_called_once()
-        mock_fetch_reddit.delay.assert_called_once()
+        # As coletas rodam em paralelo, sem finalizar a rodada individualmente
+        header = mock_chord.call_args[0][0]
+        assert [signature.task for signature in header] == ["app.tasks.fetch_youtube_trends",
+                                                             "app.tasks.fetch_reddit_trends"]
+        assert all(signature.kwargs == {"finalize": False} for signature in header)
+
+        # O callback recebe as plataformas na ordem do grupo
+        callback = mock_chord.return_value.call_args[0][0]
+        assert callback.task == "app.tasks.finish_fetch_all_trends"
+        assert callback.kwargs["platforms"] == ["youtube", "reddit"]
 
         # Verificar o resultado
-        assert "youtube" in result
-        assert "reddit" in result
-        assert result["youtube"] == "Tarefa iniciada"
-        assert result["reddit"] == "Tarefa iniciada"
+        assert result == {"status": "Tarefas iniciadas", "platforms": ["youtube", "reddit"], "task_id": "rodada-1"}
+
+    def test_fetch_routes_use_platform_queues(self):
+        """Testa que as coletas de cada plataforma vão para filas dedicadas."""
+        from app.celery_app import celery
+        router = celery.amqp.router
+        assert router.route({}, "app.tasks.fetch_youtube_trends")["queue"].name == "youtube"
+        assert router.route({}, "app.tasks.fetch_reddit_trends")["queue"].name == "reddit"
+
+    @patch('app.tasks.bump_data_generation')
+    @patch('app.tasks.refresh_trending_scores')
+    @patch('app.tasks.SessionLocal')
+    def test_finish_fetch_all_trends(self, mock_session_local, mock_refresh, mock_bump):
+        """Testa a agregação do callback e a finalização única da rodada."""
+        results = [
+            {"status": "success", "platform": "youtube", "count": 3, "skipped": 40, "elapsed": 1.5},
+            {"error": "Reddit credentials not configured"},
+        ]
+
+        summary = finish_fetch_all_trends(results, platforms=["youtube", "reddit"], started_at=time.time() - 2)
+
+        assert summary["status"] == "partial"
+        assert (summary["count"], summary["skipped"]) == (3, 40)
+        assert summary["errors"] == {"reddit": "Reddit credentials not configured"}
+        assert summary["platforms"]["youtube"]["elapsed"] == 1.5
+        assert summary["elapsed"] >= 2
+        mock_refresh.assert_called_once()
+        mock_bump.assert_called_once()
+
+        # Sem nenhuma coleta bem-sucedida, nada muda e o cache é mantido
+        mock_bump.reset_mock()
+        summary = finish_fetch_all_trends([{"error": "x"}, {"error": "y"}], platforms=["youtube", "reddit"],
+                                          started_at=time.time())
+        assert summary["status"] == "error"
+        mock_bump.assert_not_called()
+
+    @patch('app.tasks.bump_data_generation')
+    @patch('app.tasks.refresh_trending_scores', side_effect=Exception("deadlock"))
+    @patch('app.tasks.SessionLocal')
+    def test_finish_fetch_all_trends_survives_score_refresh_error(self, mock_session_local, mock_refresh, mock_bump):
+        """Testa que uma falha no recálculo dos scores não perde o resumo nem a invalidação do cache."""
+        results = [{"status": "success", "count": 2, "skipped": 0}, {"status": "success", "count": 1, "skipped": 5}]
+
+        summary = finish_fetch_all_trends(results, platforms=["youtube", "reddit"], started_at=time.time())
+
+        assert summary["status"] == "success"
+        assert summary["count"] == 3
+        mock_bump.assert_called_once()
+        mock_session_local.return_value.close.assert_called_once()
 
-    @patch('googleapiclient.discovery.build')
+    @patch('googleapiclient.discovery.build_from_document')
     @patch('app.tasks.get_env_var')
     def test_fetch_youtube_trends_success(self, mock_get_env_var, mock_build):
         """Testa a busca de tendências do YouTube com sucesso."""
@@ -87,14 +141,15 @@ class TestFetchTrendsTasks(unittest.TestCase):
         mock_build.return_value = mock_youtube_service
 
         # Executar a tarefa
+        reset_youtube_clients()
         result = fetch_youtube_trends()
 
-        # Verificar se o serviço foi criado corretamente
+        # Verificar se o serviço foi criado corretamente, a partir do documento de descoberta local
         # Aceitar qualquer parâmetro adicional que possa ser passado
         mock_build.assert_called_once()
         args, kwargs = mock_build.call_args
-        assert args[0] == "youtube"
-        assert args[1] == "v3"
+        assert json.loads(args[0])["name"] == "youtube"
+        assert json.loads(args[0])["version"] == "v3"
         assert kwargs["developerKey"] == "fake_api_key"
 
         # Verificar o resultado
@@ -116,6 +171,7 @@ class TestFetchTrendsTasks(unittest.TestCase):
         assert "error" in result
         assert "Chave de API do YouTube não configurada" in result["error"]
 
+    @patch('app.tasks.REDDIT_MAX_WORKERS', 1)
     @patch('praw.Reddit')
     @patch('app.tasks.get_env_var')
     def test_fetch_reddit_trends_success(self, mock_get_env_var, mock_reddit):
@@ -233,4 +289,57 @@ class TestCleanupDatabaseTask:
         assert mock_session.commit.call_count == 1
         
         # Verificar o resultado
-        assert result == 2  # 2 tendências removidas 
\ No newline at end of file
+        assert result == 2  # 2 tendências removidas 
+@pytest.mark.unit
+def test_refresh_trend_cards_renders_missing_cards(db_session):
+    """Testa que a tarefa de backfill renderiza apenas os cards ausentes."""
+    from sqlalchemy.orm import sessionmaker
+    from app.models import TrendTag
+    from app.tasks import refresh_trend_cards
+
+    pending = Trend(title="Sem card", platform="reddit", external_id="refresh-1")
+    ready = Trend(title="Com card", platform="reddit", external_id="refresh-2", card={"title": "original"})
+    db_session.add_all([pending, ready])
+    db_session.flush()
+    db_session.add(TrendTag(trend_id=pending.id, name="backfill"))
+    db_session.commit()
+
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    with patch('app.tasks.get_db_session', side_effect=session_factory):
+        result = refresh_trend_cards(batch_size=1)
+
+    assert result["status"] == "success"
+    assert result["rendered"] >= 1
+
+    db_session.expire_all()
+    assert pending.card["title"] == "Sem card"
+    assert pending.card["tags"] == ["backfill"]
+    assert ready.card == {"title": "original"}
+
+@pytest.mark.unit
+def test_clean_old_trends_keeps_counters_consistent(db_session):
+    """Testa que a limpeza desconta os contadores na mesma transação das remoções."""
+    from sqlalchemy.orm import sessionmaker
+    from app.models import COUNTER_DIMENSIONS, count_trends_by_dimension, read_trend_counters
+    from app.tasks import clean_old_trends, reconcile_trend_counters
+
+    old = datetime.utcnow() - timedelta(days=400)
+    db_session.add_all([
+        Trend(title=f"Antiga {i}", platform="twitter", category="limpeza-contadores", created_at=old)
+        for i in range(3)
+    ])
+    db_session.commit()
+
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    with patch('app.tasks.get_db_session', side_effect=session_factory), \
+            patch('app.tasks.bump_data_generation'):
+        result = clean_old_trends(max_days=365, max_records=100000)
+        reconciled = reconcile_trend_counters()
+
+    assert result["removed"] >= 3
+    assert "limpeza-contadores" not in dict(read_trend_counters(db_session, "category"))
+    # Sem divergências: a limpeza já manteve os contadores corretos
+    assert reconciled["mismatches"] == 0
+    expected = count_trends_by_dimension(db_session)
+    actual = {(d, v): c for d in COUNTER_DIMENSIONS for v, c in read_trend_counters(db_session, d)}
+    assert actual == expected
@@ -0,0 +1,155 @@
+"""
+Testes para as migrations do Alembic e para o uso dos índices pelo planner.
+"""
+import os
+import pytest
+from alembic import command
+from alembic.config import Config
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.models import Base
+from app.search import include_name
+
+pytestmark = pytest.mark.unit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def alembic_config(url):
+    """Cria a configuração do Alembic apontando para `url`."""
+    config = Config(os.path.join(ROOT_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+@pytest.fixture
+def migrated_sqlite(tmp_path):
+    """Banco SQLite criado exclusivamente pelas migrations."""
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    command.upgrade(alembic_config(url), "head")
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+# Consultas quentes e o índice que o planner deve escolher para cada uma
+HOT_QUERIES = [
+    (
+        "SELECT * FROM trends WHERE platform = 'youtube' ORDER BY created_at DESC LIMIT 50",
+        "ix_trends_platform_created_at",
+    ),
+    (
+        "SELECT * FROM trends WHERE category = 'tecnologia' ORDER BY created_at DESC LIMIT 50",
+        "ix_trends_category_created_at",
+    ),
+    (
+        "SELECT * FROM trends WHERE created_at < '2024-01-01' OR (created_at = '2024-01-01' AND id < 10) "
+        "ORDER BY created_at DESC, id DESC LIMIT 50",
+        "ix_trends_created_at_id",
+    ),
+    (
+        "SELECT id FROM trends WHERE created_at < '2024-01-01'",
+        "ix_trends_created_at_id",
+    ),
+    (
+        "SELECT * FROM trend_tags WHERE trend_id IN (1, 2, 3)",
+        "ix_trend_tags_trend_id",
+    ),
+    (
+        "SELECT trend_id FROM trend_tags WHERE name = 'python'",
+        "ix_trend_tags_name_trend_id",
+    ),
+    (
+        "SELECT trend_id FROM trend_tags WHERE tag_id = 3",
+        "ix_trend_tags_tag_id_trend_id",
+    ),
+    (
+        "SELECT tag_id, count FROM tag_counts WHERE window_days = 7 ORDER BY count DESC LIMIT 50",
+        "ix_tag_counts_window_days_count",
+    ),
+    (
+        "SELECT id FROM trends ORDER BY trending_score DESC, id DESC LIMIT 50",
+        "ix_trends_trending_score_id",
+    ),
+    (
+        "SELECT id FROM trends WHERE platform = 'reddit' AND (trending_score < 1.5 OR (trending_score = 1.5 AND id < 10)) "
+        "ORDER BY trending_score DESC, id DESC LIMIT 50",
+        "ix_trends_platform_trending_score",
+    ),
+]
+
+
+def test_upgrade_matches_models(migrated_sqlite):
+    """Testa que as migrations produzem o mesmo esquema dos modelos."""
+    with migrated_sqlite.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"include_name": include_name})
+        diff = compare_metadata(context, Base.metadata)
+
+    assert diff == []
+
+
+def test_upgrade_over_create_all(tmp_path):
+    """Testa que bancos criados por create_tables() podem ser migrados."""
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+
+    command.upgrade(alembic_config(url), "head")
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("trends")}
+    assert "ix_trends_platform_created_at" in indexes
+    engine.dispose()
+
+
+def test_downgrade_removes_indexes(migrated_sqlite):
+    """Testa que o downgrade da migration de índices é reversível."""
+    url = str(migrated_sqlite.url)
+    command.downgrade(alembic_config(url), "0001")
+
+    indexes = {index["name"] for index in inspect(migrated_sqlite).get_indexes("trends")}
+    assert "ix_trends_created_at_id" not in indexes
+
+    command.upgrade(alembic_config(url), "head")
+
+
+@pytest.mark.parametrize("query,index_name", HOT_QUERIES)
+def test_sqlite_planner_uses_indexes(migrated_sqlite, query, index_name):
+    """Testa que o SQLite usa os índices compostos nas consultas quentes."""
+    with migrated_sqlite.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {query}")))
+
+    assert index_name in plan
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan
+
+
+def test_sqlite_history_reads_primary_key_range(migrated_sqlite):
+    """Testa que o histórico de uma tendência é lido de um intervalo da chave (trend_id, ts)."""
+    query = "SELECT ts, views, likes, comments FROM trend_snapshots WHERE trend_id = 3 ORDER BY ts"
+    with migrated_sqlite.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {query}")))
+
+    # A chave primária composta gera um índice automático no SQLite
+    assert "sqlite_autoindex_trend_snapshots_1 (trend_id=?)" in plan
+    assert "USE TEMP B-TREE FOR ORDER BY" not in plan
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL não configurada")
+@pytest.mark.parametrize("query,index_name", HOT_QUERIES)
+def test_postgres_planner_uses_indexes(query, index_name):
+    """Testa que o PostgreSQL usa os índices compostos nas consultas quentes."""
+    url = os.environ["TEST_POSTGRES_URL"]
+    command.upgrade(alembic_config(url), "head")
+    engine = create_engine(url)
+
+    try:
+        with engine.connect() as connection:
+            # Tabelas pequenas favorecem seq scan; desabilita para verificar a elegibilidade do índice
+            connection.execute(text("SET enable_seqscan = off"))
+            plan = " ".join(row[0] for row in connection.execute(text(f"EXPLAIN {query}")))
+    finally:
+        engine.dispose()
+
+    assert index_name in plan
@@ -284,4 +284,84 @@ class TestAggregatedContentModel:
         assert len(trend.aggregated_contents) == 3
         assert any(content.title == "Resumo" for content in trend.aggregated_contents)
         assert any(content.title == "Transcrição" for content in trend.aggregated_contents)
-        assert any(content.title == "Análise" for content in trend.aggregated_contents) 
\ No newline at end of file
+        assert any(content.title == "Análise" for content in trend.aggregated_contents)
+
+
+class TestTrendCounters:
+    """Testes para os contadores por plataforma e categoria (trend_counters)."""
+
+    @staticmethod
+    def assert_counters_consistent(db_session):
+        """Os contadores devem ser iguais à agregação da tabela trends."""
+        from app.models import COUNTER_DIMENSIONS, count_trends_by_dimension, read_trend_counters
+
+        expected = count_trends_by_dimension(db_session)
+        actual = {
+            (dimension, value): count
+            for dimension in COUNTER_DIMENSIONS
+            for value, count in read_trend_counters(db_session, dimension)
+        }
+        assert actual == expected
+
+    def test_counters_follow_inserts_updates_and_deletes(self, db_session):
+        """Testa a manutenção dos contadores no flush da sessão."""
+        from app.models import read_trend_counters
+
+        trend = Trend(title="Contador", platform="twitter", category="contador-a")
+        uncategorized = Trend(title="Sem categoria", platform="twitter")
+        db_session.add_all([trend, uncategorized])
+        db_session.commit()
+        assert ("contador-a", 1) in read_trend_counters(db_session, "category")
+        self.assert_counters_consistent(db_session)
+
+        trend.category = "contador-b"
+        db_session.commit()
+        categories = dict(read_trend_counters(db_session, "category"))
+        assert "contador-a" not in categories
+        assert categories["contador-b"] == 1
+        self.assert_counters_consistent(db_session)
+
+        db_session.delete(trend)
+        db_session.delete(uncategorized)
+        db_session.commit()
+        assert "contador-b" not in dict(read_trend_counters(db_session, "category"))
+        self.assert_counters_consistent(db_session)
+
+    def test_counters_rollback_with_transaction(self, db_session):
+        """Testa que os contadores são desfeitos junto com a transação."""
+        from app.models import read_trend_counters
+
+        db_session.add(Trend(title="Desfeita", platform="twitter", category="contador-rollback"))
+        db_session.flush()
+        assert ("contador-rollback", 1) in read_trend_counters(db_session, "category")
+
+        db_session.rollback()
+        assert "contador-rollback" not in dict(read_trend_counters(db_session, "category"))
+
+    def test_decrement_before_bulk_delete(self, db_session):
+        """Testa o desconto dos contadores em remoções em massa."""
+        from app.models import decrement_trend_counters
+
+        db_session.add_all([
+            Trend(title=f"Em massa {i}", platform="twitter", category="contador-massa") for i in range(3)
+        ])
+        db_session.commit()
+
+        criteria = (Trend.category == "contador-massa",)
+        decrement_trend_counters(db_session, *criteria)
+        db_session.query(Trend).filter(*criteria).delete(synchronize_session=False)
+        db_session.commit()
+        self.assert_counters_consistent(db_session)
+
+    def test_rebuild_trend_counters(self, db_session):
+        """Testa a reconstrução dos contadores a partir da tabela trends."""
+        from app.models import TrendCounter, rebuild_trend_counters
+
+        # Simula uma divergência
+        db_session.query(TrendCounter).filter(TrendCounter.dimension == "platform").update({"count": 999})
+        db_session.add(TrendCounter(dimension="category", value="fantasma", count=7))
+        db_session.commit()
+
+        rebuild_trend_counters(db_session)
+        db_session.commit()
+        self.assert_counters_consistent(db_session)
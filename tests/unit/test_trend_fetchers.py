@@ -1,13 +1,18 @@
 """
 Testes unitários para as funções de busca de tendências.
 """
+import threading
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 import pytest
 from datetime import datetime
 import os
 
-from app.tasks import fetch_youtube_trends, fetch_reddit_trends
+from app.tasks import (
+    fetch_youtube_trends, fetch_reddit_trends, fetch_youtube_region_items,
+    create_youtube_client, reset_youtube_clients,
+)
 from app.models import Trend
 
 pytestmark = pytest.mark.unit
@@ -15,6 +20,10 @@ pytestmark = pytest.mark.unit
 class TestYouTubeTrendFetcher(unittest.TestCase):
     """Testes para o fetcher de tendências do YouTube."""
     
+    def setUp(self):
+        # Cada teste começa com o pool de clientes do processo vazio
+        reset_youtube_clients()
+    
     def test_fetch_youtube_trends_success(self):
         """Testa a busca de tendências do YouTube com sucesso."""
         # Mock para a sessão do banco de dados
@@ -70,10 +79,14 @@ class TestYouTubeTrendFetcher(unittest.TestCase):
         # Mock para get_env_var para retornar uma chave de API válida
         mock_get_env_var = MagicMock(return_value="fake_api_key")
         
+        # Mock da etapa de escrita em lote
+        mock_upsert = MagicMock(return_value={"inserted": 1, "updated": 0, "skipped": 0})
+        
         # Patch das funções necessárias
         with patch('app.tasks.SessionLocal', mock_session_local), \
-             patch('googleapiclient.discovery.build', mock_build), \
+             patch('googleapiclient.discovery.build_from_document', mock_build), \
              patch('app.tasks.get_env_var', mock_get_env_var), \
+             patch('app.tasks.upsert_trends', mock_upsert), \
              patch.dict(os.environ, {"YOUTUBE_API_KEY": "fake_api_key"}):
             
             # Executar a função
@@ -82,9 +95,13 @@ class TestYouTubeTrendFetcher(unittest.TestCase):
             # Verificar se a API foi chamada corretamente
             mock_build.assert_called_once()
             
-            # Verificar se os dados foram salvos no banco de dados
-            self.assertTrue(mock_session.add.called)
+            # Verificar se os dados foram gravados em lote no banco de dados
+            args, kwargs = mock_upsert.call_args
+            self.assertEqual(args[1], "youtube")
+            self.assertEqual([item["external_id"] for item in args[2]], ["video1"])
+            self.assertEqual(args[2][0]["views"], 1000)
             self.assertTrue(mock_session.commit.called)
+            self.assertEqual(result["count"], 1)
     
     def test_fetch_youtube_trends_error(self):
         """Testa a busca de tendências do YouTube com erro."""
@@ -99,7 +116,7 @@ class TestYouTubeTrendFetcher(unittest.TestCase):
         
         # Patch das funções necessárias
         with patch('app.tasks.SessionLocal', mock_session_local), \
-             patch('googleapiclient.discovery.build', mock_build), \
+             patch('googleapiclient.discovery.build_from_document', mock_build), \
              patch('app.tasks.get_env_var', mock_get_env_var), \
              patch.dict(os.environ, {"YOUTUBE_API_KEY": "fake_api_key"}):
             
@@ -138,7 +155,7 @@ class TestYouTubeTrendFetcher(unittest.TestCase):
         
         # Patch das funções necessárias
         with patch('app.tasks.SessionLocal', mock_session_local), \
-             patch('googleapiclient.discovery.build', mock_build), \
+             patch('googleapiclient.discovery.build_from_document', mock_build), \
              patch('app.tasks.get_env_var', mock_get_env_var), \
              patch.dict(os.environ, {"YOUTUBE_API_KEY": "fake_api_key"}):
             
@@ -151,6 +168,130 @@ class TestYouTubeTrendFetcher(unittest.TestCase):
             # Verificar que nenhum dado foi salvo no banco de dados
             self.assertFalse(mock_session.add.called)
 
+    @staticmethod
+    def fake_youtube_pages(pages):
+        """
+        Cliente falso do YouTube: `pages` mapeia (região, pageToken), ou
+        (região, categoria, pageToken), na resposta de videos.list.
+        """
+        calls = []
+        
+        def list_videos(**params):
+            calls.append(dict(params))
+            key = (params["regionCode"], params.get("videoCategoryId"), params.get("pageToken"))
+            response = pages[key] if key in pages else pages[(params["regionCode"], params.get("pageToken"))]
+            request = MagicMock()
+            if isinstance(response, Exception):
+                request.execute.side_effect = response
+            else:
+                request.execute.return_value = response
+            return request
+        
+        youtube = MagicMock()
+        youtube.videos.return_value.list.side_effect = list_videos
+        return youtube, calls
+    
+    @staticmethod
+    def fake_video(video_id):
+        return {
+            'id': video_id,
+            'snippet': {'title': f'Vídeo {video_id}', 'description': '', 'publishedAt': '2023-01-01T00:00:00Z'},
+            'statistics': {'viewCount': '10'},
+        }
+    
+    def test_fetch_youtube_trends_paginates_regions_and_dedupes(self):
+        """Testa a paginação por região, a deduplicação entre regiões e a escrita em uma única etapa."""
+        video = self.fake_video
+        youtube, calls = self.fake_youtube_pages({
+            ("BR", None): {'items': [video('a'), video('b')], 'nextPageToken': 'br-2'},
+            ("BR", 'br-2'): {'items': [video('c')]},
+            ("US", None): {'items': [video('b'), video('d')]},
+            ("JP", None): Exception("Região indisponível"),
+        })
+        mock_upsert = MagicMock(return_value={"inserted": 4, "updated": 0, "skipped": 0})
+        
+        with patch('app.tasks.SessionLocal', MagicMock()), \
+             patch('googleapiclient.discovery.build_from_document', MagicMock(return_value=youtube)), \
+             patch('app.tasks.get_env_var', MagicMock(return_value="fake_api_key")), \
+             patch('app.tasks.upsert_trends', mock_upsert), \
+             patch('app.tasks.YOUTUBE_REGIONS', ["BR", "US", "JP"]), \
+             patch('app.tasks.YOUTUBE_MAX_WORKERS', 1):
+            
+            result = fetch_youtube_trends()
+        
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["count"], 4)
+        mock_upsert.assert_called_once()
+        self.assertEqual([item["external_id"] for item in mock_upsert.call_args[0][2]], ["a", "b", "c", "d"])
+        
+        self.assertTrue(all(params["maxResults"] == 50 for params in calls))
+        self.assertIn({"part": "snippet,statistics", "chart": "mostPopular", "regionCode": "BR",
+                       "pageToken": "br-2", "maxResults": 50}, calls)
+    
+    def test_fetch_youtube_region_items_respects_cap(self):
+        """Testa o limite de vídeos por região, seguindo as páginas."""
+        video = self.fake_video
+        youtube, calls = self.fake_youtube_pages({
+            ("BR", None): {'items': [video('a'), video('b')], 'nextPageToken': 'br-2'},
+            ("BR", 'br-2'): {'items': [video('c'), video('d')], 'nextPageToken': 'br-3'},
+        })
+        
+        items = fetch_youtube_region_items(youtube, "BR", max_videos=3)
+        
+        self.assertEqual([item["external_id"] for item in items], ["a", "b", "c"])
+        self.assertEqual([params["maxResults"] for params in calls], [3, 1])
+    
+    def test_fetch_youtube_region_items_splits_cap_between_categories(self):
+        """Testa que uma categoria com ranking cheio não ocupa o limite da região inteiro."""
+        video = self.fake_video
+        youtube, calls = self.fake_youtube_pages({
+            # A primeira categoria teria vídeos para o limite inteiro
+            ("BR", "10", None): {'items': [video(f'm{i}') for i in range(4)], 'nextPageToken': 'm-2'},
+            ("BR", "10", 'm-2'): {'items': [video(f'm{i}') for i in range(4, 8)]},
+            ("BR", "20", None): {'items': [video('g0'), video('g1')], 'nextPageToken': 'g-2'},
+            ("BR", "20", 'g-2'): {'items': [video('g2'), video('g3')]},
+        })
+        
+        items = fetch_youtube_region_items(youtube, "BR", category_ids=["10", "20"], max_videos=5)
+        
+        # 3 vídeos para a primeira categoria e o restante do limite (2) para a segunda
+        self.assertEqual([item["external_id"] for item in items], ["m0", "m1", "m2", "g0", "g1"])
+        self.assertEqual([(params["videoCategoryId"], params["maxResults"]) for params in calls],
+                         [("10", 3), ("20", 2)])
+
+    def test_youtube_client_is_reused_between_runs(self):
+        """Testa que o cliente do YouTube é criado uma vez e reaproveitado entre execuções."""
+        youtube, calls = self.fake_youtube_pages({("BR", None): {'items': [self.fake_video('a')]}})
+        mock_build = MagicMock(return_value=youtube)
+        
+        with patch('app.tasks.SessionLocal', MagicMock()), \
+             patch('googleapiclient.discovery.build_from_document', mock_build), \
+             patch('app.tasks.get_env_var', MagicMock(return_value="fake_api_key")), \
+             patch('app.tasks.upsert_trends', MagicMock(return_value={"inserted": 0, "updated": 1, "skipped": 0})), \
+             patch('app.tasks.YOUTUBE_REGIONS', ["BR"]):
+            
+            for _ in range(3):
+                self.assertEqual(fetch_youtube_trends()["status"], "success")
+        
+        mock_build.assert_called_once()
+        self.assertEqual(len(calls), 3)
+    
+    def test_create_youtube_client_offline(self):
+        """Testa que a criação do cliente do YouTube não acessa a rede."""
+        def no_network(*args, **kwargs):
+            raise AssertionError("Acesso à rede durante a criação do cliente")
+        
+        with patch('socket.socket.connect', no_network), \
+             patch('socket.create_connection', no_network), \
+             patch('socket.getaddrinfo', no_network):
+            youtube = create_youtube_client("fake_api_key")
+            request = youtube.videos().list(part="snippet,statistics", chart="mostPopular",
+                                            regionCode="BR", maxResults=50)
+        
+        self.assertTrue(request.uri.startswith("https://youtube.googleapis.com/youtube/v3/videos?"))
+        self.assertIn("key=fake_api_key", request.uri)
+        self.assertIn("maxResults=50", request.uri)
+
 class TestRedditTrendFetcher(unittest.TestCase):
     """Testes para o fetcher de tendências do Reddit."""
     
@@ -205,10 +346,15 @@ class TestRedditTrendFetcher(unittest.TestCase):
         
         mock_get_env_var = MagicMock(side_effect=mock_get_env_var_side_effect)
         
+        # Mock da etapa de escrita em lote
+        mock_upsert = MagicMock(return_value={"inserted": 1, "updated": 0, "skipped": 0})
+        
         # Patch das funções necessárias
         with patch('app.tasks.SessionLocal', mock_session_local), \
              patch('praw.Reddit', mock_reddit_class), \
              patch('app.tasks.get_env_var', mock_get_env_var), \
+             patch('app.tasks.upsert_trends', mock_upsert), \
+             patch('app.tasks.REDDIT_MAX_WORKERS', 1), \
              patch.dict(os.environ, {
                  "REDDIT_CLIENT_ID": "fake_client_id",
                  "REDDIT_SECRET": "fake_secret",
@@ -222,8 +368,11 @@ class TestRedditTrendFetcher(unittest.TestCase):
             # Verificar se o cliente Reddit foi criado corretamente
             mock_reddit_class.assert_called_once()
             
-            # Verificar se os dados foram salvos no banco de dados
-            self.assertTrue(mock_session.add.called)
+            # Verificar se os dados foram gravados em lote no banco de dados
+            args, kwargs = mock_upsert.call_args
+            self.assertEqual(args[1], "reddit")
+            self.assertIn("post1", [item["external_id"] for item in args[2]])
+            self.assertEqual(args[2][0]["tags"], ["tecnologia"])
             self.assertTrue(mock_session.commit.called)
     
     def test_fetch_reddit_trends_error(self):
@@ -301,6 +450,7 @@ class TestRedditTrendFetcher(unittest.TestCase):
         with patch('app.tasks.SessionLocal', mock_session_local), \
              patch('praw.Reddit', mock_reddit_class), \
              patch('app.tasks.get_env_var', mock_get_env_var), \
+             patch('app.tasks.REDDIT_MAX_WORKERS', 1), \
              patch.dict(os.environ, {
                  "REDDIT_CLIENT_ID": "fake_client_id",
                  "REDDIT_SECRET": "fake_secret",
@@ -315,4 +465,70 @@ class TestRedditTrendFetcher(unittest.TestCase):
             mock_reddit_class.assert_called_once()
             
             # Verificar que nenhum dado foi salvo no banco de dados
-            self.assertFalse(mock_session.add.called) 
\ No newline at end of file
+            self.assertFalse(mock_session.add.called)
+    
+    def test_fetch_reddit_trends_fetches_subreddits_concurrently(self):
+        """Testa a busca paralela das listagens, limitada por REDDIT_MAX_WORKERS, com uma única etapa de escrita."""
+        subreddits = [f"sub{i}" for i in range(6)]
+        delay = 0.2
+        active = []
+        peak = []
+        lock = threading.Lock()
+        
+        def make_post(subreddit_name):
+            post = MagicMock()
+            post.id = f"{subreddit_name}-post"
+            post.title = f"Post de {subreddit_name}"
+            post.is_self = False
+            post.url = "https://example.com"
+            post.subreddit_name_prefixed = f"r/{subreddit_name}"
+            post.link_flair_text = None
+            post.author = "autor"
+            post.permalink = f"/r/{subreddit_name}/post"
+            post.score = 10
+            post.num_comments = 1
+            post.created_utc = 1672531200
+            post.preview = {}
+            post.thumbnail = ""
+            return post
+        
+        def hot(subreddit_name, limit):
+            with lock:
+                active.append(subreddit_name)
+                peak.append(len(active))
+            time.sleep(delay)
+            with lock:
+                active.remove(subreddit_name)
+            if subreddit_name == "sub3":
+                raise Exception("Subreddit indisponível")
+            return [make_post(subreddit_name)]
+        
+        def reddit_factory(**kwargs):
+            client = MagicMock()
+            client.subreddit.side_effect = lambda name: MagicMock(hot=lambda limit: hot(name, limit))
+            return client
+        
+        mock_upsert = MagicMock(return_value={"inserted": 5, "updated": 0, "skipped": 0})
+        
+        with patch('app.tasks.SessionLocal', MagicMock()), \
+             patch('praw.Reddit', MagicMock(side_effect=reddit_factory)) as mock_reddit_class, \
+             patch('app.tasks.get_env_var', MagicMock(return_value="fake")), \
+             patch('app.tasks.upsert_trends', mock_upsert), \
+             patch('app.tasks.REDDIT_SUBREDDITS', subreddits), \
+             patch('app.tasks.REDDIT_MAX_WORKERS', 3):
+            
+            started = time.perf_counter()
+            result = fetch_reddit_trends()
+            elapsed = time.perf_counter() - started
+        
+        self.assertEqual(result["status"], "success")
+        # Duas rodadas de três buscas simultâneas, em vez de seis buscas em sequência
+        self.assertLess(elapsed, len(subreddits) * delay * 0.6)
+        self.assertLessEqual(max(peak), 3)
+        self.assertLessEqual(mock_reddit_class.call_count, 3)
+        
+        # Um subreddit com erro não interrompe os demais; a escrita é feita uma vez, na ordem dos subreddits
+        mock_upsert.assert_called_once()
+        items = mock_upsert.call_args[0][2]
+        self.assertEqual([item["external_id"] for item in items],
+                         [f"{name}-post" for name in subreddits if name != "sub3"]) 
\ No newline at end of file